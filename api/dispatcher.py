@@ -0,0 +1,186 @@
+import asyncio
+import argparse
+import itertools
+import logging
+import re
+
+# Setup logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("dispatcher")
+
+# Remembers which worker a browser was sent to; a Streamlit session (its websocket,
+# file uploads and media) only exists in the worker that created it
+COOKIE_NAME = "hrms_worker"
+
+# Largest request or response head accepted
+HEAD_LIMIT = 64 * 1024
+CHUNK_BYTES = 64 * 1024
+CONNECT_TIMEOUT = 5.0
+
+_COOKIE = re.compile(rb"(?:^|;)\s*" + COOKIE_NAME.encode() + rb"=(\d+)")
+
+
+def _headers(head):
+    """(request/status line, [(name, value)]) from a raw HTTP head."""
+    lines = head.split(b"\r\n")
+    headers = []
+    for line in lines[1:]:
+        if b":" in line:
+            name, value = line.split(b":", 1)
+            headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def _build_head(first_line, headers):
+    return b"\r\n".join([first_line] + [name + b": " + value for name, value in headers]) + b"\r\n\r\n"
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class Dispatcher:
+    """Spreads browsers over backends round-robin and keeps each browser on its backend."""
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self._order = itertools.cycle(range(len(self.backends)))
+
+    def _candidates(self, headers):
+        """(backend indexes to try in order, whether the browser already has a valid cookie)."""
+        cookie = b"; ".join(value for name, value in headers if name.lower() == b"cookie")
+        match = _COOKIE.search(cookie)
+        if match and int(match.group(1)) < len(self.backends):
+            first, sticky = int(match.group(1)), True
+        else:
+            first, sticky = next(self._order), False
+        # On failure fall through to the others, so a dead worker only costs its own sessions
+        rest = [i for i in range(len(self.backends)) if i != first]
+        return [first] + rest, sticky
+
+    async def _connect(self, candidates):
+        for index in candidates:
+            host, port = self.backends[index]
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+                return index, reader, writer
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"Worker {index} at {host}:{port} unavailable: {e}")
+        return None, None, None
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info("peername")
+        client_ip = (peer[0] if peer else "unknown").encode()
+        backend_writer = None
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+            first_line, headers = _headers(head)
+            candidates, sticky = self._candidates(headers)
+            index, backend_reader, backend_writer = await self._connect(candidates)
+            if index is None:
+                client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await client_writer.drain()
+                return
+            set_cookie = None if sticky and index == candidates[0] else index
+
+            requests = asyncio.ensure_future(
+                self._forward_requests(client_reader, backend_writer, first_line, headers, client_ip))
+            responses = asyncio.ensure_future(self._forward_responses(backend_reader, client_writer, set_cookie))
+            # A client that stops sending may still be owed a response; a closed backend ends the connection
+            done, _ = await asyncio.wait({requests, responses}, return_when=asyncio.FIRST_COMPLETED)
+            if requests in done and requests.exception() is None:
+                await asyncio.wait({responses})
+            for task in (requests, responses):
+                task.cancel()
+            await asyncio.gather(requests, responses, return_exceptions=True)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error dispatching connection from {client_ip.decode()}: {e}")
+        finally:
+            for writer in (backend_writer, client_writer):
+                if writer is not None:
+                    writer.close()
+
+    async def _forward_requests(self, reader, writer, first_line, headers, client_ip):
+        """Pass requests to the backend, stamping each head with the real client address.
+
+        Heads are parsed one request at a time so that requests reusing a
+        keep-alive connection (including a websocket upgrade) are stamped too.
+        After an upgrade, or a body whose length is not known up front, bytes
+        are passed through unchanged.
+        """
+        try:
+            while True:
+                # The dispatcher is the first hop, so a client-supplied address is never trusted
+                headers = [(name, value) for name, value in headers
+                           if name.lower() not in (b"x-forwarded-for", b"x-real-ip")]
+                headers += [(b"X-Forwarded-For", client_ip), (b"X-Real-IP", client_ip)]
+                writer.write(_build_head(first_line, headers))
+
+                length = _header(headers, b"content-length")
+                if _header(headers, b"upgrade") is not None or _header(headers, b"transfer-encoding") is not None:
+                    await self._pipe(reader, writer)
+                    return
+                remaining = int(length) if length else 0
+                while remaining:
+                    chunk = await reader.read(min(remaining, CHUNK_BYTES))
+                    if not chunk:
+                        return
+                    writer.write(chunk)
+                    remaining -= len(chunk)
+                await writer.drain()
+
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                first_line, headers = _headers(head)
+        finally:
+            if writer.can_write_eof():
+                writer.write_eof()
+
+    async def _forward_responses(self, reader, writer, set_cookie):
+        """Pass responses back, adding the worker cookie to the first one if the browser needs it."""
+        if set_cookie is not None:
+            head = await reader.readuntil(b"\r\n\r\n")
+            cookie = f"Set-Cookie: {COOKIE_NAME}={set_cookie}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+            writer.write(head[:-2] + cookie + b"\r\n")
+        await self._pipe(reader, writer)
+
+    async def _pipe(self, reader, writer):
+        while True:
+            chunk = await reader.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+
+async def serve(host, port, backends):
+    dispatcher = Dispatcher(backends)
+    server = await asyncio.start_server(dispatcher.handle, host, port, limit=HEAD_LIMIT)
+    logger.info(f"Dispatcher listening on {host}:{port} for {len(backends)} worker(s)")
+    async with server:
+        await server.serve_forever()
+
+
+def run_dispatcher(host, port, backends):
+    """Serve until interrupted; backends is a list of (host, port)."""
+    try:
+        asyncio.run(serve(host, port, backends))
+    except KeyboardInterrupt:
+        logger.info("Dispatcher shutting down")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sticky dispatcher in front of several app workers")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8501, help="Port to listen on")
+    parser.add_argument("backends", nargs="+", help="Worker addresses as host:port")
+    args = parser.parse_args()
+    run_dispatcher(args.host, args.port, [(b.rsplit(":", 1)[0], int(b.rsplit(":", 1)[1])) for b in args.backends])
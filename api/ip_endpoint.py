@@ -2,16 +2,61 @@ import json
 from pathlib import Path
 import threading
 import os
+import signal
+import socket
+import argparse
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 import logging
+from utils.file_lock import file_lock, write_atomic
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("ip_reporting")
 
+REPORTED_IPS_PATH = "config/reported_ips.json"
+
+# Exit status of a worker that could not bind its port; the supervisor does not retry it
+EXIT_PORT_IN_USE = 3
+
+
+def record_ip(private_ip):
+    """Add private_ip to reported_ips.json; several server processes may do this at once."""
+    ip_data_path = Path(REPORTED_IPS_PATH)
+    
+    # Create directory if it doesn't exist
+    if not ip_data_path.parent.exists():
+        ip_data_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with file_lock(REPORTED_IPS_PATH):
+        # Load existing data or create new
+        try:
+            with open(ip_data_path, "r") as f:
+                ip_data = json.load(f)
+        except (OSError, ValueError):
+            ip_data = {"reported_ips": []}
+        
+        # Add the new IP if not already present
+        if private_ip not in ip_data["reported_ips"]:
+            ip_data["reported_ips"].append(private_ip)
+            write_atomic(REPORTED_IPS_PATH, json.dumps(ip_data, indent=4))
+
+
 class IPReportHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/healthz':
+            # Readiness probe for the supervisor in run.py
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({"status": "ok", "pid": os.getpid()}).encode('utf-8'))
+        else:
+            self.send_response(404)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({"status": "error", "message": "Not found"}).encode('utf-8'))
+    
     def do_POST(self):
         if self.path == '/api/ip-report':
             content_length = int(self.headers['Content-Length'])
@@ -24,29 +69,7 @@ class IPReportHandler(BaseHTTPRequestHandler):
                 
                 if private_ip:
                     # Store the IP in a file for persistence
-                    ip_data_path = Path("config/reported_ips.json")
-                    
-                    # Create directory if it doesn't exist
-                    if not ip_data_path.parent.exists():
-                        ip_data_path.parent.mkdir(parents=True)
-                    
-                    # Load existing data or create new
-                    if ip_data_path.exists():
-                        try:
-                            with open(ip_data_path, "r") as f:
-                                ip_data = json.load(f)
-                        except:
-                            ip_data = {"reported_ips": []}
-                    else:
-                        ip_data = {"reported_ips": []}
-                    
-                    # Add the new IP if not already present
-                    if private_ip not in ip_data["reported_ips"]:
-                        ip_data["reported_ips"].append(private_ip)
-                        
-                        # Save the updated data
-                        with open(ip_data_path, "w") as f:
-                            json.dump(ip_data, f, indent=4)
+                    record_ip(private_ip)
                     
                     # Send successful response
                     self.send_response(200)
@@ -84,19 +107,50 @@ class IPReportHandler(BaseHTTPRequestHandler):
         if os.environ.get("DEBUG", "false").lower() == "true":
             logger.debug(format % args)
 
-def run_http_server():
+class IPReportServer(HTTPServer):
+    """HTTPServer that can share its port with other processes through SO_REUSEPORT."""
+    
+    def __init__(self, server_address, handler, reuse_port=False):
+        self.reuse_port = reuse_port
+        super().__init__(server_address, handler)
+    
+    def server_bind(self):
+        if self.reuse_port:
+            # Every worker binds the same port and the kernel spreads connections over them
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def run_http_server(port=None, reuse_port=False):
+    """Serve IP reports until shutdown; returns False if the port could not be bound."""
     # Get the port from environment or use default
-    port = int(os.environ.get("IP_SERVER_PORT", 5000))
+    port = port or int(os.environ.get("IP_SERVER_PORT", 5000))
     
     # Use 0.0.0.0 to listen on all interfaces instead of just localhost
     server_address = ('0.0.0.0', port)
     
     try:
-        httpd = HTTPServer(server_address, IPReportHandler)
-        logger.info(f"HTTP API server started on port {port}")
+        httpd = IPReportServer(server_address, IPReportHandler, reuse_port=reuse_port)
+    except OSError as e:
+        logger.error(f"Failed to start HTTP server on port {port}: {e}")
+        return False
+    
+    # shutdown() waits for serve_forever to return, so it has to come from another thread
+    def stop(signum, frame):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+    
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+    
+    logger.info(f"HTTP API server started on port {port} (process ID {os.getpid()})")
+    try:
         httpd.serve_forever()
-    except Exception as e:
-        logger.error(f"Failed to start HTTP server: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        logger.info(f"HTTP API server on port {port} stopped")
+    return True
 
 # Start HTTP server in a separate thread
 def start_server():
@@ -107,13 +161,12 @@ def start_server():
 
 # Only start the server if this script is run directly, not when imported
 if __name__ == "__main__":
-    start_server()
+    parser = argparse.ArgumentParser(description="HTTP server receiving private IP reports")
+    parser.add_argument("--port", type=int, help="Port to listen on (default: IP_SERVER_PORT or 5000)")
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="Bind with SO_REUSEPORT so several processes can serve the port")
+    args = parser.parse_args()
     
-    # Keep the main thread alive
-    import time
-    try:
-        while True:
-            time.sleep(60)
-    except KeyboardInterrupt:
-        logger.info("Server shutting down")
-        pass 
\ No newline at end of file
+    # Serve on the main thread until SIGTERM or Ctrl+C
+    if not run_http_server(args.port, args.reuse_port):
+        raise SystemExit(EXIT_PORT_IN_USE)
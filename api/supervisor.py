@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.request
+import logging
+from api.ip_endpoint import EXIT_PORT_IN_USE
+
+# Setup logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("ip_supervisor")
+
+# Restart delays double from the first to the last; a worker that stayed up this long starts over
+BACKOFF_FIRST = 1.0
+BACKOFF_MAX = 30.0
+BACKOFF_RESET_AFTER = 60.0
+
+READY_TIMEOUT = 10.0
+STOP_TIMEOUT = 10.0
+POLL_SECONDS = 0.5
+
+
+def probe(port, timeout=1.0):
+    """The /healthz reply of whatever serves port on this machine, or None."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.proc = None
+        self.started_at = 0.0
+        self.delay = BACKOFF_FIRST
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    """Keeps `workers` ip_endpoint processes serving one port, restarting any that exit.
+
+    With more than one worker each binds the port with SO_REUSEPORT and the
+    kernel balances connections between them. A worker that dies is restarted
+    after a delay that doubles on every quick failure, up to BACKOFF_MAX.
+    """
+
+    def __init__(self, port=None, workers=1):
+        self.port = port or int(os.environ.get("IP_SERVER_PORT", 5000))
+        if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            logger.warning("SO_REUSEPORT is not available on this platform; running one IP server worker")
+            workers = 1
+        self.workers = [_Worker(i) for i in range(workers)]
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _spawn(self, worker):
+        command = [sys.executable, "-m", "api.ip_endpoint", "--port", str(self.port)]
+        if len(self.workers) > 1:
+            command.append("--reuse-port")
+        # A session of their own, so a Ctrl+C at the terminal reaches them only through stop()
+        if os.name == 'nt':  # Windows
+            worker.proc = subprocess.Popen(command, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:  # Unix/Linux
+            worker.proc = subprocess.Popen(command, start_new_session=True)
+        worker.started_at = time.monotonic()
+        logger.info(f"IP server worker {worker.index} started as process ID {worker.proc.pid}")
+
+    def start(self):
+        """Start the workers and a thread that restarts them; False if the port is taken."""
+        if probe(self.port) is not None:
+            logger.error(f"An IP server is already answering on port {self.port}; not starting another")
+            return False
+        for worker in self.workers:
+            self._spawn(worker)
+        self._thread = threading.Thread(target=self._watch, name="ip-supervisor", daemon=True)
+        self._thread.start()
+        return True
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Block until the port answers /healthz, or timeout; returns whether it did."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not self._stopping.is_set():
+            if probe(self.port, timeout=POLL_SECONDS) is not None:
+                return True
+            time.sleep(POLL_SECONDS / 5)
+        return False
+
+    def _watch(self):
+        while not self._stopping.wait(POLL_SECONDS):
+            now = time.monotonic()
+            for worker in self.workers:
+                if worker.proc is None:
+                    if now >= worker.restart_at:
+                        self._spawn(worker)
+                    continue
+                code = worker.proc.poll()
+                if code is None:
+                    continue
+                if code == EXIT_PORT_IN_USE:
+                    logger.error(f"IP server worker {worker.index} could not bind port {self.port}; "
+                                 f"another program is using it")
+                    self._stopping.set()
+                    break
+                if now - worker.started_at > BACKOFF_RESET_AFTER:
+                    worker.delay = BACKOFF_FIRST
+                logger.warning(f"IP server worker {worker.index} exited with status {code}; "
+                               f"restarting in {worker.delay:.0f}s")
+                worker.proc = None
+                worker.restart_at = now + worker.delay
+                worker.delay = min(worker.delay * 2, BACKOFF_MAX)
+        self._terminate()
+
+    def _terminate(self):
+        running = [w.proc for w in self.workers if w.proc is not None and w.proc.poll() is None]
+        for proc in running:
+            proc.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for proc in running:
+            try:
+                proc.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"IP server process {proc.pid} did not stop in time; killing it")
+                proc.kill()
+                proc.wait()
+
+    def stop(self):
+        """Stop restarting, ask every worker to finish its request and exit, and wait for them."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("IP server stopped")
+
+    def run_forever(self):
+        """start(), then supervise in the foreground until SIGTERM or Ctrl+C."""
+        if not self.start():
+            return False
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stopping.set())
+        try:
+            while not self._stopping.wait(POLL_SECONDS):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run and supervise the IP report server")
+    parser.add_argument("--port", type=int, help="Port to serve (default: IP_SERVER_PORT or 5000)")
+    parser.add_argument("--workers", type=int, default=1, help="Server processes sharing the port")
+    args = parser.parse_args()
+    sys.exit(0 if Supervisor(args.port, args.workers).run_forever() else 1)
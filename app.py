@@ -9,7 +9,9 @@ from pages.admin_panel import AdminPanelPage
 from pages.user_settings import UserSettingsPage
 from pages.blog_notice import BlogNoticePage
 from pages.reported_ips import ReportedIPsPage
-from utils.ip_utils import get_allowed_ips, ip_in_allowed_list, is_app_running_locally, get_client_ip, get_private_ip
+from pages.diagnostics import DiagnosticsPage
+from utils.ip_utils import ip_in_allowed_list, is_app_running_locally, get_client_ip, get_private_ip
+from utils import profiler
 
 # Import API endpoint handlers, but don't start server automatically
 # The HTTP server should be run as a separate process
@@ -24,9 +26,7 @@ class EmployeeAttendanceApp:
         self.user_settings = UserSettingsPage()
         self.blog_notice = BlogNoticePage()
         self.reported_ips = ReportedIPsPage()
-        
-        # Load allowed IP addresses from the utility function
-        self.allowed_ips = get_allowed_ips()
+        self.diagnostics = DiagnosticsPage()
         
         # Check for force override file
         if os.path.exists(".force_override"):
@@ -42,6 +42,9 @@ class EmployeeAttendanceApp:
         return get_client_ip()
  
     def main(self):
+        # Group instrumentation events by rerun
+        profiler.begin_rerun(st.session_state.get('employee_code', ''))
+        
         # Initialize session state for admin override if not present
         if "admin_override" not in st.session_state:
             st.session_state["admin_override"] = False
@@ -53,12 +56,14 @@ class EmployeeAttendanceApp:
          
         # Skip IP check if admin override is active or if restriction is disabled
         if ip_restriction_enabled and not st.session_state.get("admin_override", False):
-            # Skip IP check if running locally in development mode
-            running_locally = is_app_running_locally()   
-            
-            # Check if client's IP is allowed 
-            client_ip = self.get_client_ip()
-            access_allowed = running_locally or ip_in_allowed_list(client_ip, self.allowed_ips)
+            with profiler.span("ip_gate", "check") as gate:
+                # Skip IP check if running locally in development mode
+                running_locally = is_app_running_locally()   
+                
+                # Check if client's IP is allowed 
+                client_ip = self.get_client_ip()
+                access_allowed = running_locally or ip_in_allowed_list(client_ip)
+                gate['allowed'] = access_allowed
             
             if not access_allowed:
                 st.error("⚠️ Access Denied ⚠️")
@@ -108,6 +113,7 @@ class EmployeeAttendanceApp:
             if st.session_state.get('designation', 'HR') == "HR":
                 page_options.insert(2, "Admin Panel")
                 page_options.insert(3, "Reported IPs")
+                page_options.insert(4, "Diagnostics")
 
             for option in page_options:
                 if st.sidebar.button(option):    
@@ -122,21 +128,24 @@ class EmployeeAttendanceApp:
             st.sidebar.write(' ') 
             st.sidebar.image("artifacts/logo.jpg", width=180, use_container_width=False)
 
-        if not st.session_state['logged_in']:
-            self.login_page.display() 
-        else:  
-            if st.session_state['current_page'] == "User Profile":
-                self.user_profile.display()
-            elif st.session_state['current_page'] == "Employee Attendance":
-                self.attendance.display()
-            elif st.session_state['current_page'] == "User Settings":
-                self.user_settings.display()
-            elif st.session_state['current_page'] == "Blogs & Notice":
-                self.blog_notice.display()
-            elif st.session_state['current_page'] == "Admin Panel" and st.session_state.get('designation', 'HR') == "HR":
-                self.admin_panel.display()
-            elif st.session_state['current_page'] == "Reported IPs" and st.session_state.get('designation', 'HR') == "HR":
-                self.reported_ips.display()
+        with profiler.span("page", st.session_state['current_page'] if st.session_state['logged_in'] else "Login"):
+            if not st.session_state['logged_in']:
+                self.login_page.display() 
+            else:  
+                if st.session_state['current_page'] == "User Profile":
+                    self.user_profile.display()
+                elif st.session_state['current_page'] == "Employee Attendance":
+                    self.attendance.display()
+                elif st.session_state['current_page'] == "User Settings":
+                    self.user_settings.display()
+                elif st.session_state['current_page'] == "Blogs & Notice":
+                    self.blog_notice.display()
+                elif st.session_state['current_page'] == "Admin Panel" and st.session_state.get('designation', 'HR') == "HR":
+                    self.admin_panel.display()
+                elif st.session_state['current_page'] == "Reported IPs" and st.session_state.get('designation', 'HR') == "HR":
+                    self.reported_ips.display()
+                elif st.session_state['current_page'] == "Diagnostics" and st.session_state.get('designation', 'HR') == "HR":
+                    self.diagnostics.display()
 
 if __name__ == "__main__":
     app = EmployeeAttendanceApp()
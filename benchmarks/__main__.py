@@ -0,0 +1,168 @@
+# benchmarks/__main__.py
+"""Run the hot-path benchmark suite: python -m benchmarks --help"""
+import os
+import re
+import sys
+import json
+import shutil
+import inspect
+import argparse
+import platform
+import tempfile
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+DEFAULT_BASELINE = BENCH_DIR / "results" / "baseline.json"
+DEFAULT_DATA_DIR = BENCH_DIR / ".data"
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def discover(modules, pattern=None):
+    """Yield (name, class) for every benchmark class with at least one time_* method."""
+    for module in modules:
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            methods = [m for m in dir(cls) if m.startswith("time_")]
+            if pattern:
+                methods = [m for m in methods if re.search(pattern, f"{cls.__name__}.{m}")]
+            if methods:
+                yield cls, sorted(methods)
+
+
+def run_suite(modules, repeat, pattern=None):
+    """Time every benchmark and return {name: stats}."""
+    results = {}
+    for cls, methods in discover(modules, pattern):
+        instance = cls()
+        if hasattr(instance, "setup"):
+            instance.setup()
+        cls_repeat = getattr(cls, "repeat", repeat)
+        for method_name in methods:
+            name = f"{cls.__module__.rsplit('.', 1)[-1]}.{cls.__name__}.{method_name}"
+            method = getattr(instance, method_name)
+
+            # One untimed warm-up call, then the timed samples
+            method()
+            samples = []
+            for _ in range(cls_repeat):
+                start = time.perf_counter()
+                method()
+                samples.append(time.perf_counter() - start)
+
+            results[name] = {
+                'min': min(samples),
+                'median': statistics.median(samples),
+                'mean': statistics.fmean(samples),
+                'repeat': cls_repeat,
+            }
+            print(f"  {name:<70} median {results[name]['median'] * 1000:>10.2f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks whose median regressed beyond threshold x baseline."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = stats['median'] / base['median'] if base['median'] else float('inf')
+        marker = "REGRESSION" if ratio > threshold else ""
+        print(f"  {name:<70} {ratio:>6.2f}x {marker}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HRMS hot paths against synthetic data")
+    parser.add_argument("--employees", type=int, default=5000, help="Number of synthetic employees")
+    parser.add_argument("--years", type=int, default=3, help="Years of attendance history")
+    parser.add_argument("--posts", type=int, default=2000, help="Number of synthetic blog posts")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the generator")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="Where generated datasets are cached between runs")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per benchmark")
+    parser.add_argument("--filter", type=str, help="Only run benchmarks matching this regex")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Fail if a median exceeds baseline median by this factor")
+    parser.add_argument("--output", type=Path, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    from benchmarks.generator import generate_dataset
+    import streamlit as st
+    import streamlit.logger
+
+    # Keep bare-mode Streamlit quiet while page code runs outside `streamlit run`
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    scale_dir = args.data_dir / f"e{args.employees}_y{args.years}_p{args.posts}_s{args.seed}"
+    print(f"Preparing dataset in {scale_dir} ...", flush=True)
+    manifest = generate_dataset(str(scale_dir), employees=args.employees, years=args.years,
+                                posts=args.posts, seed=args.seed)
+    print(f"  rows: {manifest['rows']}")
+
+    # Benchmarks write to the Database, so run them against a throwaway copy
+    workdir = tempfile.mkdtemp(prefix="hrms_bench_")
+    shutil.copytree(scale_dir / "Database", Path(workdir) / "Database")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from benchmarks import hot_paths
+        print("Running benchmarks ...", flush=True)
+        results = run_suite([hot_paths], args.repeat, args.filter)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'dataset': manifest,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=4))
+
+    exit_code = 0
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['meta']['dataset'] != manifest:
+            print("Baseline was recorded at a different scale; skipping comparison.")
+        else:
+            print(f"Comparing against {args.baseline} (threshold {args.threshold}x) ...")
+            regressions = compare(results, baseline, args.threshold)
+            if regressions:
+                print(f"{len(regressions)} benchmark(s) regressed.")
+                exit_code = 1
+
+    if args.save_baseline:
+        if args.baseline.exists():
+            # Keep results for benchmarks that were filtered out of this run
+            previous = json.loads(args.baseline.read_text())
+            if previous['meta']['dataset'] == manifest:
+                report['results'] = {**previous['results'], **results}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=4))
+        print(f"Baseline saved to {args.baseline}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# benchmarks/generator.py
+import os
+import json
+import uuid
+from datetime import date
+import numpy as np
+import pandas as pd
+
+# Bump when the generated schema or distributions change so cached datasets are rebuilt
+GENERATOR_VERSION = 1
+
+DESIGNATIONS = np.array(['EMPLOYEE', 'TRAINER', 'HR', 'ADMIN'])
+DESIGNATION_WEIGHTS = [0.85, 0.10, 0.03, 0.02]
+
+# Fixed end date keeps the dataset independent of when the generator runs
+DEFAULT_END_DATE = date(2025, 3, 31)
+
+
+def employee_codes(employees):
+    """Deterministic employee codes, lowercase like the rest of the Database."""
+    return np.array([f"bm{i:05d}" for i in range(1, employees + 1)])
+
+
+def generate_users(rng, employees, end_date):
+    """Generate the users table."""
+    codes = employee_codes(employees)
+    dob = pd.Timestamp('1965-01-01') + pd.to_timedelta(rng.integers(0, 365 * 35, employees), unit='D')
+    doj = pd.Timestamp(end_date) - pd.to_timedelta(rng.integers(0, 365 * 10, employees), unit='D')
+    return pd.DataFrame({
+        'employee_code': codes,
+        'password': [f"pass{i}" for i in range(1, employees + 1)],
+        'name': [f"Employee {i:05d}" for i in range(1, employees + 1)],
+        'date_of_birth': dob.strftime('%Y-%m-%d'),
+        'date_of_joining': doj.strftime('%Y-%m-%d'),
+        'designation': rng.choice(DESIGNATIONS, size=employees, p=DESIGNATION_WEIGHTS),
+    })
+
+
+# Every HH:MM:SS string of the day, so formatting millions of times is a single take()
+_TIME_STRINGS = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)], dtype=object)
+
+
+def _format_seconds(seconds):
+    """Format an array of seconds-since-midnight as HH:MM:SS strings."""
+    return _TIME_STRINGS[np.asarray(seconds) % 86400]
+
+
+def generate_attendance(rng, users_df, years, end_date, presence=0.92, missed_punch=0.02):
+    """Generate attendance_logs for every employee over every working day (Mon-Sat)."""
+    days = pd.date_range(end=pd.Timestamp(end_date), periods=365 * years, freq='D')
+    days = days[days.dayofweek < 6]
+    codes = users_df['employee_code'].to_numpy()
+
+    # Dense employee x day grid, then drop the days nobody punched
+    code_idx = np.repeat(np.arange(len(codes)), len(days))
+    day_idx = np.tile(np.arange(len(days)), len(codes))
+    present = rng.random(code_idx.size) < presence
+    code_idx, day_idx = code_idx[present], day_idx[present]
+    n = code_idx.size
+
+    in_seconds = np.clip(rng.normal(9 * 3600 + 5 * 60, 12 * 60, n), 7 * 3600, 12 * 3600).astype(np.int64)
+    worked = np.clip(rng.normal(8.5 * 3600, 45 * 60, n), 3600, 12 * 3600).astype(np.int64)
+    out_seconds = in_seconds + worked
+    missing_out = rng.random(n) < missed_punch
+
+    designations = users_df['designation'].to_numpy()[code_idx]
+    threshold = np.where(np.isin(designations, ['TRAINER', 'HR']), 20, 15)
+    late = (in_seconds // 60) % 60 > threshold
+
+    out_time = _format_seconds(out_seconds).copy()
+    out_time[missing_out] = None
+    working_hours = np.round(worked / 3600, 2).astype(object)
+    working_hours[missing_out] = None
+    status = np.where(late, 'LA', np.where(missing_out, 'MIS', 'P'))
+
+    return pd.DataFrame({
+        'employee_code': codes[code_idx],
+        'date': days[day_idx].strftime('%Y-%m-%d'),
+        'in_time': _format_seconds(in_seconds),
+        'out_time': out_time,
+        'working_hours': working_hours,
+        'status': status,
+    })
+
+
+def generate_regularization_requests(rng, users_df, years, end_date, per_employee_year=4, pending=0.05):
+    """Generate regularization_requests with a small pending queue."""
+    codes = users_df['employee_code'].to_numpy()
+    n = int(len(codes) * years * per_employee_year)
+    request_dates = pd.Timestamp(end_date) - pd.to_timedelta(rng.integers(0, 365 * years, n), unit='D')
+    is_in = rng.random(n) < 0.5
+    requested = _format_seconds(rng.choice([9, 10], n) * 3600 + rng.choice([0, 15, 30, 45], n) * 60)
+    status = rng.choice(['Completed', 'Rejected', 'Approved'], size=n, p=[0.8, 0.15, 0.05]).astype(object)
+    status[rng.random(n) < pending] = 'Pending'
+    requested_in = np.where(is_in, requested, None)
+    requested_out = np.where(is_in, None, requested)
+
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'employee_code': rng.choice(codes, n),
+        'date': request_dates.strftime('%Y-%m-%d'),
+        'request_type': np.where(is_in, 'Correct In-Time', 'Correct Out-Time'),
+        'requested_in_time': requested_in,
+        'requested_out_time': requested_out,
+        'reason': rng.choice(['Forgot to punch', 'Client visit', 'Network issue', 'Biometric failure'], n),
+        'status': status,
+        'request_timestamp': (request_dates + pd.Timedelta(hours=18)).strftime('%Y-%m-%d %H:%M:%S.%f'),
+    })
+
+
+def generate_blogs(rng, users_df, posts, end_date, notice_share=0.2):
+    """Generate blogs, including multiline bodies that exercise the quoted-CSV parser."""
+    authors = users_df.sample(n=min(len(users_df), 50), random_state=int(rng.integers(0, 2**31)))
+    picks = rng.integers(0, len(authors), posts)
+    minutes = rng.integers(0, 60 * 24 * 365, posts)
+    posted = pd.Timestamp(end_date) - pd.to_timedelta(minutes, unit='m')
+    ids = [str(uuid.UUID(int=int(v))) for v in rng.integers(0, 2**63, posts, dtype=np.uint64)]
+    paragraphs = rng.integers(1, 5, posts)
+
+    return pd.DataFrame({
+        'id': ids,
+        'title': [f"Post {i}" for i in range(posts)],
+        'content': ["\n\n".join(["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * p) for p in paragraphs],
+        'author': authors['name'].to_numpy()[picks],
+        'author_id': authors['employee_code'].str.upper().to_numpy()[picks],
+        'date': posted.strftime('%Y-%m-%d %H:%M'),
+        'image_path': None,
+        'designation': authors['designation'].to_numpy()[picks],
+        'post_type': np.where(rng.random(posts) < notice_share, 'Notice', 'Blog'),
+    })
+
+
+def generate_dataset(root, employees=5000, years=3, posts=2000, seed=42, end_date=DEFAULT_END_DATE):
+    """Write a deterministic synthetic Database/ under root and return its manifest.
+
+    An existing dataset with an identical manifest is reused instead of regenerated.
+    """
+    database_dir = os.path.join(root, "Database")
+    manifest_path = os.path.join(database_dir, "manifest.json")
+    manifest = {
+        'generator_version': GENERATOR_VERSION,
+        'employees': employees,
+        'years': years,
+        'posts': posts,
+        'seed': seed,
+        'end_date': end_date.isoformat(),
+    }
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            existing = json.load(f)
+        if {k: v for k, v in existing.items() if k != 'rows'} == manifest:
+            return existing
+
+    os.makedirs(database_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    users_df = generate_users(rng, employees, end_date)
+    tables = {
+        'users': users_df,
+        'attendance_logs': generate_attendance(rng, users_df, years, end_date),
+        'regularization_requests': generate_regularization_requests(rng, users_df, years, end_date),
+        'blogs': generate_blogs(rng, users_df, posts, end_date),
+    }
+    for table_name, df in tables.items():
+        df.to_csv(os.path.join(database_dir, f"{table_name}.csv"), index=False)
+
+    manifest['rows'] = {table_name: len(df) for table_name, df in tables.items()}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
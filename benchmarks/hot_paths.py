@@ -0,0 +1,332 @@
+# benchmarks/hot_paths.py
+# asv-style suite: each class is set up once, then every time_* method is timed.
+# Benchmarks run from a scratch copy of the synthetic Database/ (see generator.py),
+# so methods are free to write to it.
+from datetime import date, time
+import pandas as pd
+import streamlit as st
+
+# Last full month of the synthetic dataset (generator.DEFAULT_END_DATE)
+BENCH_YEAR, BENCH_MONTH = 2025, 3
+
+
+def _employee_codes():
+    return pd.read_csv("Database/users.csv", usecols=['employee_code'])['employee_code'].tolist()
+
+
+class LoadTable:
+    def setup(self):
+        from pages import attendance_new
+        self.load_table = attendance_new.load_table
+
+    def time_load_attendance_logs(self):
+        self.load_table('attendance_logs')
+
+    def time_load_users(self):
+        self.load_table('users')
+
+    def time_load_regularization_requests(self):
+        self.load_table('regularization_requests')
+
+
+class RecordAttendance:
+    # Every call consumes one employee, so keep the repeat count bounded
+    repeat = 5
+
+    def setup(self):
+        from pages.attendance_new import AttendancePage
+        self.page = AttendancePage()
+        codes = _employee_codes()
+        reserve = self.repeat + 1
+
+        # IN punches use employees without a record for today
+        self.in_codes = iter(codes[:reserve])
+
+        # OUT punches need an open IN record, so seed them directly
+        self.out_codes = codes[-reserve:]
+        seeded = pd.DataFrame({
+            'employee_code': self.out_codes,
+            'date': date.today().strftime('%Y-%m-%d'),
+            'in_time': '09:00:00',
+            'out_time': None,
+            'working_hours': None,
+            'status': 'MIS',
+        })
+        seeded.to_csv("Database/attendance_logs.csv", mode='a', header=False, index=False)
+        self.out_codes = iter(self.out_codes)
+
+    def time_punch_in(self):
+        st.session_state['employee_code'] = next(self.in_codes)
+        self.page.record_attendance("IN")
+
+    def time_punch_out(self):
+        st.session_state['employee_code'] = next(self.out_codes)
+        self.page.record_attendance("OUT")
+
+
+class BuildCalendar:
+    def setup(self):
+        from pages.admin_panel import AdminPanelPage, load_table
+        self.page = AdminPanelPage()
+        attendance_logs_df = load_table('attendance_logs')
+        first_day = date(BENCH_YEAR, BENCH_MONTH, 1)
+        last_day = date(BENCH_YEAR, BENCH_MONTH + 1, 1)
+        date_mask = (attendance_logs_df['date'] >= first_day) & (attendance_logs_df['date'] < last_day)
+        self.month_df = attendance_logs_df[date_mask]
+        first_employee = self.month_df['employee_code'].iloc[0]
+        self.employee_df = self.month_df[self.month_df['employee_code'].eq(first_employee)]
+
+    def time_build_calendar_all_employees(self):
+        self.page.build_calendar_data(self.month_df, BENCH_MONTH, BENCH_YEAR)
+
+    def time_build_calendar_single_employee(self):
+        self.page.build_calendar_data(self.employee_df, BENCH_MONTH, BENCH_YEAR)
+
+    def time_styler_calendar_single_employee(self):
+        # The DataFrame.style rendering the calendars used before html_table, kept for comparison
+        from utils.calendar_view import calendar_grid, WEEKDAY_NAMES
+        from utils.styles import style_calendar
+        display_data, status_data = calendar_grid(self.employee_df, BENCH_MONTH, BENCH_YEAR)
+        df_display = pd.DataFrame(display_data, columns=WEEKDAY_NAMES)
+        df_status = pd.DataFrame(status_data, columns=WEEKDAY_NAMES)
+        df_display.style.apply(
+            lambda row: [style_calendar(val) for val in df_status.loc[row.name]], axis=1
+        ).set_properties(**{
+            'white-space': 'pre-wrap', 'text-align': 'left', 'vertical-align': 'top',
+            'border': '1px solid #e0e0e0', 'padding': '5px'
+        }).set_table_styles([
+            {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold')]},
+            {'selector': 'td', 'props': [('padding', '5px')]}
+        ]).to_html(escape=False)
+
+
+class RequestHistoryTable:
+    def setup(self):
+        from pages.user_settings import load_table
+        requests_df = load_table('regularization_requests')
+        self.requests_df = requests_df.head(500)
+        self.headers = ['Date', 'Request Type', 'Requested In-Time', 'Requested Out-Time', 'Reason', 'Status']
+
+    def time_render_table(self):
+        from utils.html_table import escape, render_table, request_status_badge
+        df = self.requests_df
+        rows = zip([escape(str(x)) for x in df['date']], [escape(str(x)) for x in df['request_type']],
+                   [escape(str(x)) for x in df['requested_in_time']], [escape(str(x)) for x in df['requested_out_time']],
+                   [escape(str(x)) for x in df['reason']], [request_status_badge(x) for x in df['status']])
+        render_table(self.headers, rows)
+
+    def time_dataframe_to_html(self):
+        # The DataFrame.to_html rendering the history used before html_table, kept for comparison
+        df = self.requests_df[['date', 'request_type', 'requested_in_time', 'requested_out_time', 'reason', 'status']].copy()
+        df['status'] = df['status'].apply(lambda val: f'<span style="color:green;font-weight:bold">{val}</span>')
+        df.columns = self.headers
+        df.to_html(escape=False, index=False)
+
+
+class CalendarRenderCache:
+    def setup(self):
+        from utils import render_cache
+        self.render_cache = render_cache
+        self.code = _employee_codes()[0]
+        render_cache.put(render_cache.calendar_key(self.code, BENCH_YEAR, BENCH_MONTH), "<table></table>")
+
+    def time_cached_calendar_view(self):
+        key = self.render_cache.calendar_key(self.code, BENCH_YEAR, BENCH_MONTH)
+        assert self.render_cache.get(key) is not None
+
+
+class RecomputeAttendance:
+    def setup(self):
+        from utils.shift_policy import get_shift_policy
+        self.attendance_df = pd.read_csv("Database/attendance_logs.csv", dtype={'in_time': str, 'out_time': str})
+        self.policy = get_shift_policy()
+
+    def time_recompute_attendance(self):
+        from utils.attendance_rules import recompute_attendance
+        recompute_attendance(self.attendance_df, self.policy)
+
+
+class ShiftPolicyLookup:
+    def setup(self):
+        from utils import shift_policy
+        self.shift_policy = shift_policy
+        self.code = _employee_codes()[-1]
+
+    def time_compile_policy(self):
+        self.shift_policy._policy_cache['key'] = None
+        self.shift_policy.get_shift_policy()
+
+    def time_punch_status(self):
+        from utils.attendance_rules import punch_status
+        punch_status(self.code, '09:17:00', '18:02:00')
+
+
+class GenerateReports:
+    # A full month for every employee per sample
+    repeat = 1
+
+    def setup(self):
+        from utils import report_engine
+        self.report_engine = report_engine
+
+    def time_generate_monthly_reports(self):
+        self.report_engine.generate_monthly_reports(BENCH_YEAR, BENCH_MONTH, force=True)
+
+
+class AttendanceRollups:
+    def setup(self):
+        from utils import rollups
+        self.rollups = rollups
+        rollups.load_store()
+        code = _employee_codes()[0]
+        self.old_row = {'employee_code': code, 'date': '2025-03-31', 'in_time': '09:00:00',
+                        'working_hours': None, 'status': 'MIS'}
+        self.new_row = {**self.old_row, 'working_hours': 8.5, 'status': 'P'}
+
+    def time_rebuild_rollups(self):
+        self.rollups.rebuild()
+
+    def time_apply_punch(self):
+        # Net-zero pair so repeated samples leave the store unchanged
+        self.rollups.apply_changes([(None, self.old_row), (self.old_row, self.new_row), (self.new_row, None)])
+
+    def time_analytics_dashboard(self):
+        self.rollups.dashboard('2024-01-01', '2025-03-31')
+
+
+class ApproveRegularization:
+    # Renders the whole pending queue
+    repeat = 3
+
+    def setup(self):
+        from pages.admin_panel import AdminPanelPage
+        self.page = AdminPanelPage()
+
+    def time_approve_regularization_requests(self):
+        self.page.approve_regularization_requests()
+
+
+class RegularizationStore:
+    # Every create appends a request, so keep the repeat count bounded
+    repeat = 5
+
+    def setup(self):
+        from utils import regularization_store
+        self.store = regularization_store
+        self.code = _employee_codes()[0]
+        self.day = 1
+        # Build the indexes once; the timed calls measure indexed lookups
+        self.store.pending_requests()
+
+    def time_pending_requests(self):
+        self.store.pending_requests()
+
+    def time_requests_for_employee(self):
+        self.store.requests_for_employee(self.code)
+
+    def time_history_page(self):
+        self.store.history_page(self.code)
+
+    def time_mark_completed_nothing_approved(self):
+        self.store.mark_completed("nobody")
+
+    def time_submit_request(self):
+        # A new date each call, so every submission is queued rather than merged
+        self.day += 1
+        self.store.submit_request(self.code, date(BENCH_YEAR, BENCH_MONTH, self.day), "Correct Out-Time",
+                                  None, time(18, 0), "benchmark")
+
+    def time_submit_duplicate(self):
+        self.store.submit_request(self.code, date(BENCH_YEAR, BENCH_MONTH, 1), "Correct Out-Time",
+                                  None, time(18, 0), "benchmark")
+
+
+class BlogFeed:
+    def setup(self):
+        from pages.blog_notice import BlogNoticePage
+        from utils import post_feed
+        self.page = BlogNoticePage()
+        self.feed = post_feed
+        st.session_state['user_data'] = {'designation': 'HR'}
+        # A cursor halfway down the blog feed
+        _, self.deep_cursor = post_feed.feed_page('Blog', page_size=post_feed.post_count('Blog') // 2)
+
+    def time_display_posts(self):
+        self.page._display_posts()
+
+    def time_feed_page_deep(self):
+        self.feed.feed_page('Blog', self.deep_cursor)
+
+
+class NoticeBoard:
+    def setup(self):
+        from pages.blog_notice import BlogNoticePage
+        from utils import post_store
+        self.page = BlogNoticePage()
+        self.store = post_store
+        self.notice_count = post_store.post_count('Notice')
+        st.session_state['user_data'] = {'designation': 'HR'}
+
+    def time_render_board(self):
+        self.page._render_notice_board(self.notice_count)
+
+    def time_active_notices_uncached(self):
+        self.store._board['version'] = None
+        self.store.active_notices()
+
+
+class ProfilePhoto:
+    def setup(self):
+        from pages.user_profile import find_user_photo
+        self.find_user_photo = find_user_photo
+        codes = _employee_codes()
+        self.codes = codes[:100]
+
+    def time_find_100_photos(self):
+        for code in self.codes:
+            self.find_user_photo(code)
+
+
+class IPAllowlist:
+    def setup(self):
+        from utils.ip_utils import ip_in_allowed_list
+        self.ip_in_allowed_list = ip_in_allowed_list
+        self.clients = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+
+    def time_check_1000_clients(self):
+        for ip in self.clients:
+            self.ip_in_allowed_list(ip)
+
+
+class PostSearch:
+    def setup(self):
+        from utils import search_index
+        self.search = search_index
+        search_index.rebuild()
+
+    def time_search_selective(self):
+        self.search.search("post 19")
+
+    def time_search_every_post(self):
+        # Every generated post has the same body, so this ranks all of them
+        self.search.search("lorem ipsum")
+
+    def time_rebuild(self):
+        self.search.rebuild()
+
+
+class VerifyLogin:
+    def setup(self):
+        from pages import login_page
+        self.login_page = login_page
+        self.page = login_page.LoginPage()
+        codes = _employee_codes()
+        self.code = codes[len(codes) // 2]
+        self.password = f"pass{len(codes) // 2 + 1}"
+
+    def time_verify_login_cold(self):
+        self.login_page._table_cache.clear()
+        assert self.page.verify_login(self.code, self.password)
+
+    def time_verify_login_warm(self):
+        assert self.page.verify_login(self.code, self.password)
@@ -0,0 +1,275 @@
+# benchmarks/load_test.py
+"""Concurrent-session load test: python -m benchmarks.load_test --help
+
+Drives app.py through streamlit.testing.v1.AppTest with many simulated
+employees that log in, punch IN/OUT, submit a regularization request and
+open their calendar at the same moment (the 9:00 AM rush). Each session runs
+in its own thread, which is how a single `streamlit run` server executes
+concurrent sessions, so read-modify-write races on the CSV store surface the
+same way they do in production.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+DEFAULT_DATA_DIR = BENCH_DIR / ".data"
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# Marker placed in every regularization reason so requests from this run can be counted
+REASON_MARKER = "load-test"
+
+
+def install_shared_runtime():
+    """Let many AppTest instances run at once in one process.
+
+    AppTest installs a mock Runtime singleton before every run and clears it
+    afterwards, which breaks any other session that is still mid-run. Install
+    one shared mock runtime up front and point AppTest at a throwaway holder
+    so its per-run setup/teardown no longer touches the real singleton.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    class _RuntimeHolder:
+        _instance = None
+
+    app_test.Runtime = _RuntimeHolder
+
+    # AppTest toggles this per run; concurrent toggles would race, so pin it
+    config.set_option("global.appTest", True)
+
+
+class SessionResult:
+    def __init__(self, employee_code):
+        self.employee_code = employee_code
+        self.latencies = {}
+        self.errors = {}
+        self.completed = set()
+
+
+def _timed(result, op_name, func):
+    """Run one user action, recording its latency and any script exception."""
+    start = time.perf_counter()
+    try:
+        at = func()
+        if at is not None and len(at.exception):
+            raise RuntimeError(at.exception[0].value)
+        result.completed.add(op_name)
+    except Exception as e:
+        result.errors[op_name] = str(e)
+    finally:
+        result.latencies[op_name] = time.perf_counter() - start
+
+
+def run_session(app_path, employee_code, password, barrier, think_time, timeout):
+    """One simulated employee: login, IN, calendar, regularization, OUT."""
+    from streamlit.testing.v1 import AppTest
+
+    result = SessionResult(employee_code)
+    at = AppTest.from_file(str(app_path), default_timeout=timeout)
+
+    def click(buttons, label):
+        return next(b for b in buttons if b.label == label).click().run()
+
+    def login():
+        at.run()
+        at.text_input[0].input(employee_code)
+        at.text_input[1].input(password)
+        return click(at.button, "Login")
+
+    def open_calendar():
+        # Switching month forces the calendar to be rebuilt
+        return at.selectbox(key="month_select").select_index(0).run()
+
+    def submit_regularization():
+        click(at.sidebar.button, "User Settings")
+        at.text_area[0].input(f"{REASON_MARKER} {employee_code}")
+        return click(at.button, "Submit Request")
+
+    def punch_out():
+        click(at.sidebar.button, "Employee Attendance")
+        return at.button(key="out_button").click().run()
+
+    _timed(result, "login", login)
+
+    # Release every session at once for the punch-in spike
+    barrier.wait()
+    if "login" not in result.completed or not at.session_state["logged_in"]:
+        shown = "; ".join(e.value for e in at.error) or "login rejected"
+        result.errors.setdefault("login", shown)
+        return result
+    _timed(result, "punch_in", lambda: at.button(key="in_button").click().run())
+    time.sleep(think_time)
+    _timed(result, "open_calendar", open_calendar)
+    time.sleep(think_time)
+    _timed(result, "submit_regularization", submit_regularization)
+    time.sleep(think_time)
+    _timed(result, "punch_out", punch_out)
+    return result
+
+
+def count_lost_updates(results):
+    """Compare what sessions believe they wrote with what the CSV store holds."""
+    import pandas as pd
+
+    today = date.today().strftime('%Y-%m-%d')
+    logs = pd.read_csv("Database/attendance_logs.csv", dtype=str)
+    logs = logs[logs['date'].eq(today)]
+    rows_by_code = logs.groupby(logs['employee_code'].str.lower())
+
+    requests = pd.read_csv("Database/regularization_requests.csv", dtype=str)
+    run_requests = requests[requests['reason'].fillna('').str.startswith(REASON_MARKER)]
+    submitted_codes = set(run_requests['reason'].str.split().str[-1])
+
+    lost = {'punch_in': 0, 'punch_out': 0, 'regularization': 0}
+    duplicate_rows = 0
+    for result in results:
+        code = result.employee_code.lower()
+        rows = rows_by_code.get_group(code) if code in rows_by_code.groups else logs.iloc[0:0]
+        duplicate_rows += max(len(rows) - 1, 0)
+        if "punch_in" in result.completed and rows['in_time'].isna().all():
+            lost['punch_in'] += 1
+        if "punch_out" in result.completed and rows['out_time'].isna().all():
+            lost['punch_out'] += 1
+        if "submit_regularization" in result.completed and result.employee_code not in submitted_codes:
+            lost['regularization'] += 1
+
+    return {
+        'lost_updates': lost,
+        'duplicate_attendance_rows': duplicate_rows,
+        'duplicate_request_ids': int(requests['id'].duplicated().sum()),
+    }
+
+
+def summarize(results, wall_time):
+    """Throughput and latency percentiles per operation."""
+    operations = {}
+    for op_name in ("login", "punch_in", "open_calendar", "submit_regularization", "punch_out"):
+        samples = sorted(r.latencies[op_name] for r in results if op_name in r.latencies)
+        if not samples:
+            continue
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        operations[op_name] = {
+            'count': len(samples),
+            'errors': sum(1 for r in results if op_name in r.errors),
+            'p50_ms': round(pct(0.50), 1),
+            'p90_ms': round(pct(0.90), 1),
+            'p99_ms': round(pct(0.99), 1),
+            'max_ms': round(samples[-1] * 1000, 1),
+            'mean_ms': round(statistics.fmean(samples) * 1000, 1),
+        }
+    total_ops = sum(op['count'] for op in operations.values())
+    return {
+        'sessions': len(results),
+        'wall_time_s': round(wall_time, 2),
+        'throughput_ops_per_s': round(total_ops / wall_time, 2) if wall_time else 0.0,
+        'operations': operations,
+    }
+
+
+def prepare_workdir(args):
+    """Scratch directory with a copy of the synthetic Database and the app's static assets."""
+    from benchmarks.generator import generate_dataset
+
+    scale_dir = args.data_dir / f"e{args.employees}_y{args.years}_p{args.posts}_s{args.seed}"
+    generate_dataset(str(scale_dir), employees=args.employees, years=args.years,
+                     posts=args.posts, seed=args.seed)
+
+    workdir = Path(tempfile.mkdtemp(prefix="hrms_load_"))
+    shutil.copytree(scale_dir / "Database", workdir / "Database")
+    shutil.copytree(REPO_ROOT / "artifacts", workdir / "artifacts")
+    shutil.copytree(REPO_ROOT / "config", workdir / "config")
+    return workdir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent employees against app.py")
+    parser.add_argument("--sessions", type=int, default=300, help="Number of simulated employees")
+    parser.add_argument("--employees", type=int, help="Synthetic employees to generate (default: --sessions)")
+    parser.add_argument("--years", type=int, default=1, help="Years of attendance history to generate")
+    parser.add_argument("--posts", type=int, default=200, help="Number of synthetic blog posts")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the generator")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="Where generated datasets are cached between runs")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds to pause between actions")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-action script timeout in seconds")
+    parser.add_argument("--output", type=Path, help="Also write the report to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory for inspection")
+    args = parser.parse_args()
+    args.employees = max(args.employees or args.sessions, args.sessions)
+
+    import streamlit as st
+    import streamlit.logger
+
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+    install_shared_runtime()
+
+    # The gate would otherwise resolve every session to the same local address anyway
+    os.environ["IP_RESTRICTION_ENABLED"] = "false"
+
+    print(f"Preparing {args.employees} employees ...", flush=True)
+    workdir = prepare_workdir(args)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import pandas as pd
+        users = pd.read_csv("Database/users.csv", dtype=str).head(args.sessions)
+        barrier = threading.Barrier(len(users))
+
+        print(f"Running {len(users)} concurrent sessions ...", flush=True)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            futures = [
+                pool.submit(run_session, REPO_ROOT / "app.py", row.employee_code, row.password,
+                            barrier, args.think_time, args.timeout)
+                for row in users.itertuples()
+            ]
+            results = [f.result() for f in futures]
+        wall_time = time.perf_counter() - start
+
+        report = summarize(results, wall_time)
+        report.update(count_lost_updates(results))
+        report['errors'] = sorted({f"{op}: {e}" for r in results for op, e in r.errors.items()})[:20]
+    finally:
+        os.chdir(previous_cwd)
+        if args.keep:
+            print(f"Scratch directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
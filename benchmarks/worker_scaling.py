@@ -0,0 +1,122 @@
+# benchmarks/worker_scaling.py
+"""Punch throughput across app worker processes: python -m benchmarks.worker_scaling --help
+
+`run.py --workers N` runs N app processes against one Database. This splits
+a group of employees over N processes that each punch IN for all of theirs
+and then OUT, all at once, and reports punches per second for every N along
+with any punch that went missing or produced a second row for the same day.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from datetime import date
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+DEFAULT_DATA_DIR = BENCH_DIR / ".data"
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def _worker(workdir, codes, barrier, results):
+    """One app process: punch every employee IN, then OUT."""
+    os.chdir(workdir)
+    import streamlit as st
+    from pages.attendance_new import AttendancePage
+
+    page = AttendancePage()
+    barrier.wait()
+    start = time.perf_counter()
+    for punch in ("IN", "OUT"):
+        for code in codes:
+            st.session_state['employee_code'] = code
+            page.record_attendance(punch)
+    results.put(time.perf_counter() - start)
+
+
+def run_round(scale_dir, codes, workers):
+    """Punch codes from `workers` processes against a fresh copy of the dataset."""
+    import pandas as pd
+
+    workdir = Path(tempfile.mkdtemp(prefix="hrms_workers_"))
+    try:
+        shutil.copytree(scale_dir / "Database", workdir / "Database")
+        shutil.copytree(REPO_ROOT / "config", workdir / "config")
+
+        barrier = multiprocessing.Barrier(workers + 1)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_worker, args=(str(workdir), codes[i::workers], barrier, results))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for process in processes:
+            process.join()
+        wall_time = time.perf_counter() - start
+        slowest = max(results.get() for _ in processes)
+
+        logs = pd.read_csv(workdir / "Database" / "attendance_logs.csv", dtype=str)
+        today = logs[logs['date'].eq(date.today().strftime('%Y-%m-%d'))]
+        punched = set(today['employee_code'].str.lower())
+        closed = set(today.loc[today['out_time'].notna(), 'employee_code'].str.lower())
+        expected = {code.lower() for code in codes}
+        return {
+            'workers': workers,
+            'punches': 2 * len(codes),
+            'wall_time_s': round(wall_time, 2),
+            'punches_per_s': round(2 * len(codes) / slowest, 1) if slowest else 0.0,
+            'lost_punch_in': len(expected - punched),
+            'lost_punch_out': len(expected - closed),
+            'duplicate_rows': int(today['employee_code'].str.lower().duplicated().sum()),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure punch throughput with 1..N app worker processes")
+    parser.add_argument("--workers", type=str, default="1,2,4", help="Comma-separated worker counts to try")
+    parser.add_argument("--punchers", type=int, default=200, help="Employees punching IN and OUT in each round")
+    parser.add_argument("--employees", type=int, default=5000, help="Synthetic employees to generate")
+    parser.add_argument("--years", type=int, default=1, help="Years of attendance history to generate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the generator")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="Where generated datasets are cached between runs")
+    parser.add_argument("--output", type=Path, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from benchmarks.generator import generate_dataset
+
+    os.environ["IP_RESTRICTION_ENABLED"] = "false"
+    scale_dir = args.data_dir / f"e{args.employees}_y{args.years}_p0_s{args.seed}"
+    print(f"Preparing {args.employees} employees ...", flush=True)
+    generate_dataset(str(scale_dir), employees=args.employees, years=args.years, posts=0, seed=args.seed)
+    codes = pd.read_csv(scale_dir / "Database" / "users.csv", dtype=str)['employee_code'].head(args.punchers).tolist()
+
+    report = {'cpus': os.cpu_count(), 'rounds': []}
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = run_round(scale_dir, codes, workers)
+        report['rounds'].append(result)
+        print(f"  workers={workers:<3} {result['punches_per_s']:>8.1f} punches/s  "
+              f"lost IN={result['lost_punch_in']} OUT={result['lost_punch_out']} "
+              f"duplicates={result['duplicate_rows']}", flush=True)
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=4))
+    lost = any(r['lost_punch_in'] or r['lost_punch_out'] or r['duplicate_rows'] for r in report['rounds'])
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
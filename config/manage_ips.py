@@ -1,34 +1,29 @@
-import json
-import os
+import sys
 import argparse
+from pathlib import Path
 
-CONFIG_PATH = "ip_config.json"
+# Works from any directory: the config service resolves ip_config.json next to this script
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils import config_service
 
 def load_config():
     """Load the IP configuration from file"""
-    if not os.path.exists(CONFIG_PATH):
-        return {"allowed_ips": ["127.0.0.1"], "description": "List of IP addresses allowed to access the application"}
-    
-    try:
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading configuration: {e}")
-        return {"allowed_ips": ["127.0.0.1"], "description": "List of IP addresses allowed to access the application"}
+    return config_service.get_config()
 
-def save_config(config):
-    """Save the configuration to file"""
+def save_config(change):
+    """Apply change to the configuration file"""
     try:
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(config, f, indent=4)
+        config_service.update(change)
         print("Configuration saved successfully.")
     except Exception as e:
         print(f"Error saving configuration: {e}")
 
 def list_ips():
     """List all allowed IP addresses"""
-    config = load_config()
-    allowed_ips = config.get("allowed_ips", [])
+    allowed_ips = load_config().allowed_ips
     
     print("\nAllowed IP Addresses:")
     print("---------------------")
@@ -38,30 +33,20 @@ def list_ips():
 
 def add_ip(ip):
     """Add an IP address to the allowed list"""
-    config = load_config()
-    allowed_ips = config.get("allowed_ips", [])
-    
-    if ip in allowed_ips:
+    if ip in load_config().allowed_set:
         print(f"IP address {ip} is already in the allowed list.")
         return
     
-    allowed_ips.append(ip)
-    config["allowed_ips"] = allowed_ips
-    save_config(config)
+    save_config(lambda config: config.setdefault("allowed_ips", []).append(ip))
     print(f"Added IP address: {ip}")
 
 def remove_ip(ip):
     """Remove an IP address from the allowed list"""
-    config = load_config()
-    allowed_ips = config.get("allowed_ips", [])
-    
-    if ip not in allowed_ips:
+    if ip not in load_config().allowed_set:
         print(f"IP address {ip} is not in the allowed list.")
         return
     
-    allowed_ips.remove(ip)
-    config["allowed_ips"] = allowed_ips
-    save_config(config)
+    save_config(lambda config: config["allowed_ips"].remove(ip))
     print(f"Removed IP address: {ip}")
 
 def main():
@@ -3,21 +3,23 @@ import pandas as pd
 from datetime import datetime, date
 import calendar, time
 import os
-from utils.styles import style_calendar
 from utils.helpers import add_footer
-from functools import lru_cache
 import numpy as np
-import json
 from utils.ip_utils import get_allowed_ips, is_valid_ip
+from utils import config_service
 import ipaddress
+from utils.profiler import profile_table_io, span
+from utils import attendance_rules
+from utils import export
+from utils import calendar_view
+from utils import report_engine
+from utils import rollups
+from utils import render_cache
+from utils import regularization_store
+from utils import change_bus
+from utils import attendance_store
 
-@lru_cache(maxsize=128)
-def format_time_12h(time_obj):
-    """Format time object to 12-hour format string with caching."""
-    if pd.isna(time_obj):
-        return ''
-    return time_obj.strftime('%I:%M %p')
-
+@profile_table_io("load")
 def load_table(table_name):
     """Load a table from a CSV file in the 'Database' folder."""
     try:
@@ -42,11 +44,13 @@ def load_table(table_name):
         st.error(f"Error loading table {table_name}: {e}")
         return pd.DataFrame()
 
+@profile_table_io("save")
 def save_table(table_name, df):
     """Save a DataFrame to a CSV file in the 'Database' folder."""
     try:
         # Save to CSV file
         df.to_csv(f"Database/{table_name}.csv", index=False)
+        change_bus.publish(table_name)
     except Exception as e:
         st.error(f"Error saving table {table_name}: {e}")
 
@@ -55,20 +59,6 @@ def clear_cache(table_name=None):
     # Clear Streamlit's cache_data
     st.cache_data.clear()
 
-# Constants for reusable styles
-CALENDAR_STYLE = {
-    'white-space': 'pre-wrap', 
-    'text-align': 'left', 
-    'vertical-align': 'top',
-    'border': '1px solid #e0e0e0',
-    'padding': '5px'
-}
-
-CALENDAR_TABLE_STYLES = [
-    {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold')]},
-    {'selector': 'td', 'props': [('padding', '5px')]}
-]
-
 class AdminPanelPage:
     def __init__(self):
         # Initialize cache for expensive computations
@@ -86,7 +76,6 @@ class AdminPanelPage:
         
         # Load data once
         users_df = load_table('users')
-        attendance_logs_df = load_table('attendance_logs')
         
         # Get employee options efficiently with caching
         employee_options = self.get_employee_options(users_df)
@@ -119,117 +108,46 @@ class AdminPanelPage:
                 key="admin_year_select"
             )
             
-        # Calculate date ranges once
         month_num = list(calendar.month_name).index(month)
-        first_day = datetime(year, month_num, 1).date()
-        last_day = datetime(year, month_num, calendar.monthrange(year, month_num)[1]).date()
+        employee_code = employee_options[selected_employee] if selected_employee != "All Employees" else "all"
         
-        # Filter attendance logs more efficiently
-        date_mask = (attendance_logs_df['date'] >= first_day) & (attendance_logs_df['date'] <= last_day)
-        filtered_df = attendance_logs_df[date_mask]
-        
-        # Filter for specific employee if selected
-        if selected_employee != "All Employees":
-            employee_code = employee_options[selected_employee]
-            emp_mask = filtered_df['employee_code'].eq(employee_code)
-            filtered_df = filtered_df[emp_mask]
+        def render_calendar():
+            # Calculate date ranges once
+            first_day = datetime(year, month_num, 1).date()
+            last_day = datetime(year, month_num, calendar.monthrange(year, month_num)[1]).date()
+            
+            # Filter attendance logs more efficiently
+            attendance_logs_df = load_table('attendance_logs')
+            date_mask = (attendance_logs_df['date'] >= first_day) & (attendance_logs_df['date'] <= last_day)
+            filtered_df = attendance_logs_df[date_mask]
             
-        # Build calendar data more efficiently
-        calendar_data = self.build_calendar_data(filtered_df, month_num, year)
+            # Filter for specific employee if selected
+            if employee_code != "all":
+                emp_mask = filtered_df['employee_code'].eq(employee_code)
+                filtered_df = filtered_df[emp_mask]
+                
+            # Build calendar data more efficiently
+            with span("render", "admin_calendar"):
+                return self.build_calendar_data(filtered_df, month_num, year)
+        
+        # Unchanged data is served from the shared render cache without touching the table
+        calendar_html = render_cache.get_or_render(
+            render_cache.calendar_key(employee_code, year, month_num), render_calendar)
         
         # Display the calendar
         st.subheader(f"Calendar for {month} {year}")
-        st.write(calendar_data.to_html(escape=False), unsafe_allow_html=True)
+        st.write(calendar_html, unsafe_allow_html=True)
     
     def build_calendar_data(self, filtered_df, month_num, year):
-        """Build calendar display data without caching to avoid pickling issues."""
-        month_calendar = calendar.monthcalendar(year, month_num)
-        weekday_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        
-        # Pre-generate templates for efficiency
-        DATE_DISPLAY_TEMPLATE = '<div style="font-size:1.2em; font-weight:bold; background-color:#f0f0f0; border-radius:50%; width:25px; height:25px; display:inline-block; text-align:center; line-height:25px; margin-bottom:5px;">{}</div>'
-        
-        # Convert filtered_df to a nested dictionary for faster lookup
-        attendance_data = {}
-        for _, record in filtered_df.iterrows():
-            date_day = record['date'].day
-            emp_code = record['employee_code']
-            
-            if emp_code not in attendance_data:
-                attendance_data[emp_code] = {}
-            
-            attendance_data[emp_code][date_day] = record
-        
-        # Build display and status data
-        display_data, status_data = [], []
-        for week in month_calendar:
-            week_display, week_status = [], []
-            for day in week:
-                if day == 0:
-                    week_display.append("")
-                    week_status.append("")
-                else:
-                    # Aggregate attendance for all users on this day
-                    day_records = []
-                    for emp in attendance_data:
-                        if day in attendance_data[emp]:
-                            day_records.append(attendance_data[emp][day])
-                    
-                    if day_records:
-                        # Create a consolidated view if there are multiple employees
-                        date_display = DATE_DISPLAY_TEMPLATE.format(day)
-                        
-                        if len(day_records) == 1:
-                            # Single employee case
-                            rec = day_records[0]
-                            in_time = format_time_12h(rec['in_time']) if pd.notna(rec['in_time']) else ''
-                            out_time = format_time_12h(rec['out_time']) if pd.notna(rec['out_time']) else ''
-                            status = rec.get('status', 'A')  # Get status from record, default to A if not present
-                            
-                            cell_text = f"{date_display}<br>In: {in_time}<br>Out: {out_time}<br>Status: {status}"
-                            cell_status = status
-                        else:
-                            # Multiple employees case
-                            cell_text = f"{date_display}<br>{len(day_records)} employees checked in"
-                            # Use aggregated status - present if any employee is present
-                            statuses = [rec.get('status', 'A') for rec in day_records]
-                            cell_status = 'P' if 'P' in statuses else 'MIS' if 'MIS' in statuses else 'A'
-                    else:
-                        date_display = DATE_DISPLAY_TEMPLATE.format(day)
-                        cell_text = f"{date_display}<br>No Record"
-                        cell_status = "A"
-                    
-                    week_display.append(cell_text)
-                    week_status.append(cell_status)
-            
-            display_data.append(week_display)
-            status_data.append(week_status)
-        
-        # Create and style DataFrames
-        df_display = pd.DataFrame(display_data, columns=weekday_names)
-        df_status = pd.DataFrame(status_data, columns=weekday_names)
-        
-        # Apply styles more efficiently
-        styled_df = df_display.style.apply(
-            lambda row: [style_calendar(val) for val in df_status.loc[row.name]], 
-            axis=1
-        ).set_properties(**CALENDAR_STYLE).set_table_styles(CALENDAR_TABLE_STYLES)
-        
-        return styled_df
+        """Build the calendar HTML for the selected month."""
+        return calendar_view.calendar_html(filtered_df, month_num, year)
 
     def approve_regularization_requests(self):
         """Approve regularization requests with improved efficiency."""
         st.subheader("Approve Regularization Requests")
         
-        # Load data once
-        requests_df = load_table('regularization_requests')
-        
-        # Convert all employee codes to lowercase for consistency
-        requests_df['employee_code'] = requests_df['employee_code'].str.lower()
-        
-        # Filter for pending requests more efficiently
-        pending_mask = requests_df['status'].eq('Pending')
-        pending_requests = requests_df[pending_mask]
+        # The pending queue comes straight from the status index
+        pending_requests = regularization_store.pending_requests()
         
         if pending_requests.empty:
             st.info("No pending regularization requests.")
@@ -238,10 +156,11 @@ class AdminPanelPage:
         # Group requests by employee for better organization
         employees_with_requests = pending_requests['employee_code'].unique()
         
+        # Get employee names for better display
+        users_df = load_table('users')
+        users_df['employee_code'] = users_df['employee_code'].str.lower()  # Convert to lowercase for comparison
+        
         for employee_code in employees_with_requests:
-            # Get employee name for better display
-            users_df = load_table('users')
-            users_df['employee_code'] = users_df['employee_code'].str.lower()  # Convert to lowercase for comparison
             emp_mask = users_df['employee_code'].eq(employee_code)
             employee_name = users_df.loc[emp_mask, 'name'].iloc[0] if emp_mask.any() else employee_code
             
@@ -255,6 +174,8 @@ class AdminPanelPage:
                     st.write(f"**Request ID:** {req['id']} | **Date:** {req['date']}")
                     st.write(f"**Request Type:** {req['request_type']} | **In-Time:** {req['requested_in_time'] or 'N/A'} | **Out-Time:** {req['requested_out_time'] or 'N/A'}")
                     st.write(f"**Reason:** {req['reason']}")
+                    if pd.notna(req['conflict']):
+                        st.warning(f"Conflict: {req['conflict']}")
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -269,69 +190,42 @@ class AdminPanelPage:
     def process_regularization_request(self, request, status):
         """Process a regularization request (approve or reject)."""
         try:
-            # Load required data
-            requests_df = load_table('regularization_requests')
-            attendance_logs_df = load_table('attendance_logs')
-            
-            # Update request status
-            req_mask = requests_df['id'].eq(request['id'])
-            requests_df.loc[req_mask, 'status'] = status
-            
-            if status == "Approved":
-                # Find if there's already a record for this date and employee
-                employee_code = request['employee_code'].lower()  # Convert to lowercase
-                request_date = request['date']
-                
-                # Convert existing employee codes to lowercase for comparison
-                attendance_logs_df['employee_code'] = attendance_logs_df['employee_code'].str.lower()
-                mask = (attendance_logs_df['employee_code'].eq(employee_code)) & (attendance_logs_df['date'].eq(request_date))
-                
-                if mask.any():
-                    # Update existing record based on request type
-                    if request['request_type'] == 'Correct In-Time' and pd.notna(request['requested_in_time']):
-                        attendance_logs_df.loc[mask, 'in_time'] = request['requested_in_time']
-                        
-                        # Update status and working hours if out_time exists
-                        if pd.notna(attendance_logs_df.loc[mask, 'out_time'].iloc[0]):
-                            attendance_logs_df.loc[mask, 'status'] = 'P'
-                            
-                            # Recalculate working hours
-                            in_time = request['requested_in_time']
-                            out_time = attendance_logs_df.loc[mask, 'out_time'].iloc[0]
-                            working_hours = self.calculate_working_hours(in_time, out_time)
-                            attendance_logs_df.loc[mask, 'working_hours'] = working_hours
-                        else:
-                            attendance_logs_df.loc[mask, 'status'] = 'MIS'
-                            
-                    elif request['request_type'] == 'Correct Out-Time' and pd.notna(request['requested_out_time']):
-                        attendance_logs_df.loc[mask, 'out_time'] = request['requested_out_time']
-                        
-                        # Update status and calculate working hours if in_time exists
-                        if pd.notna(attendance_logs_df.loc[mask, 'in_time'].iloc[0]):
-                            attendance_logs_df.loc[mask, 'status'] = 'P'
-                            
-                            # Calculate working hours
-                            in_time = attendance_logs_df.loc[mask, 'in_time'].iloc[0]
-                            out_time = request['requested_out_time']
-                            working_hours = self.calculate_working_hours(in_time, out_time)
-                            attendance_logs_df.loc[mask, 'working_hours'] = working_hours
-                else:
-                    # Create a new attendance record
-                    new_record = pd.DataFrame([{
-                        'employee_code': employee_code,  # Already lowercase
-                        'date': request_date,
-                        'in_time': request['requested_in_time'] if request['request_type'] == 'Correct In-Time' else None,
-                        'out_time': request['requested_out_time'] if request['request_type'] == 'Correct Out-Time' else None,
-                        'working_hours': None,
-                        'status': 'MIS'  # Will be updated if both in and out times are present
-                    }])
+            def apply_request(stored):
+                # The request as stored now, so a time the employee has just merged in is the one applied
+                employee_code = stored['employee_code'].lower()  # Convert to lowercase
+
+                def update_record(record):
+                    if record is None:
+                        # Create a new attendance record
+                        record = {
+                            'employee_code': employee_code,  # Already lowercase
+                            'date': stored['date'],
+                            'in_time': None,
+                            'out_time': None,
+                        }
                     
-                    # Append the new record
-                    attendance_logs_df = pd.concat([attendance_logs_df, new_record], ignore_index=True)
-            
-            # Save updates
-            save_table('regularization_requests', requests_df)
-            save_table('attendance_logs', attendance_logs_df)
+                    # Update the record based on request type
+                    record = dict(record)
+                    if stored['request_type'] == 'Correct In-Time' and pd.notna(stored['requested_in_time']):
+                        record['in_time'] = stored['requested_in_time']
+                    elif stored['request_type'] == 'Correct Out-Time' and pd.notna(stored['requested_out_time']):
+                        record['out_time'] = stored['requested_out_time']
+                    
+                    # Hours and status follow the shift policy, exactly as a punch or --recompute-attendance would
+                    recomputed = attendance_rules.recompute_attendance(pd.DataFrame([record])).iloc[0]
+                    record['working_hours'] = recomputed['working_hours']
+                    record['status'] = recomputed['status']
+                    return record
+                
+                # Only this employee's row for the date is rewritten, under the attendance file lock
+                attendance_store.upsert(employee_code, stored['date'], update_record)
+            
+            # The request must still be Pending when the store's lock is taken; another HR user
+            # may have processed it since this page was drawn
+            changed = regularization_store.update_status(
+                [request['id']], status, expected='Pending',
+                apply=apply_request if status == "Approved" else None
+            )
             
             # Clear all caches to ensure fresh data is loaded everywhere
             clear_cache()  # Clear all caches instead of just one
@@ -339,26 +233,17 @@ class AdminPanelPage:
             # Also clear Streamlit's cache_data
             st.cache_data.clear()
             
+            if not changed:
+                st.warning(f"Request {request['id']} was already processed.")
+                return
             st.success(f"Request {status.lower()} successfully!")
             st.rerun()
         except Exception as e:
             st.error(f"Error processing request: {e}")
     
     def calculate_working_hours(self, in_time, out_time):
-        """Calculate working hours between in_time and out_time efficiently."""
-        if pd.isna(in_time) or pd.isna(out_time):
-            return 0.0
-            
-        # Convert to datetime objects
-        in_time_dt = datetime.combine(datetime.min.date(), in_time)
-        out_time_dt = datetime.combine(datetime.min.date(), out_time)
-            
-        # Check if out_time is before in_time (overnight shift)
-        if out_time_dt < in_time_dt:
-            out_time_dt = datetime.combine(datetime.min.date() + pd.Timedelta(days=1), out_time)
-            
-        delta = out_time_dt - in_time_dt
-        return round(delta.total_seconds() / 3600, 2)
+        """Calculate working hours between in_time and out_time, including overnight shifts."""
+        return attendance_rules.working_hours(in_time, out_time)
 
     def manage_employees(self):
         """Manage employee information with improved efficiency."""
@@ -514,47 +399,173 @@ class AdminPanelPage:
         """Display the admin panel with improved UI organization."""
         st.title("Admin Panel")
         
-        tabs = st.tabs(["Attendance Overview", "Regularization Requests", "Manage Employees", "IP Management"])
+        tabs = st.tabs(["Attendance Overview", "Analytics", "Regularization Requests", "Manage Employees", "Reports", "Export", "IP Management"])
         
         with tabs[0]:
             self.check_all_attendance()
             
         with tabs[1]:
-            self.approve_regularization_requests()
+            self.attendance_analytics()
             
         with tabs[2]:
-            self.manage_employees()
+            self.approve_regularization_requests()
             
         with tabs[3]:
+            self.manage_employees()
+            
+        with tabs[4]:
+            self.monthly_reports()
+            
+        with tabs[5]:
+            self.export_attendance()
+            
+        with tabs[6]:
             self.ip_management()
     
+    def attendance_analytics(self):
+        """HR analytics from the incremental rollup store (no attendance_logs scan)."""
+        st.header("Attendance Analytics")
+        
+        today = date.today()
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input("From", value=today - pd.Timedelta(days=90), key="analytics_from")
+        with col2:
+            end_date = st.date_input("To", value=today, key="analytics_to")
+        
+        data = rollups.dashboard(start_date, end_date)
+        daily = data['daily']
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Average headcount", f"{daily['headcount'].mean():.0f}" if not daily.empty else "-")
+        col2.metric("Average working hours", f"{data['totals']['average_hours']:.2f}")
+        col3.metric("Late arrival rate", f"{data['totals']['late_rate']:.1%}")
+        
+        st.subheader("Daily Headcount")
+        st.line_chart(daily[['headcount']])
+        
+        st.subheader("Average Working Hours per Day")
+        st.line_chart(daily[['average_hours']])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Late Arrivals by Designation")
+            st.bar_chart(data['designations'][['late_rate']])
+            st.dataframe(data['designations'], use_container_width=True)
+        with col2:
+            st.subheader("Top MIS Offenders")
+            st.dataframe(data['mis_offenders'], use_container_width=True, hide_index=True)
+        
+        st.caption("Designation and offender figures cover all history; the charts follow the selected dates.")
+    
+    def monthly_reports(self):
+        """Generate and browse per-employee monthly reports built by the report engine."""
+        st.header("Monthly Reports")
+        
+        current_date = datetime.now()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            month = st.selectbox("Select Month:", list(calendar.month_name)[1:],
+                                 index=current_date.month - 1, key="report_month_select")
+        with col2:
+            year = st.selectbox("Select Year:", [current_date.year - 1, current_date.year, current_date.year + 1],
+                                index=1, key="report_year_select")
+        with col3:
+            workers = st.number_input("Worker processes", min_value=1, max_value=64,
+                                      value=report_engine.default_workers(), key="report_workers")
+        month_num = list(calendar.month_name).index(month)
+        
+        index = report_engine.load_index(year, month_num)
+        if index is None:
+            st.info("No reports generated for this month yet.")
+        elif not report_engine.is_fresh(index):
+            st.warning(f"Reports were generated at {index['generated_at']}; attendance has changed since.")
+        
+        if st.button("Generate Reports", key="generate_reports"):
+            progress_bar = st.progress(0.0, text="Starting workers...")
+            
+            def on_progress(done, total):
+                progress_bar.progress(done / total if total else 1.0, text=f"{done} / {total} employees")
+            
+            try:
+                index = report_engine.generate_monthly_reports(year, month_num, workers=int(workers),
+                                                               force=True, progress=on_progress)
+            except Exception as e:
+                st.error(f"Report generation failed: {e}")
+                return
+            st.success(f"Generated {len(index['employees'])} report(s) with {index['workers']} worker(s).")
+        
+        if index is None:
+            return
+        
+        summary_df = pd.DataFrame(index['employees'])
+        st.dataframe(summary_df, use_container_width=True, hide_index=True)
+        
+        if not summary_df.empty:
+            labels = (summary_df['name'] + " (" + summary_df['employee_code'].str.upper() + ")").tolist()
+            selected = st.selectbox("View calendar for:", labels, key="report_employee_select")
+            report = report_engine.load_report(year, month_num, summary_df['employee_code'][labels.index(selected)])
+            if report is not None:
+                st.write(report['calendar_html'], unsafe_allow_html=True)
+    
+    def export_attendance(self):
+        """Export detail or monthly summary attendance reports as CSV/XLSX."""
+        st.header("Export Attendance")
+        
+        users_df = load_table('users')
+        employee_options = self.get_employee_options(users_df)
+        
+        with st.form("export_form"):
+            today = date.today()
+            col1, col2 = st.columns(2)
+            with col1:
+                start_date = st.date_input("From", value=today.replace(day=1), key="export_from")
+                kind = st.radio("Report", ["Detailed", "Monthly summary"], key="export_kind", horizontal=True)
+            with col2:
+                end_date = st.date_input("To", value=today, key="export_to")
+                fmt = st.radio("Format", [f.upper() for f in export.export_formats()], key="export_format", horizontal=True)
+            selected = st.multiselect("Employees (leave empty for all):", list(employee_options.keys()), key="export_employees")
+            submitted = st.form_submit_button("Generate Export")
+        
+        if submitted:
+            if start_date > end_date:
+                st.error("The start date must not be after the end date.")
+                return
+            
+            # Drop the previous export before generating a new one
+            previous = st.session_state.pop('export_file', None)
+            if previous is not None:
+                previous.discard()
+            
+            kind_key = 'detail' if kind == "Detailed" else 'summary'
+            employee_codes = [employee_options[name] for name in selected] or None
+            with st.spinner("Generating export..."):
+                try:
+                    st.session_state['export_file'] = export.export_for_download(
+                        kind_key, fmt.lower(), start_date, end_date, employee_codes,
+                        file_name=f"attendance_{kind_key}_{start_date}_{end_date}.{fmt.lower()}")
+                except Exception as e:
+                    st.error(f"Export failed: {e}")
+                    return
+        
+        export_file = st.session_state.get('export_file')
+        if export_file is not None and os.path.exists(export_file.path):
+            st.success(f"Export ready: {export_file.rows} row(s).")
+            if export_file.downloadable:
+                # Only this session's page carries the button, so the file is behind the login and the IP allowlist
+                with open(export_file.path, "rb") as f:
+                    st.download_button("Download", data=f, file_name=export_file.file_name, mime=export_file.mime,
+                                       key="export_download")
+            else:
+                st.warning("This export is too large to download through the browser. Use "
+                           "`python run.py --export ... --export-output FILE` on the server instead.")
+    
     def ip_management(self):
         st.header("IP Access Management")
         st.info("This section allows you to manage which IP addresses can access the application.")
         
         # Load current IP addresses
-        config_path = "config/ip_config.json"
-        
-        # Create default config if it doesn't exist
-        if not os.path.exists("config"):
-            os.makedirs("config")
-            
-        if not os.path.exists(config_path):
-            default_config = {
-                "allowed_ips": ["127.0.0.1"],
-                "description": "List of IP addresses allowed to access the application"
-            }
-            with open(config_path, "w") as f:
-                json.dump(default_config, f, indent=4)
-                
-        # Load config
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                allowed_ips = config.get("allowed_ips", [])
-        except Exception as e:
-            st.error(f"Error loading IP configuration: {e}")
-            allowed_ips = ["127.0.0.1"]
+        allowed_ips = list(config_service.get_config().allowed_ips)
             
         # Display current IPs
         st.subheader("Currently Allowed IP Addresses")
@@ -590,10 +601,8 @@ class AdminPanelPage:
                 return
                 
             # Save to config
-            config["allowed_ips"] = new_ips
             try:
-                with open(config_path, "w") as f:
-                    json.dump(config, f, indent=4)
+                config_service.update(lambda config: config.update(allowed_ips=new_ips))
                 st.success("IP configuration saved successfully!")
             except Exception as e:
                 st.error(f"Error saving configuration: {e}")
@@ -614,7 +623,7 @@ class AdminPanelPage:
             #### Important Notes:
             - For security, only add trusted IP addresses
             - If someone's IP changes frequently, consider a VPN solution instead
-            - The application must be restarted for changes to take effect
+            - Changes take effect immediately, for every session and app process
             """)
 
         add_footer()
\ No newline at end of file
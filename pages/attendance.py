@@ -6,6 +6,7 @@ from utils.styles import style_calendar
 from utils.helpers import add_footer
 from functools import lru_cache
 import numpy as np
+from utils import change_bus
 
 # Global variables for performance
 _MIN_DATETIME = datetime.min
@@ -52,6 +53,7 @@ def load_table(table_name):
 def save_table(table_name, df):
     """Save a DataFrame to a CSV file in the 'Database' folder."""
     df.to_csv(f"Database/{table_name}.csv", index=False)
+    change_bus.publish(table_name)
 
 def clear_cache(table_name=None):
     """Clear Streamlit cache."""
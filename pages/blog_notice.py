@@ -1,21 +1,21 @@
 # pages/blog_notice.py
 import streamlit as st
-import pandas as pd
 import os
-from datetime import datetime
-import uuid
+from datetime import datetime, date, time, timedelta
 from utils.helpers import add_footer
-from functools import lru_cache
 from pathlib import Path
-
-# Global variables for performance
-_table_cache = {}
+from utils.html_table import escape
+from utils import post_feed
+from utils import post_store
+from utils import image_pipeline
+from utils import blob_store
+from utils import search_index
 
 # Cache for styled HTML
 _notice_style = """
 <div style="background-color: #ffeeee; padding: 15px; border-radius: 10px; border-left: 5px solid #ff6b6b; margin-bottom: 20px;">
-    <h3 style="color: #cc0000;">{title}</h3>
-    <p><strong>Posted by:</strong> {author} ({designation}) | <strong>Date:</strong> {date}</p>
+    <h3 style="color: #cc0000;">{pin}{title}</h3>
+    <p><strong>Posted by:</strong> {author} ({designation}) | <strong>Date:</strong> {date}{lifecycle}</p>
     <p>{content}</p>
 </div>
 """
@@ -28,58 +28,6 @@ _blog_style = """
 </div>
 """
 
-def load_table(table_name):
-    """Load a table from a CSV file in the 'Database' folder with caching."""
-    # Check cache first
-    if table_name in _table_cache:
-        return _table_cache[table_name].copy()
-    
-    try:
-        # Create file if it doesn't exist for blogs table
-        if table_name == 'blogs' and not os.path.exists(f"Database/{table_name}.csv"):
-            df = pd.DataFrame(columns=[
-                'id', 'title', 'content', 'author', 'author_id', 'date', 'image_path', 
-                'designation', 'post_type'
-            ])
-            df.to_csv(f"Database/{table_name}.csv", index=False)
-            _table_cache[table_name] = df.copy()
-            return df
-            
-        # Read the existing file
-        df = pd.read_csv(f"Database/{table_name}.csv")
-        
-        # Cache the result
-        _table_cache[table_name] = df.copy()
-        return df
-    except FileNotFoundError:
-        # Create an empty DataFrame with appropriate columns
-        if table_name == 'blogs':
-            df = pd.DataFrame(columns=[
-                'id', 'title', 'content', 'author', 'author_id', 'date', 'image_path', 
-                'designation', 'post_type'
-            ])
-            # Ensure directory exists
-            os.makedirs("Database", exist_ok=True)
-            df.to_csv(f"Database/{table_name}.csv", index=False)
-            _table_cache[table_name] = df.copy()
-            return df
-        return pd.DataFrame()
-
-def save_table(table_name, df):
-    """Save a DataFrame to a CSV file in the 'Database' folder and update cache."""
-    df.to_csv(f"Database/{table_name}.csv", index=False)
-    # Update cache
-    _table_cache[table_name] = df.copy()
-
-def clear_cache(table_name=None):
-    """Clear specific table cache or all caches."""
-    global _table_cache
-    if table_name:
-        if table_name in _table_cache:
-            del _table_cache[table_name]
-    else:
-        _table_cache = {}
-
 def ensure_directories():
     """Ensure all required directories exist."""
     Path("Database/blog_images").mkdir(parents=True, exist_ok=True)
@@ -104,77 +52,167 @@ class BlogNoticePage:
         add_footer()
     
     def _display_posts(self):
-        # Load blogs with caching
-        blogs_df = load_table("blogs")
+        # Counts come from the post store's (post_type, date) index
+        notice_count = post_feed.post_count('Notice')
+        blog_count = post_feed.post_count('Blog')
         
-        if blogs_df.empty:
+        if not notice_count and not blog_count:
             st.info("No posts yet. Be the first to share your thoughts!")
             return
         
-        # Use more efficient filtering with query
-        notices = blogs_df.query("post_type == 'Notice'").sort_values('date', ascending=False)
-        blogs = blogs_df.query("post_type == 'Blog'").sort_values('date', ascending=False)
+        query = st.text_input("🔍 Search posts", key="post_search", placeholder="Words or word beginnings, e.g. holi")
+        if query.strip():
+            self._render_search_results(query)
+            return
         
         # Display notices first with a distinct style
-        if not notices.empty:
+        if notice_count:
             st.markdown("## 📢 Important Notices")
-            self._render_posts(notices, is_notice=True)
+            self._render_notice_board(notice_count)
             
         # Display regular blog posts
-        if not blogs.empty:
+        if blog_count:
             st.markdown("## Blog Posts")
-            self._render_posts(blogs, is_notice=False)
+            self._render_feed('Blog', blog_count, is_notice=False)
+    
+    def _render_notice_board(self, notice_count):
+        """Render the current notices; expired and archived ones are in the full notice list."""
+        # Cached until a post changes or the next notice expires, so old notices cost nothing here
+        notices = post_store.active_notices()
+        if notices:
+            self._render_posts(notices, is_notice=True, key_prefix="board_")
+        else:
+            st.info("No current notices.")
+        
+        if st.toggle(f"Show all {notice_count} notices, including expired and archived", key="notice_show_all"):
+            self._render_feed('Notice', notice_count, is_notice=True)
+    
+    def _render_feed(self, post_type, total, is_notice=False):
+        """Render one page of a feed with Newer/Older navigation."""
+        # Cursors of the pages up to the current one, per feed
+        cursors_key = f"feed_cursors_{post_type}"
+        cursors = st.session_state.setdefault(cursors_key, [None])
+        
+        posts, next_cursor = post_feed.feed_page(post_type, cursors[-1])
+        self._render_posts(posts, is_notice)
+        
+        pages = -(-total // post_feed.FEED_PAGE_SIZE)
+        if pages > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if len(cursors) > 1 and st.button("← Newer", key=f"feed_newer_{post_type}"):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {len(cursors)} of {pages}")
+            with col3:
+                if next_cursor and st.button("Older →", key=f"feed_older_{post_type}"):
+                    cursors.append(next_cursor)
+                    st.rerun()
+    
+    def _render_search_results(self, query):
+        """Render the best matches for a search, notices and blogs together in rank order."""
+        try:
+            results = search_index.search(query)
+        except Exception as e:
+            st.error(f"Error searching posts: {e}")
+            return
+        
+        if not results:
+            st.info("No posts match your search.")
+            return
+        
+        st.caption(f"{len(results)} best match{'es' if len(results) != 1 else ''}")
+        for result in results:
+            label = "📢 Notice" if result['post_type'] == 'Notice' else "Blog"
+            # The snippet comes back escaped, with only the matched words marked up
+            st.markdown(
+                f"<strong>{escape(result['title'])}</strong>  \n"
+                f"<small>{label} | {escape(result['date'])}</small>  \n"
+                f"{result['snippet']}",
+                unsafe_allow_html=True
+            )
+            st.markdown("<hr>", unsafe_allow_html=True)
     
-    def _render_posts(self, posts_df, is_notice=False):
-        """Render a group of posts more efficiently."""
+    def _render_posts(self, posts, is_notice=False, key_prefix=""):
+        """Render a page of posts; images are loaded only for these posts.
+
+        key_prefix keeps button keys unique when a notice is on the board and in the full list.
+        """
         template = _notice_style if is_notice else _blog_style
+        is_hr = st.session_state.get('user_data', {}).get('designation', '').upper() == 'HR'
         
-        for _, post in posts_df.iterrows():
+        now = datetime.now().timestamp()
+        for post in posts:
             with st.container():
-                # Format post with template string - more efficient than f-strings
+                lifecycle = ''
+                if is_notice and post['archived']:
+                    lifecycle = ' | <strong>Archived</strong>'
+                elif is_notice and post['expires_at']:
+                    verb = "Expires" if post['expires_at'] > now else "Expired"
+                    lifecycle = f" | <strong>{verb}:</strong> {post_store.format_timestamp(post['expires_at'])}"
+                
+                # Post fields are user input, so they are escaped before going into the template
                 html = template.format(
-                    title=post['title'],
-                    author=post['author'],
-                    designation=post['designation'],
-                    date=post['date'],
-                    content=post['content']
+                    pin="📌 " if is_notice and post['pinned'] else '',
+                    lifecycle=lifecycle,
+                    title=escape(str(post['title'] or '')),
+                    author=escape(str(post['author'] or '')),
+                    designation=escape(str(post['designation'] or '')),
+                    date=escape(str(post['date'] or '')),
+                    content=escape(str(post['content'] or ''))
                 )
                 st.markdown(html, unsafe_allow_html=True)
                 
-                # Display image if it exists - more efficient path checking
-                image_path = post.get('image_path')
-                if pd.notna(image_path) and os.path.exists(image_path):
-                    st.image(image_path, width=400, use_container_width=False)
+                # Image bytes are cached per file version, so revisiting a page does not reread them
+                image = post_feed.post_image(post['image_path'])
+                if image is not None:
+                    st.image(image, width=400, use_container_width=False)
                 
                 # Delete button for HR users
-                is_hr = st.session_state.get('user_data', {}).get('designation', '').upper() == 'HR'
                 if is_hr:
                     post_type = "Notice" if is_notice else "Post"
-                    if st.button(f"Delete {post_type}", key=f"delete_{post_type.lower()}_{post['id']}"):
+                    if is_notice:
+                        self._render_notice_controls(post, key_prefix)
+                    if st.button(f"Delete {post_type}", key=f"{key_prefix}delete_{post_type.lower()}_{post['id']}"):
                         self._delete_post(post['id'])
                 
                 st.markdown("<hr>", unsafe_allow_html=True)
     
+    def _render_notice_controls(self, notice, key_prefix=""):
+        """Pin/unpin and archive/restore buttons for HR."""
+        col1, col2 = st.columns(2)
+        try:
+            with col1:
+                if st.button("Unpin" if notice['pinned'] else "Pin to top", key=f"{key_prefix}pin_{notice['id']}"):
+                    post_store.set_pinned(notice['id'], not notice['pinned'])
+                    st.rerun()
+            with col2:
+                if st.button("Restore" if notice['archived'] else "Archive", key=f"{key_prefix}archive_{notice['id']}"):
+                    post_store.set_archived(notice['id'], not notice['archived'])
+                    st.rerun()
+        except Exception as e:
+            st.error(f"Error updating notice: {e}")
+    
     def _delete_post(self, post_id):
         """Delete a post with better error handling."""
         try:
-            blogs_df = load_table("blogs")
+            deleted = post_store.delete_post(post_id)
+            image_path = deleted['image_path'] if deleted else None
+            search_index.remove_post(post_id)
             
-            # Get image path before deleting
-            post_row = blogs_df[blogs_df['id'] == post_id]
-            if not post_row.empty and pd.notna(post_row.iloc[0]['image_path']):
-                image_path = post_row.iloc[0]['image_path']
-                # Try to delete the image file
+            if blob_store.is_blob(image_path):
+                # Shared content stays until its last post or photo is gone
+                blob_store.release(image_path)
+            elif image_path:
+                # Images uploaded before the blob store belong to this post alone
                 try:
                     if os.path.exists(image_path):
                         os.remove(image_path)
+                    image_pipeline.remove_derivatives(image_path)
                 except OSError:
                     # Continue even if image deletion fails
                     pass
-            
-            # Filter out the deleted post
-            blogs_df = blogs_df[blogs_df['id'] != post_id]
-            save_table("blogs", blogs_df)
             st.success("Post deleted successfully!")
             st.rerun()
         except Exception as e:
@@ -202,13 +240,20 @@ class BlogNoticePage:
             content = st.text_area("Content", height=200)
             uploaded_file = st.file_uploader("Add an image (optional)", type=["jpg", "jpeg", "png"])
             
+            pinned, expires_on = False, None
+            if post_type == 'Notice':
+                pinned = st.checkbox("Pin to top of the notice board")
+                expires_on = st.date_input("Remove from the board after (optional)", value=None, min_value=date.today())
+            
             submit_button = st.form_submit_button("Post")
             
             if submit_button:
-                if self._validate_and_submit_post(title, content, post_type, uploaded_file, user_data):
+                if self._validate_and_submit_post(title, content, post_type, uploaded_file, user_data,
+                                                  pinned, expires_on):
                     st.rerun()
     
-    def _validate_and_submit_post(self, title, content, post_type, uploaded_file, user_data):
+    def _validate_and_submit_post(self, title, content, post_type, uploaded_file, user_data,
+                                  pinned=False, expires_on=None):
         """Validate and submit a post with better error handling."""
         # Validate inputs
         if not title.strip():
@@ -223,45 +268,30 @@ class BlogNoticePage:
         image_path = None
         if uploaded_file is not None:
             try:
-                # Create unique filename more efficiently
-                file_extension = Path(uploaded_file.name).suffix
-                unique_filename = f"{uuid.uuid4()}{file_extension}"
-                image_dir = Path("Database/blog_images")
-                image_path = str(image_dir / unique_filename)
+                # Stored by content hash, so re-uploading the same image costs no extra disk
+                image_path = blob_store.put_stream(uploaded_file)
                 
-                # Make sure directory exists
-                image_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Save the file with better resource management
-                with open(image_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
+                # The feed shows a thumbnail, made off the request thread
+                image_pipeline.schedule(image_path, 'blog')
             except Exception as e:
                 st.error(f"Error saving image: {e}")
                 return False
         
         try:
-            # Load existing blogs with caching
-            blogs_df = load_table("blogs")
-            
-            # Create new blog entry with more efficient ID generation
-            new_id = str(uuid.uuid4())
-            
-            # Create new post directly as DataFrame row
-            new_post = pd.DataFrame([{
-                'id': new_id,
-                'title': title,
-                'content': content,
-                'author': user_data.get('name', 'Anonymous'),
-                'author_id': user_data.get('employee_code', ''),
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M'),
-                'image_path': image_path,
-                'designation': user_data.get('designation', ''),
-                'post_type': post_type
-            }])
-            
-            # Append new post and save more efficiently
-            blogs_df = pd.concat([blogs_df, new_post], ignore_index=True)
-            save_table("blogs", blogs_df)
+            post = post_store.create_post(
+                title=title,
+                content=content,
+                post_type=post_type,
+                author=user_data.get('name', 'Anonymous'),
+                author_id=user_data.get('employee_code', ''),
+                designation=user_data.get('designation', ''),
+                image_path=image_path,
+                pinned=pinned,
+                # A notice stays up through the whole of its last day
+                expires_at=datetime.combine(expires_on + timedelta(days=1), time()).timestamp() if expires_on else None
+            )
+            blob_store.add_ref(image_path)
+            search_index.add_post(post)
             
             st.success(f"Your {post_type.lower()} has been posted successfully!")
             return True
@@ -0,0 +1,64 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from utils import profiler
+from utils import render_cache
+from utils.helpers import add_footer
+
+class DiagnosticsPage:
+    def display(self):
+        """Display the HR-only render profiler panel."""
+        st.title("Diagnostics")
+
+        enabled = st.toggle("Enable instrumentation", value=profiler.is_enabled(),
+                            help="Record page renders, storage I/O, cache hits and IP-gate checks for every session")
+        if enabled != profiler.is_enabled():
+            profiler.set_enabled(enabled)
+            st.rerun()
+
+        st.subheader("Calendar Render Cache")
+        cache_stats = render_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Entries", cache_stats['entries'])
+        col2.metric("Size", f"{cache_stats['bytes'] / 1024:,.0f} / {cache_stats['max_bytes'] / 1024:,.0f} KB")
+        col3.metric("Hits / misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+        col4.metric("Evictions", cache_stats['evictions'])
+        if st.button("Clear Render Cache"):
+            render_cache.clear()
+            st.rerun()
+
+        events = profiler.events()
+        if not events:
+            st.info("No events recorded yet. Enable instrumentation and use the app to collect a trace.")
+            add_footer()
+            return
+
+        reruns = {event['rerun'] for event in events}
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Events", len(events))
+        col2.metric("Reruns", len(reruns))
+        col3.metric("Storage bytes read/written", f"{sum(e.get('bytes', 0) for e in events):,}")
+
+        st.subheader("Hot Paths")
+        st.dataframe(pd.DataFrame(profiler.summary()), hide_index=True, use_container_width=True)
+
+        st.subheader("Recent Events")
+        recent_df = pd.DataFrame(events[-200:][::-1])
+        recent_df['ts'] = pd.to_datetime(recent_df['ts'], unit='s').dt.strftime('%H:%M:%S.%f').str[:-3]
+        st.dataframe(recent_df.drop(columns=['thread']), hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "Export JSON Trace",
+                data=profiler.export_trace(),
+                file_name=f"hrms_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                help="Chrome trace-event format; open in chrome://tracing or ui.perfetto.dev"
+            )
+        with col2:
+            if st.button("Clear Events"):
+                profiler.clear()
+                st.rerun()
+
+        add_footer()
@@ -2,15 +2,23 @@ import streamlit as st
 import pandas as pd
 from utils.helpers import hash_password, add_footer
 from functools import lru_cache
+from utils.profiler import profile_table_io, record_cache
+from utils import change_bus
 
-# Cache for loaded tables to avoid redundant file reads
+# Cache for loaded tables to avoid redundant file reads: table name -> (change bus version, DataFrame).
+# An entry is reused until any process publishes a write to that table
 _table_cache = {}
 
+@profile_table_io("load")
 def load_table(table_name):
     """Load a table from a CSV file in the 'Database' folder with caching."""
-    # Check if table is already in cache
-    if table_name in _table_cache:
-        return _table_cache[table_name].copy()
+    # Check if table is already in cache and no process has written it since
+    version = change_bus.version(table_name)
+    cached = _table_cache.get(table_name)
+    if cached is not None and cached[0] == version:
+        record_cache(f"table:{table_name}", hit=True)
+        return cached[1].copy()
+    record_cache(f"table:{table_name}", hit=False)
     
     try:
         # Read the CSV file
@@ -29,7 +37,7 @@ def load_table(table_name):
                 df[col] = pd.to_datetime(df[col], format=fmt, errors='coerce').dt.date
         
         # Cache the dataframe
-        _table_cache[table_name] = df.copy()
+        _table_cache[table_name] = (version, df.copy())
         return df
     except FileNotFoundError:
         return pd.DataFrame()
@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 from pathlib import Path
+from utils.file_lock import file_lock, write_atomic
 
 class ReportedIPsPage:
     def __init__(self):
@@ -32,8 +33,9 @@ class ReportedIPsPage:
                     # Allow clearing the IP list
                     if st.button("Clear IP List"):
                         ip_data["reported_ips"] = []
-                        with open(ip_data_path, "w") as f:
-                            json.dump(ip_data, f, indent=4)
+                        # The IP report server may be adding an entry at the same moment
+                        with file_lock(str(ip_data_path)):
+                            write_atomic(str(ip_data_path), json.dumps(ip_data, indent=4))
                         st.success("IP list cleared successfully!")
                         st.rerun()
                 else:
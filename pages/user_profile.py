@@ -1,23 +1,15 @@
 # pages/user_profile.py
 import streamlit as st
 from utils.helpers import add_footer
-import os
 import pandas as pd
 from datetime import datetime
-from functools import lru_cache
+from utils import image_pipeline
+from utils import photo_index
 
-# Cache photo lookup results to avoid redundant filesystem checks
-@lru_cache(maxsize=32)
 def find_user_photo(employee_code):
-    """Find a user's photo file with caching to reduce filesystem operations."""
-    valid_extensions = ('jpg', 'jpeg', 'png')
-    
-    # Use a generator expression for more efficient iteration
-    for ext in valid_extensions:
-        photo_path = f"Database/photos/{employee_code}.{ext}"
-        if os.path.exists(photo_path):
-            return photo_path
-    return None
+    """Path of a user's photo, or None, from the shared photo index (no per-file probing)."""
+    entry = photo_index.lookup(employee_code)
+    return entry[0] if entry else None
 
 # Format date strings efficiently
 def format_date(date_value, default="Not provided"):
@@ -44,18 +36,15 @@ class UserProfilePage:
             # Clear the flag
             st.session_state['photo_updated'] = False
             st.success("Profile photo updated successfully!")
-            # Clear the cache when photo is updated
-            if hasattr(find_user_photo, 'cache_clear'):
-                find_user_photo.cache_clear()
         
-        # Look for photo in the photos directory using cached function
+        # The photo index notices new uploads from any session, so there is nothing to clear
         employee_code = user_data['employee_code']
         photo_path = find_user_photo(employee_code)
         
         if photo_path:
             try:
-                # Load the image directly using cached path
-                st.image(photo_path, width=200, caption=user_data["name"], use_container_width=False)
+                # Serve the thumbnail once it exists; the full upload until then
+                st.image(image_pipeline.display_path(photo_path, 'photo'), width=200, caption=user_data["name"], use_container_width=False)
             except Exception as e:
                 st.write(f"Error displaying image: {e}")
         else:
@@ -5,13 +5,20 @@ import os
 from utils.helpers import hash_password, add_footer
 from functools import lru_cache
 from pathlib import Path
-import time as time_module
 import numpy as np
+from utils.profiler import profile_table_io
+from utils.html_table import escape, render_table, request_status_badge
+from utils import regularization_store
+from utils import image_pipeline
+from utils import blob_store
+from utils import photo_index
+from utils import change_bus
 
 # Import login page logic at module level to avoid circular imports
 import importlib
 
 # Helper functions for file operations without caching
+@profile_table_io("load")
 def load_table(table_name):
     """Load a table from a CSV file in the 'Database' folder."""
     try:
@@ -39,9 +46,11 @@ def load_table(table_name):
     except FileNotFoundError:
         return pd.DataFrame()
 
+@profile_table_io("save")
 def save_table(table_name, df):
     """Save a DataFrame to a CSV file in the 'Database' folder."""
     df.to_csv(f"Database/{table_name}.csv", index=False)
+    change_bus.publish(table_name)
 
 def clear_cache(table_name=None):
     """Clear Streamlit cache."""
@@ -98,31 +107,12 @@ class UserSettingsPage:
 
     def check_regularization_updates(self):
         """Check if there are any approved regularization requests that need to be reflected."""
-        requests_df = load_table('regularization_requests')
-        
-        if requests_df.empty:
-            return
-            
-        # Convert all employee codes to lowercase for consistency
-        requests_df['employee_code'] = requests_df['employee_code'].str.lower()
-            
-        # Filter for approved requests for the current user more efficiently
+        # Indexed lookup of this user's Approved requests; nothing is read or written when there are none
         employee_code = st.session_state['employee_code'].lower()
-        mask = (requests_df['employee_code'].eq(employee_code)) & (requests_df['status'].eq('Approved'))
-        approved_requests = requests_df[mask]
-                                        
-        if not approved_requests.empty:
-            # Mark these requests as reflected in the calendar
-            requests_df.loc[mask, 'status'] = 'Completed'
-            save_table('regularization_requests', requests_df)
-            
+        if regularization_store.mark_completed(employee_code):
             # Clear all caches to ensure fresh data is loaded everywhere
             clear_cache()  # Clear Streamlit cache
             
-            # Force reload attendance_logs to ensure we have the latest data
-            # This is critical as admin_panel may have updated this file
-            attendance_logs_df = load_table('attendance_logs')
-            
             # Notify the user
             st.success("Your regularization requests have been approved and reflected in the calendar!")
             
@@ -133,63 +123,58 @@ class UserSettingsPage:
         """Display all regularization requests made by the employee with their status."""
         st.header("Your Regularization Requests")
         
-        # Load regularization requests
-        requests_df = load_table('regularization_requests')
-        
-        if requests_df.empty:
-            st.info("No regularization requests found.")
-            return
-        
-        # Convert employee codes to lowercase
-        requests_df['employee_code'] = requests_df['employee_code'].str.lower()
-        
-        # Filter for the current employee
+        # Per-status counts come from this user's index entries; other employees' rows are never read
         employee_code = st.session_state['employee_code'].lower()
-        emp_mask = requests_df['employee_code'].eq(employee_code)
-        user_requests = requests_df[emp_mask]
+        counts = regularization_store.status_counts(employee_code)
         
-        if user_requests.empty:
+        if not counts:
             st.info("You haven't made any regularization requests yet.")
             return
         
-        # Sort by date and status (pending first)
-        user_requests = user_requests.sort_values(['date', 'status'], ascending=[False, True])
-        
-        # Display all requests in a table
         st.subheader("Your Request History")
         
-        # Create a display dataframe with formatted columns
-        display_df = user_requests.copy()
+        statuses_present = [s for s in regularization_store.REQUEST_STATUSES if s in counts]
+        statuses_present += sorted(s for s in counts if s not in statuses_present)
+        status_filter = st.selectbox(
+            "Status",
+            ['All'] + statuses_present,
+            format_func=lambda s: f"{s} ({sum(counts.values()) if s == 'All' else counts[s]})",
+            key="reg_history_status"
+        )
         
-        # Format date
-        if 'date' in display_df.columns:
-            display_df['date'] = display_df['date'].apply(lambda x: x.strftime('%d-%m-%Y') if pd.notna(x) else '')
+        # Cursors of the pages up to the current one; start over whenever the filter changes
+        if st.session_state.get('reg_history_filter') != status_filter:
+            st.session_state['reg_history_filter'] = status_filter
+            st.session_state['reg_history_cursors'] = [None]
+        cursors = st.session_state['reg_history_cursors']
         
-        # Format times
-        if 'requested_in_time' in display_df.columns:
-            display_df['requested_in_time'] = display_df['requested_in_time'].apply(
-                lambda x: format_time_12h(x) if pd.notna(x) else 'N/A')
-            
-        if 'requested_out_time' in display_df.columns:
-            display_df['requested_out_time'] = display_df['requested_out_time'].apply(
-                lambda x: format_time_12h(x) if pd.notna(x) else 'N/A')
-        
-        # Create status indicators with color coding
-        def color_status(val):
-            color = "green" if val == "Completed" else "blue" if val == "Approved" else "orange" if val == "Pending" else "red"
-            return f'<span style="color:{color};font-weight:bold">{val}</span>'
-            
-        display_df['status'] = display_df['status'].apply(color_status)
+        # One page, newest first, sorted from the index
+        user_requests, next_cursor = regularization_store.history_page(
+            employee_code, None if status_filter == 'All' else status_filter, cursor=cursors[-1])
         
-        # Select and reorder columns for display
-        cols_to_display = ['date', 'request_type', 'requested_in_time', 'requested_out_time', 'reason', 'status']
-        display_df = display_df[cols_to_display]
+        # Build the cells column by column; free-text fields are escaped
+        dates = [escape(x.strftime('%d-%m-%Y')) if pd.notna(x) else '' for x in user_requests['date']]
+        request_types = [escape(str(x)) if pd.notna(x) else '' for x in user_requests['request_type']]
+        in_times = [format_time_12h(x) if pd.notna(x) else 'N/A' for x in user_requests['requested_in_time']]
+        out_times = [format_time_12h(x) if pd.notna(x) else 'N/A' for x in user_requests['requested_out_time']]
+        reasons = [escape(str(x)) if pd.notna(x) else '' for x in user_requests['reason']]
+        statuses = [request_status_badge(x) for x in user_requests['status']]
         
-        # Rename columns for better display
-        display_df.columns = ['Date', 'Request Type', 'Requested In-Time', 'Requested Out-Time', 'Reason', 'Status']
+        headers = ['Date', 'Request Type', 'Requested In-Time', 'Requested Out-Time', 'Reason', 'Status']
+        rows = zip(dates, request_types, in_times, out_times, reasons, statuses)
+        st.write(render_table(headers, rows), unsafe_allow_html=True)
         
-        # Display the table with HTML formatting
-        st.write(display_df.to_html(escape=False, index=False), unsafe_allow_html=True)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if len(cursors) > 1 and st.button("← Newer", key="reg_history_newer"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Page {len(cursors)}")
+        with col3:
+            if next_cursor and st.button("Older →", key="reg_history_older"):
+                cursors.append(next_cursor)
+                st.rerun()
     
     def create_regularization_request(self):
         """Form for creating a new regularization request."""
@@ -236,41 +221,32 @@ class UserSettingsPage:
                     st.error("Please provide a reason for your request.")
                     return
                 
-                # Load current requests
-                requests_df = load_table('regularization_requests')
-                
-                # Get the next ID
-                next_id = 1
-                if not requests_df.empty and 'id' in requests_df.columns:
-                    next_id = requests_df['id'].max() + 1 if pd.notna(requests_df['id'].max()) else 1
-                
-                # Create new request
-                employee_code = st.session_state['employee_code'].lower()
+                # Duplicates of an open request are rejected, and a changed time updates the pending one
+                result = regularization_store.submit_request(
+                    st.session_state['employee_code'],
+                    request_date,
+                    request_type,
+                    requested_in_time,
+                    requested_out_time,
+                    reason
+                )
                 
-                new_request = pd.DataFrame([{
-                    'id': next_id,
-                    'employee_code': employee_code,
-                    'date': request_date,
-                    'request_type': request_type,
-                    'requested_in_time': requested_in_time,
-                    'requested_out_time': requested_out_time,
-                    'reason': reason,
-                    'status': 'Pending',
-                    'request_timestamp': datetime.now()
-                }])
-                
-                # Add to requests table
-                if requests_df.empty:
-                    requests_df = new_request
-                else:
-                    requests_df = pd.concat([requests_df, new_request], ignore_index=True)
-                
-                # Save updated table
-                save_table('regularization_requests', requests_df)
+                if result['outcome'] == 'duplicate':
+                    st.warning(f"You already have a {result['status'].lower()} request (#{result['id']}) "
+                               f"for this date with the same time.")
+                    return
                 
                 # Clear cache and notify user
                 clear_cache('regularization_requests')
-                st.success("Your regularization request has been submitted successfully!")
+                if result['outcome'] == 'merged':
+                    st.success(f"Your pending request #{result['id']} for this date has been updated.")
+                else:
+                    st.success("Your regularization request has been submitted successfully!")
+                
+                if result['conflict']:
+                    # Keep the page as is so the note stays visible; the admin sees it too
+                    st.warning(f"Note for the approver: {result['conflict']}.")
+                    return
                 st.rerun()
 
     def attendance_regularization(self):
@@ -307,37 +283,40 @@ class UserSettingsPage:
                     st.error(f"Unsupported file type. Please use one of: {', '.join(valid_extensions)}")
                     return
                 
-                # Create photos directory if it doesn't exist
-                photos_dir = Path("Database/photos")
-                photos_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Remove existing photos more efficiently
                 employee_code = st.session_state['employee_code']
                 
-                # Use pathlib for better file operations
-                for ext in valid_extensions:
-                    existing_file = photos_dir / f"{employee_code}{ext}"
-                    if existing_file.exists():
-                        try:
-                            existing_file.unlink()
-                        except (OSError, PermissionError) as e:
-                            st.error(f"Could not remove existing photo: {e}")
-                            return
-                
-                # Save the new photo - use with block for better resource management
-                file_extension = file_extension if file_extension.startswith('.') else f".{file_extension}"
-                save_path = photos_dir / f"{employee_code}{file_extension}"
-                
                 try:
-                    with open(save_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
+                    # Stored by content hash and referenced from the user's row in users.csv
+                    photo_path = blob_store.put_stream(uploaded_file)
+                    
+                    users_df = load_table('users')
+                    mask = users_df['employee_code'].str.lower().eq(employee_code.lower())
+                    if not mask.any():
+                        st.error("User not found.")
+                        return
+                    old_photo = users_df.loc[mask, 'photo'].iloc[0] if 'photo' in users_df.columns else None
+                    users_df.loc[mask, 'photo'] = photo_path
+                    save_table('users', users_df)
+                    blob_store.add_ref(photo_path)
+                    blob_store.release(old_photo)
+                    
+                    # The profile shows a thumbnail, made off the request thread
+                    image_pipeline.schedule(photo_path, 'photo')
+                    
+                    # Photos saved before the blob store are superseded by the new one
+                    photos_dir = Path("Database/photos")
+                    for ext in valid_extensions:
+                        legacy_file = photos_dir / f"{employee_code}{ext}"
+                        if legacy_file.exists():
+                            legacy_file.unlink()
+                            image_pipeline.remove_derivatives(legacy_file)
+                    
+                    # Every session's profile page sees the new photo on its next render
+                    photo_index.set_photo(employee_code, photo_path)
                     
                     # Set flag to indicate photo was changed
                     st.session_state['photo_updated'] = True
                     
-                    # Add a small delay to ensure file is written before reload
-                    time_module.sleep(0.5)
-                    
                     # Force a rerun to refresh the page
                     st.rerun()
                 except Exception as e:
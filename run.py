@@ -2,7 +2,6 @@ import streamlit.web.cli as stcli
 import os
 import sys
 import argparse
-import json
 from pathlib import Path
 import logging
 import subprocess
@@ -12,21 +11,50 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - [%(levelname)s] - %(message)s')
 logger = logging.getLogger("run")
 
-def start_http_server():
-    """Start the HTTP server for IP reporting as a separate process"""
-    try:
-        # Create a detached process
-        if os.name == 'nt':  # Windows
-            proc = subprocess.Popen([sys.executable, '-m', 'api.ip_endpoint'],
-                                   creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
-        else:  # Unix/Linux
-            proc = subprocess.Popen([sys.executable, '-m', 'api.ip_endpoint'],
-                                   start_new_session=True)
-        logger.info(f"Started HTTP server as process ID {proc.pid}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to start HTTP server: {e}")
+def start_http_server(workers=1):
+    """Start the HTTP server for IP reporting under a supervisor that restarts it"""
+    import atexit
+    from api.supervisor import Supervisor
+    
+    supervisor = Supervisor(workers=workers)
+    if not supervisor.start():
         return False
+    # Stopping the app stops the server too, instead of leaving it running unattended
+    atexit.register(supervisor.stop)
+    if not supervisor.wait_ready():
+        logger.error(f"HTTP server did not answer on port {supervisor.port} in time")
+        return False
+    return True
+
+def run_workers(count, port):
+    """Run count app instances on the ports after port, behind a sticky dispatcher on port"""
+    import secrets
+    from api.dispatcher import run_dispatcher
+    
+    # Every worker signs cookies with the same secret, so a browser moved to another worker stays valid
+    env = dict(os.environ)
+    env.setdefault("STREAMLIT_SERVER_COOKIE_SECRET", secrets.token_hex(32))
+    workers = []
+    try:
+        for i in range(count):
+            worker_port = port + 1 + i
+            workers.append(subprocess.Popen([
+                sys.executable, "-m", "streamlit", "run", "app.py",
+                "--server.port", str(worker_port),
+                "--server.address", "127.0.0.1",
+                "--server.headless", "true",
+            ], env=env))
+            logger.info(f"Started worker {i} on port {worker_port} as process ID {workers[-1].pid}")
+        run_dispatcher("0.0.0.0", port, [("127.0.0.1", port + 1 + i) for i in range(count)])
+    finally:
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        logger.info("Workers stopped")
 
 def main():
     parser = argparse.ArgumentParser(description="Run the Employee Attendance System")
@@ -80,78 +108,230 @@ def main():
         action="store_true",
         help="Start the HTTP server for receiving IP reports"
     )
+    parser.add_argument(
+        "--server-workers", 
+        type=int,
+        default=1,
+        help="Processes sharing the IP report server's port (SO_REUSEPORT) for --start-server"
+    )
     parser.add_argument(
         "--server-host", 
         type=str,
         help="Set the server hostname for IP reporting"
     )
+    parser.add_argument(
+        "--workers", 
+        type=int,
+        default=1,
+        help="Run this many app processes behind a sticky dispatcher on --port"
+    )
+    parser.add_argument(
+        "--port", 
+        type=int,
+        default=8501,
+        help="Port the app listens on; with --workers the workers use the ports after it"
+    )
+    parser.add_argument(
+        "--profile", 
+        action="store_true",
+        help="Enable render/storage instrumentation (view it under Diagnostics as HR)"
+    )
+    parser.add_argument(
+        "--recompute-attendance", 
+        action="store_true",
+        help="Recompute working hours and status for attendance_logs, then exit"
+    )
+    parser.add_argument(
+        "--reconcile", 
+        action="store_true",
+        help="Store absences and close missed punches for past days (default: yesterday), then exit"
+    )
+    parser.add_argument(
+        "--export", 
+        choices=["detail", "summary"],
+        help="Export an attendance report for --from-date/--to-date to --export-output, then exit"
+    )
+    parser.add_argument(
+        "--export-output", 
+        type=str,
+        help="File for --export; the format follows its extension (.csv or .xlsx)"
+    )
+    parser.add_argument(
+        "--export-employees", 
+        type=str,
+        help="Comma-separated employee codes to limit --export to"
+    )
+    parser.add_argument(
+        "--generate-reports", 
+        type=str,
+        metavar="YYYY-MM",
+        help="Build every employee's monthly report into Database/reports, then exit"
+    )
+    parser.add_argument(
+        "--report-workers", 
+        type=int,
+        help="Worker processes for --generate-reports (default: CPU count)"
+    )
+    parser.add_argument(
+        "--rebuild-rollups", 
+        action="store_true",
+        help="Rebuild the analytics rollup store from attendance_logs, then exit"
+    )
+    parser.add_argument(
+        "--backfill-thumbnails", 
+        action="store_true",
+        help="Create missing thumbnails for existing blog images and profile photos, then exit"
+    )
+    parser.add_argument(
+        "--migrate-uploads", 
+        action="store_true",
+        help="Move existing blog images and profile photos into the blob store, then exit"
+    )
+    parser.add_argument(
+        "--gc-blobs", 
+        action="store_true",
+        help="Recount blob references and delete unreferenced blobs, then exit"
+    )
+    parser.add_argument(
+        "--rebuild-search-index", 
+        action="store_true",
+        help="Rebuild the blog and notice search index from the post store (Database/posts.db), then exit"
+    )
+    parser.add_argument(
+        "--from-date", 
+        type=str,
+        help="First date (YYYY-MM-DD) for batch jobs such as --recompute-attendance, --reconcile and --export"
+    )
+    parser.add_argument(
+        "--to-date", 
+        type=str,
+        help="Last date (YYYY-MM-DD) for batch jobs such as --recompute-attendance, --reconcile and --export"
+    )
     
     args = parser.parse_args()
     
-    ip_config_path = Path("config/ip_config.json")
-    
-    # Create config directory if it doesn't exist
-    if not ip_config_path.parent.exists():
-        ip_config_path.parent.mkdir(parents=True)
-    
-    # Create default config if it doesn't exist
-    if not ip_config_path.exists():
-        default_config = {
-            "allowed_ips": ["127.0.0.1"],
-            "enabled": True,
-            "description": "List of IP addresses allowed to access the application",
-            "report_ip": False,
-            "ip_endpoint": "http://localhost:5000/api/ip-report"
-        }
-        with open(ip_config_path, "w") as f:
-            json.dump(default_config, f, indent=4)
-    
-    # Load current config
-    try:
-        with open(ip_config_path, "r") as f:
-            config = json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading IP configuration: {e}")
-        config = {
-            "allowed_ips": ["127.0.0.1"],
-            "enabled": True,
-            "description": "List of IP addresses allowed to access the application",
-            "report_ip": False,
-            "ip_endpoint": "http://localhost:5000/api/ip-report"
-        }
+    # Batch jobs run against the Database and exit without launching the app
+    if args.recompute_attendance:
+        from utils.attendance_rules import backfill_attendance
+        changed = backfill_attendance(args.from_date, args.to_date)
+        logger.info(f"Attendance recomputed: {changed} row(s) updated")
+        return
     
-    # Process arguments
-    if args.enable_ip_restriction:
-        config["enabled"] = True
-        logger.info("IP restriction ENABLED")
-    
-    if args.disable_ip_restriction:
-        config["enabled"] = False
-        logger.info("IP restriction DISABLED")
-    
-    if args.add_ip:
-        ip = args.add_ip
-        if ip not in config["allowed_ips"]:
-            config["allowed_ips"].append(ip)
-            logger.info(f"Added IP address: {ip}")
-        else:
-            logger.info(f"IP address {ip} already in allowed list")
+    if args.rebuild_rollups:
+        from utils.rollups import rebuild
+        store = rebuild()
+        logger.info(f"Rollups rebuilt: {len(store['daily'])} day(s), {len(store['employees'])} employee(s)")
+        return
     
-    if args.remove_ip:
-        ip = args.remove_ip
-        if ip in config["allowed_ips"]:
-            config["allowed_ips"].remove(ip)
-            logger.info(f"Removed IP address: {ip}")
-        else:
-            logger.info(f"IP address {ip} not in allowed list")
+    if args.reconcile:
+        from utils.reconciliation import reconcile_attendance
+        result = reconcile_attendance(args.from_date, args.to_date)
+        logger.info(f"Reconciliation done: {result['absent_rows']} absence(s) stored, "
+                    f"{result['closed_rows']} missed punch(es) closed")
+        return
+    
+    if args.export:
+        from datetime import date
+        from utils.export import export_attendance
+        output = Path(args.export_output or f"attendance_{args.export}.csv")
+        fmt = output.suffix.lstrip(".").lower()
+        if fmt not in ("csv", "xlsx"):
+            logger.error("--export-output must end in .csv or .xlsx")
+            sys.exit(1)
+        start_date = args.from_date or date.today().replace(day=1).isoformat()
+        end_date = args.to_date or date.today().isoformat()
+        employee_codes = args.export_employees.split(",") if args.export_employees else None
+        try:
+            rows = export_attendance(str(output), args.export, fmt, start_date, end_date, employee_codes)
+        except Exception as e:
+            logger.error(f"Export failed: {e}")
+            sys.exit(1)
+        logger.info(f"Exported {rows} row(s) to {output}")
+        return
+    
+    if args.generate_reports:
+        from utils.report_engine import generate_monthly_reports
+        year, month = (int(part) for part in args.generate_reports.split("-"))
+        index = generate_monthly_reports(year, month, workers=args.report_workers, force=True)
+        logger.info(f"Generated {len(index['employees'])} report(s) for {index['period']} "
+                    f"with {index['workers']} worker(s)")
+        return
+    
+    if args.migrate_uploads:
+        from utils.blob_store import migrate_uploads
+        result = migrate_uploads()
+        logger.info(f"Moved {result['blog_images']} blog image reference(s) and {result['photos']} photo(s) "
+                    f"into the blob store")
+        return
+    
+    if args.gc_blobs:
+        from utils.blob_store import collect_garbage
+        result = collect_garbage()
+        logger.info(f"Blob store: {result['kept']} kept, {result['removed']} removed, "
+                    f"{result['bytes_freed']} byte(s) freed")
+        return
+    
+    if args.rebuild_search_index:
+        from utils.search_index import rebuild
+        indexed = rebuild()
+        logger.info(f"Search index rebuilt: {indexed} post(s)")
+        return
+    
+    if args.backfill_thumbnails:
+        from utils.image_pipeline import backfill
+        from utils.blob_store import image_sources
+        try:
+            counts = backfill(image_sources())
+        except Exception as e:
+            logger.error(f"Thumbnail backfill failed: {e}")
+            sys.exit(1)
+        logger.info(f"Thumbnails: {counts['generated']} generated, {counts['skipped']} already current, "
+                    f"{counts['failed']} failed")
+        return
+    
+    from utils import config_service
     
-    if args.send_ip:
-        config["report_ip"] = True
-        logger.info("IP reporting ENABLED")
+    # Process arguments
+    def apply_arguments(config):
+        if args.enable_ip_restriction:
+            config["enabled"] = True
+            logger.info("IP restriction ENABLED")
+        
+        if args.disable_ip_restriction:
+            config["enabled"] = False
+            logger.info("IP restriction DISABLED")
+        
+        allowed_ips = config.setdefault("allowed_ips", ["127.0.0.1"])
+        if args.add_ip:
+            ip = args.add_ip
+            if ip not in allowed_ips:
+                allowed_ips.append(ip)
+                logger.info(f"Added IP address: {ip}")
+            else:
+                logger.info(f"IP address {ip} already in allowed list")
+        
+        if args.remove_ip:
+            ip = args.remove_ip
+            if ip in allowed_ips:
+                allowed_ips.remove(ip)
+                logger.info(f"Removed IP address: {ip}")
+            else:
+                logger.info(f"IP address {ip} not in allowed list")
+        
+        if args.send_ip:
+            config["report_ip"] = True
+            logger.info("IP reporting ENABLED")
+        
+        if args.ip_endpoint:
+            config["ip_endpoint"] = args.ip_endpoint
+            logger.info(f"IP reporting endpoint set to: {args.ip_endpoint}")
     
-    if args.ip_endpoint:
-        config["ip_endpoint"] = args.ip_endpoint
-        logger.info(f"IP reporting endpoint set to: {args.ip_endpoint}")
+    # Creates config/ip_config.json with the defaults if it doesn't exist, and saves it only if changed
+    try:
+        config = config_service.update(apply_arguments)
+    except Exception as e:
+        logger.error(f"Error saving IP configuration: {e}")
+        config = config_service.get_config()
     
     if args.server_host:
         os.environ["SERVER_HOST"] = args.server_host
@@ -159,33 +339,29 @@ def main():
     
     if args.show_ip_config:
         logger.info("\nCurrent IP Configuration:")
-        logger.info(f"IP Restriction: {'ENABLED' if config.get('enabled', True) else 'DISABLED'}")
-        logger.info(f"IP Reporting: {'ENABLED' if config.get('report_ip', False) else 'DISABLED'}")
-        if config.get('report_ip', False):
-            logger.info(f"Reporting Endpoint: {config.get('ip_endpoint', 'http://localhost:5000/api/ip-report')}")
+        logger.info(f"IP Restriction: {'ENABLED' if config.enabled else 'DISABLED'}")
+        logger.info(f"IP Reporting: {'ENABLED' if config.report_ip else 'DISABLED'}")
+        if config.report_ip:
+            logger.info(f"Reporting Endpoint: {config.ip_endpoint}")
         logger.info("\nAllowed IP Addresses:")
-        for ip in config["allowed_ips"]:
+        for ip in config.allowed_ips:
             logger.info(f"  - {ip}")
     
-    # Save the updated config 
-    with open(ip_config_path, "w") as f:
-        json.dump(config, f, indent=4)
-    
     # Set environment variables
-    os.environ["IP_RESTRICTION_ENABLED"] = str(config.get("enabled", True)).lower()
-    os.environ["IP_REPORTING_ENABLED"] = str(config.get("report_ip", False)).lower()
-    os.environ["IP_REPORTING_ENDPOINT"] = config.get("ip_endpoint", "http://localhost:5000/api/ip-report")
+    os.environ["IP_RESTRICTION_ENABLED"] = str(config.enabled).lower()
+    os.environ["IP_REPORTING_ENABLED"] = str(config.report_ip).lower()
+    os.environ["IP_REPORTING_ENDPOINT"] = config.ip_endpoint
     
     # Start the HTTP server if requested
     if args.start_server:
-        success = start_http_server()
+        success = start_http_server(args.server_workers)
         if success:
             logger.info("HTTP server for IP reporting started successfully")
         else:
             logger.error("Failed to start HTTP server")
     
     # Send private IP to endpoint if enabled
-    if config.get("report_ip", False):
+    if config.report_ip:
         try:
             from utils.ip_sender import send_private_ip_to_endpoint
             if send_private_ip_to_endpoint():
@@ -195,6 +371,10 @@ def main():
         except Exception as e:
             logger.error(f"Error sending private IP: {e}")
     
+    if args.profile:
+        os.environ["HRMS_PROFILING"] = "true"
+        logger.info("Instrumentation ENABLED - see the Diagnostics page")
+    
     # Handle override settings
     if args.override_code:
         os.environ["ADMIN_OVERRIDE_CODE"] = args.override_code
@@ -206,8 +386,13 @@ def main():
         logger.info("Force override mode enabled - IP restrictions will be bypassed")
     
     # Run the Streamlit application
+    if args.workers > 1:
+        logger.info(f"Starting {args.workers} Streamlit workers behind port {args.port}...")
+        run_workers(args.workers, args.port)
+        return
+    
     logger.info("Starting Streamlit application...")
-    sys.argv = ["streamlit", "run", "app.py"]
+    sys.argv = ["streamlit", "run", "app.py", "--server.port", str(args.port)]
     sys.exit(stcli.main())
 
 if __name__ == "__main__":
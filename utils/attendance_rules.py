@@ -0,0 +1,217 @@
+# utils/attendance_rules.py
+from datetime import date
+import numpy as np
+import pandas as pd
+from utils.shift_policy import get_shift_policy
+from utils.file_lock import file_lock
+from utils import attendance_store
+from utils import rollups
+from utils import change_bus
+
+SECONDS_PER_DAY = 86400
+_HALF_DAY = SECONDS_PER_DAY // 2
+
+
+def time_to_seconds(values):
+    """Convert time objects or 'HH:MM:SS' strings to seconds since midnight (NaN when missing)."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if series.empty:
+        return np.array([], dtype=float)
+    # str(time) is already 'HH:MM:SS', so one vectorized parse handles both input types
+    present = series.notna().to_numpy()
+    strings = series[present].astype(str).to_numpy()
+    seconds = np.full(len(series), np.nan)
+
+    fast = _fixed_width_seconds(strings)
+    if fast is not None:
+        seconds[present] = fast
+        return seconds
+
+    deltas = pd.to_timedelta(series.astype(str).where(series.notna()), errors='coerce')
+    return deltas.dt.total_seconds().to_numpy(dtype=float)
+
+
+def _fixed_width_seconds(strings):
+    """Parse an array of strict 'HH:MM:SS' strings from their bytes, or None if any is irregular.
+
+    Stored punch times are always this shape, and slicing digits out of the raw
+    bytes is an order of magnitude faster than pd.to_timedelta on millions of rows.
+    """
+    if strings.size == 0:
+        return np.array([], dtype=float)
+    try:
+        raw = strings.astype('S9')
+    except UnicodeEncodeError:
+        return None
+    codes = raw.view(np.uint8).reshape(-1, 9).astype(np.int64)
+    digits = codes - ord('0')
+    fields = digits[:, [0, 1, 3, 4, 6, 7]]
+    # The ninth byte is padding, so anything longer than 8 characters shows up there
+    regular = (
+        (codes[:, 2] == ord(':')) & (codes[:, 5] == ord(':')) & (codes[:, 8] == 0)
+        & ((fields >= 0) & (fields <= 9)).all(axis=1)
+    )
+    if not regular.all():
+        return None
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    secs = digits[:, 6] * 10 + digits[:, 7]
+    if (minutes > 59).any() or (secs > 59).any():
+        return None
+    return (hours * 3600 + minutes * 60 + secs).astype(float)
+
+
+def scalar_time_to_seconds(value):
+    """Single-value version of time_to_seconds for per-punch paths."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return np.nan
+    if isinstance(value, str):
+        try:
+            hours, minutes, seconds = value.split(':')
+            return float(int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+        except ValueError:
+            return time_to_seconds([value])[0]
+    return float(value.hour * 3600 + value.minute * 60 + value.second)
+
+
+def compute_working_hours(in_seconds, out_seconds):
+    """Hours between in and out, rolling out past midnight for overnight shifts (NaN when missing)."""
+    in_seconds = np.asarray(in_seconds, dtype=float)
+    out_seconds = np.asarray(out_seconds, dtype=float)
+    delta = out_seconds - in_seconds
+    delta = np.where(delta < 0, delta + SECONDS_PER_DAY, delta)
+    return np.round(delta / 3600, 2)
+
+
+def compute_late_flags(in_seconds, shift_start, grace_minutes):
+    """True where the whole minutes past shift start exceed the grace period.
+
+    The offset is wrapped into (-12h, 12h] so an early arrival for a shift that
+    starts near midnight is not mistaken for being almost a day late.
+    """
+    in_seconds = np.asarray(in_seconds, dtype=float)
+    offset = np.mod(in_seconds - shift_start + _HALF_DAY, SECONDS_PER_DAY) - _HALF_DAY
+    with np.errstate(invalid='ignore'):
+        return np.floor_divide(offset, 60) > grace_minutes
+
+
+def compute_status(in_seconds, out_seconds, late, hours=np.nan, min_hours_present=0, half_day_hours=0):
+    """Status per row from punches, the late flag and the worked hours.
+
+    With both punches, fewer hours than min_hours_present is HD (half day), or A
+    when below half_day_hours as well; a threshold of 0 disables that check.
+    Otherwise LA for late arrivals, P when both punches exist, MIS for IN
+    without OUT, and A when there is no IN.
+    """
+    has_in = ~np.isnan(np.asarray(in_seconds, dtype=float))
+    has_out = ~np.isnan(np.asarray(out_seconds, dtype=float))
+    hours = np.asarray(hours, dtype=float)
+    complete = has_in & has_out
+    with np.errstate(invalid='ignore'):
+        short = complete & (np.asarray(min_hours_present) > 0) & (hours < min_hours_present)
+        too_short = short & (np.asarray(half_day_hours) > 0) & (hours < half_day_hours)
+    return np.select(
+        [too_short, short, has_in & late, complete, has_in],
+        ['A', 'HD', 'LA', 'P', 'MIS'],
+        default='A'
+    )
+
+
+def working_hours(in_time, out_time):
+    """Working hours for a single punch pair; 0.0 when either side is missing."""
+    hours = compute_working_hours(scalar_time_to_seconds(in_time), scalar_time_to_seconds(out_time))
+    return 0.0 if np.isnan(hours) else float(hours)
+
+
+def is_late(in_time, employee_code, policy=None):
+    """Whether a single IN punch is late under the employee's shift rule."""
+    in_seconds = scalar_time_to_seconds(in_time)
+    if np.isnan(in_seconds):
+        return False
+    shift_start, grace, _, _ = (policy or get_shift_policy()).rule_for(employee_code)
+    return bool(compute_late_flags(in_seconds, shift_start, grace))
+
+
+def punch_status(employee_code, in_time, out_time, policy=None):
+    """Status for a single punch pair under the employee's shift rule."""
+    shift_start, grace, min_hours, half_day = (policy or get_shift_policy()).rule_for(employee_code)
+    in_seconds = scalar_time_to_seconds(in_time)
+    out_seconds = scalar_time_to_seconds(out_time)
+    late = compute_late_flags(in_seconds, shift_start, grace)
+    hours = compute_working_hours(in_seconds, out_seconds)
+    return str(compute_status(in_seconds, out_seconds, late, hours, min_hours, half_day))
+
+
+def close_missed_punches(status, dates, today, missed_punch_status):
+    """Replace MIS with the policy's missed-punch status on days before today."""
+    status = np.asarray(status, dtype=object).copy()
+    if missed_punch_status == 'MIS':
+        return status
+    past = (pd.to_datetime(pd.Series(dates), errors='coerce') < pd.Timestamp(today)).to_numpy()
+    status[(status == 'MIS') & past] = missed_punch_status
+    return status
+
+
+def recompute_attendance(attendance_df, policy=None, today=None):
+    """Recompute working_hours and status for a whole attendance frame in one pass.
+
+    Each row is matched case-insensitively to its employee's compiled shift rule.
+    IN punches that never got an OUT on a day before today take the policy's
+    missed-punch status, as the nightly reconciliation would have set it.
+    Returns a copy; the input frame is left untouched.
+    """
+    df = attendance_df.copy()
+    if df.empty:
+        return df
+
+    policy = policy or get_shift_policy()
+    rows = policy.indices(df['employee_code'])
+
+    in_seconds = time_to_seconds(df['in_time'])
+    out_seconds = time_to_seconds(df['out_time'])
+    late = compute_late_flags(in_seconds, policy.shift_start[rows], policy.grace_minutes[rows])
+    hours = compute_working_hours(in_seconds, out_seconds)
+
+    df['working_hours'] = hours
+    status = compute_status(in_seconds, out_seconds, late, hours,
+                            policy.min_hours_present[rows], policy.half_day_hours[rows])
+    if 'date' in df.columns:
+        status = close_missed_punches(status, df['date'], today or date.today(), policy.missed_punch_status)
+    df['status'] = status
+    return df
+
+
+def backfill_attendance(start_date=None, end_date=None):
+    """Recompute working_hours/status in attendance_logs.csv for an optional date range.
+
+    The read and the write happen under the attendance file lock, so punches
+    made meanwhile are not overwritten. Returns the number of rows whose stored values changed.
+    """
+    with file_lock(attendance_store.ATTENDANCE_PATH):
+        attendance_df = pd.read_csv(attendance_store.ATTENDANCE_PATH, dtype={'in_time': str, 'out_time': str})
+
+        dates = pd.to_datetime(attendance_df['date'], errors='coerce')
+        mask = pd.Series(True, index=attendance_df.index)
+        if start_date is not None:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= dates <= pd.Timestamp(end_date)
+
+        recomputed = recompute_attendance(attendance_df[mask])
+        before = attendance_df.loc[mask, ['working_hours', 'status']]
+        changed = ~(
+            (before['status'].eq(recomputed['status']))
+            & (before['working_hours'].eq(recomputed['working_hours'])
+               | (before['working_hours'].isna() & recomputed['working_hours'].isna()))
+        )
+
+        if changed.any():
+            attendance_df.loc[mask, ['working_hours', 'status']] = recomputed[['working_hours', 'status']]
+            attendance_store.replace_all(attendance_df)
+
+    if changed.any():
+        change_bus.publish('attendance_logs')
+        # Many rows can change at once, so one rescan beats per-row deltas. It takes the
+        # attendance lock itself, and punches made since are in the file it reads
+        rollups.rebuild()
+    return int(changed.sum())
@@ -0,0 +1,142 @@
+# utils/attendance_store.py
+import io
+import os
+import csv
+import mmap
+import shutil
+import datetime as dt
+from utils.file_lock import file_lock
+from utils.profiler import span
+from utils import change_bus
+from utils import rollups
+
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+COLUMNS = ['employee_code', 'date', 'in_time', 'out_time', 'working_hours', 'status']
+
+# Read size when copying the file around a changed row
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _text(value):
+    """A value as pandas writes it to the CSV: '' for missing, HH:MM:SS times, ISO dates."""
+    # NaN and NaT are the only values not equal to themselves
+    if value is None or value != value:
+        return ''
+    if isinstance(value, dt.time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _line(header, record):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow([_text(record.get(col)) for col in header])
+    return buffer.getvalue().encode()
+
+
+def locate(employee_code, day):
+    """(header, record, start, end) for the employee's row on day; record is None if there is none.
+
+    Rows start with "employee_code,date,", so the last matching line is found with a
+    byte search over a memory map. start/end are the line's byte offsets, without its newline.
+    """
+    with open(ATTENDANCE_PATH, "rb") as f:
+        header = f.readline().decode().strip().split(',')
+        if os.fstat(f.fileno()).st_size <= f.tell():
+            return header, None, None, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            found = -1
+            for code in {employee_code.lower(), employee_code.upper()}:
+                found = max(found, data.rfind(f"\n{code},{day},".encode()))
+            if found < 0:
+                return header, None, None, None
+            start = found + 1
+            end = data.find(b"\n", start)
+            end = len(data) if end < 0 else end
+            line = data[start:end].decode()
+    values = next(csv.reader([line]))
+    return header, {col: (value or None) for col, value in zip(header, values)}, start, end
+
+
+def _replace_line(start, end, line):
+    """Swap the bytes [start, end) for line. Caller holds the file lock.
+
+    Pages, exports and rollup rebuilds read the file without the lock, so it is
+    never changed where it lies: a copy with the new line replaces it through
+    os.replace, and a reader that already has it open keeps reading the old file whole.
+    """
+    tmp_path = f"{ATTENDANCE_PATH}.{os.getpid()}.tmp"
+    with open(ATTENDANCE_PATH, "rb") as f, open(tmp_path, "wb") as out:
+        remaining = start
+        while remaining:
+            chunk = f.read(min(remaining, COPY_CHUNK_BYTES))
+            out.write(chunk)
+            remaining -= len(chunk)
+        out.write(line)
+        f.seek(end)
+        shutil.copyfileobj(f, out, COPY_CHUNK_BYTES)
+    os.replace(tmp_path, ATTENDANCE_PATH)
+
+
+def _append_line(line):
+    with open(ATTENDANCE_PATH, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        # A single write, so readers never see the missing newline without the row after it
+        f.write(line)
+
+
+def replace_all(df):
+    """Write df as the whole file, swapped in with os.replace. Caller holds the file lock.
+
+    For batch jobs that change many rows at once; readers see the old file or the new one.
+    """
+    tmp_path = f"{ATTENDANCE_PATH}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, ATTENDANCE_PATH)
+
+
+def append_rows(df):
+    """Append df's rows, whose columns are in the file's order, after the last line. Caller holds the file lock."""
+    if len(df):
+        _append_line(df.to_csv(header=False, index=False, lineterminator="\n").encode())
+
+
+def upsert(employee_code, day, update):
+    """Change one employee's row for one date under the attendance file lock.
+
+    update gets the current row (a dict of text values, or None if there is
+    none) and returns the row to store, or None to leave the file as it is.
+    Inserts are appended; a changed row is written to a copy of the file that
+    then replaces it. Rollups are updated under the same lock, and the change
+    journal afterwards.
+    Returns (old_row, new_row), new_row being None when nothing was written.
+    """
+    day = _text(day)
+    with file_lock(ATTENDANCE_PATH), span("attendance", "upsert") as fields:
+        if not os.path.exists(ATTENDANCE_PATH):
+            with open(ATTENDANCE_PATH, "w", newline="") as f:
+                f.write(",".join(COLUMNS) + "\n")
+        header, old, start, end = locate(employee_code, day)
+        new = update(dict(old) if old else None)
+        if new is None or new == old:
+            fields['outcome'] = 'unchanged'
+            return old, None
+        new = {col: (_text(new.get(col)) or None) for col in header}
+        if old is None:
+            _append_line(_line(header, new))
+            fields['outcome'] = 'appended'
+        else:
+            _replace_line(start, end, _line(header, new)[:-1])
+            fields['outcome'] = 'replaced'
+        # Still under the attendance lock, so a rollup rebuild cannot count this row as well
+        rollups.apply_change(old, new)
+
+    change_bus.publish('attendance_logs')
+    return old, new
@@ -0,0 +1,266 @@
+# utils/blob_store.py
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+import pandas as pd
+from utils.file_lock import file_lock, write_atomic
+from utils.profiler import span
+from utils import image_pipeline
+from utils import post_store
+from utils import change_bus
+
+BLOB_DIR = "Database/blobs"
+REFS_PATH = "Database/blobs/refs.json"
+USERS_PATH = "Database/users.csv"
+
+# Bytes hashed and written per read while an upload is streamed in
+CHUNK_BYTES = 1024 * 1024
+
+# Unreferenced blobs younger than this are left alone by garbage collection:
+# an upload is stored a moment before the post or user row that references it
+GC_GRACE_SECONDS = 3600
+
+# The extension comes from the content, so identical bytes always map to one file
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF8", ".gif"),
+    (b"RIFF", ".webp"),
+]
+
+
+def _extension(head):
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return ".bin"
+
+
+def blob_path(digest, extension):
+    """Sharded location of a blob: blobs/ab/cd/<sha256><ext>."""
+    return os.path.join(BLOB_DIR, digest[:2], digest[2:4], f"{digest}{extension}")
+
+
+def is_blob(path):
+    return isinstance(path, str) and Path(path).as_posix().startswith(BLOB_DIR + "/")
+
+
+def put_stream(stream):
+    """Store the bytes read from a file-like object; returns the blob path.
+
+    The content is hashed while it is copied to a temporary file, so an upload
+    is read once and never held in memory whole. Identical content already in
+    the store is not written again.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    head = b""
+    with span("blobs", "put") as fields:
+        fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    f.write(chunk)
+            path = blob_path(digest.hexdigest(), _extension(head))
+            # Under the refs lock so a release() of the same content cannot delete it in between
+            with file_lock(REFS_PATH):
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                    # A fresh mtime keeps release() and garbage collection away until add_ref() runs
+                    os.utime(path)
+                    fields['deduplicated'] = True
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                    fields['deduplicated'] = False
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return path
+
+
+def put_file(source_path):
+    with open(source_path, "rb") as f:
+        return put_stream(f)
+
+
+def _load_refs():
+    """(counts, rebuilt). Caller holds the refs lock.
+
+    A missing or unreadable counts file is rebuilt from the tables. Callers
+    update their row before calling add_ref/release, so rebuilt counts
+    already include that change and must not be adjusted again.
+    """
+    try:
+        with open(REFS_PATH, "r") as f:
+            return json.load(f), False
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading blob references, rebuilding them from the tables: {e}")
+    return references(), True
+
+
+def _recently_stored(path):
+    """True for a blob written or deduplicated within the GC grace period, which may be about to gain a reference."""
+    try:
+        return os.path.getmtime(path) > time.time() - GC_GRACE_SECONDS
+    except OSError:
+        return False
+
+
+def _remove_blob(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    image_pipeline.remove_derivatives(path)
+
+
+def add_ref(path):
+    """Count one more row (post or user) referencing a blob."""
+    if not is_blob(path):
+        return
+    with file_lock(REFS_PATH):
+        refs, rebuilt = _load_refs()
+        if not rebuilt:
+            refs[path] = refs.get(path, 0) + 1
+        write_atomic(REFS_PATH, json.dumps(refs))
+
+
+def release(path):
+    """Drop one reference; the blob and its thumbnails are deleted with the last one.
+
+    A blob stored within the GC grace period is left for garbage collection
+    instead, since an upload of the same content may not have added its
+    reference yet.
+    """
+    if not is_blob(path):
+        return
+    with file_lock(REFS_PATH):
+        refs, rebuilt = _load_refs()
+        count = refs.pop(path, 0) - (0 if rebuilt else 1)
+        if count > 0:
+            refs[path] = count
+        elif not _recently_stored(path):
+            _remove_blob(path)
+        write_atomic(REFS_PATH, json.dumps(refs))
+
+
+def _referenced_paths():
+    """(blob path, image kind) for every post or user row that references a blob."""
+    for path in post_store.image_paths():
+        if is_blob(path):
+            yield path, 'blog'
+    try:
+        photos = pd.read_csv(USERS_PATH, usecols=lambda col: col == 'photo', dtype=str)
+    except FileNotFoundError:
+        return
+    if 'photo' in photos.columns:
+        for path in photos['photo'].dropna():
+            if is_blob(path):
+                yield path, 'photo'
+
+
+def references():
+    """Blob path -> number of posts and users.csv rows referencing it."""
+    counts = {}
+    for path, _ in _referenced_paths():
+        counts[path] = counts.get(path, 0) + 1
+    return counts
+
+
+def image_sources():
+    """Distinct (blob path, image kind) pairs in use, for thumbnail backfill."""
+    return sorted(set(_referenced_paths()))
+
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS):
+    """Rebuild reference counts from the tables and delete unreferenced blobs.
+
+    Returns counts of blobs kept and removed and the bytes freed.
+    """
+    result = {'kept': 0, 'removed': 0, 'bytes_freed': 0}
+    with file_lock(REFS_PATH), span("blobs", "gc") as fields:
+        counts = references()
+        cutoff = time.time() - grace_seconds
+        for root, dirs, files in os.walk(BLOB_DIR):
+            dirs[:] = [d for d in dirs if d != image_pipeline.DERIVATIVE_DIR]
+            for name in files:
+                path = Path(root, name).as_posix()
+                if path == REFS_PATH or name.endswith(".lock"):
+                    continue
+                stat = os.stat(path)
+                if name.endswith(".tmp"):
+                    # Left behind by an upload that died mid-copy
+                    if stat.st_mtime <= cutoff:
+                        os.remove(path)
+                    continue
+                if counts.get(path) or stat.st_mtime > cutoff:
+                    result['kept'] += 1
+                    continue
+                _remove_blob(path)
+                result['removed'] += 1
+                result['bytes_freed'] += stat.st_size
+        write_atomic(REFS_PATH, json.dumps(counts))
+        fields.update(result)
+    return result
+
+
+def migrate_uploads():
+    """Move pre-blob-store uploads into the store and point the tables at them.
+
+    Blog images referenced by posts and Database/photos/<code>.<ext> files
+    become blobs, and the originals are removed once the rows point at them.
+    Returns counts of migrated blog images and photos.
+    """
+    result = {'blog_images': 0, 'photos': 0}
+    moved = []
+
+    stored = {}
+    for path in set(post_store.image_paths()):
+        if is_blob(path) or not os.path.exists(path):
+            continue
+        stored[path] = put_file(path)
+        moved.append(path)
+    if stored:
+        result['blog_images'] = post_store.replace_image_paths(stored)
+
+    photos_dir = Path(image_pipeline.SOURCE_DIRS['photo'])
+    if os.path.exists(USERS_PATH) and photos_dir.is_dir():
+        users_df = pd.read_csv(USERS_PATH, dtype=str)
+        if 'photo' not in users_df.columns:
+            users_df['photo'] = None
+        rows = {code.lower(): i for i, code in users_df['employee_code'].str.lower().items()}
+        for source in sorted(photos_dir.iterdir()):
+            i = rows.get(source.stem.lower())
+            if not source.is_file() or source.suffix.lower() not in image_pipeline.SOURCE_EXTENSIONS or i is None:
+                continue
+            if pd.isna(users_df.at[i, 'photo']):
+                users_df.at[i, 'photo'] = put_file(source)
+                result['photos'] += 1
+            moved.append(str(source))
+        if result['photos']:
+            write_atomic(USERS_PATH, users_df.to_csv(index=False))
+            change_bus.publish('users')
+
+    for path in moved:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        image_pipeline.remove_derivatives(path)
+
+    # Counts are rebuilt from the updated rows; nothing new is old enough to collect
+    collect_garbage()
+    return result
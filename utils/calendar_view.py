@@ -0,0 +1,83 @@
+# utils/calendar_view.py
+import calendar
+from functools import lru_cache
+import pandas as pd
+from utils.html_table import escape, render_table, status_class
+
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+DATE_DISPLAY_TEMPLATE = '<div class="hrms-date">{}</div>'
+
+
+@lru_cache(maxsize=128)
+def format_time_12h(time_obj):
+    """Format time object to 12-hour format string with caching."""
+    if pd.isna(time_obj):
+        return ''
+    return time_obj.strftime('%I:%M %p')
+
+
+def calendar_grid(filtered_df, month_num, year):
+    """Cell HTML and status per calendar slot, as week x weekday lists.
+
+    filtered_df holds one month of attendance rows with `date` as date objects
+    and times as time objects. With one employee each day shows its punches;
+    with several it shows how many checked in. Record values are escaped.
+    """
+    month_calendar = calendar.monthcalendar(year, month_num)
+
+    # day -> employee -> row position; later rows for the same employee and day win
+    codes = filtered_df['employee_code'].tolist()
+    days = [d.day for d in filtered_df['date']]
+    in_times = filtered_df['in_time'].tolist()
+    out_times = filtered_df['out_time'].tolist()
+    statuses = filtered_df['status'].tolist() if 'status' in filtered_df.columns else ['A'] * len(codes)
+    by_day = {}
+    for i, (code, day) in enumerate(zip(codes, days)):
+        by_day.setdefault(day, {})[code] = i
+
+    display_data, status_data = [], []
+    for week in month_calendar:
+        week_display, week_status = [], []
+        for day in week:
+            if day == 0:
+                week_display.append("")
+                week_status.append("")
+                continue
+
+            day_records = list(by_day.get(day, {}).values())
+            date_display = DATE_DISPLAY_TEMPLATE.format(day)
+
+            if len(day_records) == 1:
+                i = day_records[0]
+                in_time = format_time_12h(in_times[i]) if pd.notna(in_times[i]) else ''
+                out_time = format_time_12h(out_times[i]) if pd.notna(out_times[i]) else ''
+                status = statuses[i] if pd.notna(statuses[i]) else 'A'
+
+                cell_text = f"{date_display}<br>In: {in_time}<br>Out: {out_time}<br>Status: {escape(str(status))}"
+                cell_status = status
+            elif day_records:
+                # Reconciliation stores an A row for every absent employee, so count only rows with an IN punch
+                checked_in = sum(1 for i in day_records if pd.notna(in_times[i]))
+                cell_text = f"{date_display}<br>{checked_in} employees checked in"
+                # Use aggregated status - present if any employee is present
+                day_statuses = {statuses[i] for i in day_records}
+                cell_status = 'P' if 'P' in day_statuses else 'MIS' if 'MIS' in day_statuses else 'A'
+            else:
+                cell_text = f"{date_display}<br>No Record"
+                cell_status = "A"
+
+            week_display.append(cell_text)
+            week_status.append(cell_status)
+
+        display_data.append(week_display)
+        status_data.append(week_status)
+
+    return display_data, status_data
+
+
+def calendar_html(filtered_df, month_num, year):
+    """The month's calendar as a styled HTML table."""
+    display_data, status_data = calendar_grid(filtered_df, month_num, year)
+    cell_classes = [[status_class(status) for status in week] for week in status_data]
+    return render_table(WEEKDAY_NAMES, display_data, cell_classes, table_class="hrms-table hrms-calendar")
@@ -0,0 +1,66 @@
+# utils/change_bus.py
+import os
+import json
+import threading
+from utils.file_lock import file_lock, write_atomic
+
+# Table name -> write counter, shared by every app process on the same Database folder
+JOURNAL_PATH = "Database/change_journal.json"
+
+# The journal as last read, keyed by its inode, mtime and size. Publishing replaces
+# the file, so the inode changes even when two writes land within one mtime tick
+_cache = {'key': None, 'versions': {}}
+_lock = threading.Lock()
+
+
+def _journal_key():
+    try:
+        stat = os.stat(JOURNAL_PATH)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _read_journal():
+    try:
+        with open(JOURNAL_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def versions():
+    """Every table's current version. Costs one stat unless some process has published since the last call."""
+    with _lock:
+        key = _journal_key()
+        if key != _cache['key']:
+            try:
+                _cache['versions'] = _read_journal()
+            except Exception as e:
+                # A damaged journal is rewritten by the next publish
+                print(f"Error reading change journal: {e}")
+                _cache['versions'] = {}
+            _cache['key'] = key
+        return _cache['versions']
+
+
+def version(table_name):
+    """The number of writes published for a table; caches compare it with the version they were built from."""
+    return versions().get(table_name, 0)
+
+
+def publish(table_name):
+    """Record that a table was just written, so every process's caches of it go stale."""
+    try:
+        with file_lock(JOURNAL_PATH):
+            try:
+                journal = _read_journal()
+            except ValueError:
+                journal = {}
+            journal[table_name] = journal.get(table_name, 0) + 1
+            write_atomic(JOURNAL_PATH, json.dumps(journal))
+            with _lock:
+                _cache.update(key=_journal_key(), versions=journal)
+    except Exception as e:
+        # The data itself is already saved; only cache coherence is lost
+        print(f"Error publishing change to {table_name}: {e}")
@@ -0,0 +1,108 @@
+# utils/config_service.py
+import os
+import copy
+import json
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from utils.file_lock import file_lock, write_atomic
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "ip_config.json"
+
+DEFAULT_CONFIG = {
+    "allowed_ips": ["127.0.0.1"],
+    "enabled": True,
+    "description": "List of IP addresses allowed to access the application",
+    "report_ip": False,
+    "ip_endpoint": "http://localhost:5000/api/ip-report",
+}
+
+
+class IPConfig:
+    """One read-only version of ip_config.json.
+
+    Every session shares the same snapshot until the file changes, so nothing
+    may modify it; changes go through update(). version increases by one each
+    time this process loads a new file.
+    """
+
+    def __init__(self, data, version):
+        data = {**DEFAULT_CONFIG, **data}
+        set_ = object.__setattr__
+        set_(self, "version", version)
+        set_(self, "data", MappingProxyType(copy.deepcopy(data)))
+        set_(self, "allowed_ips", tuple(data.get("allowed_ips") or ()))
+        set_(self, "allowed_set", frozenset(self.allowed_ips))
+        set_(self, "enabled", bool(data.get("enabled", True)))
+        set_(self, "report_ip", bool(data.get("report_ip", False)))
+        set_(self, "ip_endpoint", data.get("ip_endpoint", DEFAULT_CONFIG["ip_endpoint"]))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("IPConfig snapshots are read-only; use config_service.update()")
+
+
+_lock = threading.Lock()
+_cache = {'key': None, 'config': None, 'version': 0}
+
+
+def _file_key():
+    # The inode changes with every atomic replace, even when mtime and size do not
+    try:
+        stat = os.stat(CONFIG_PATH)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _read():
+    with open(CONFIG_PATH, "r") as f:
+        return json.load(f)
+
+
+def get_config():
+    """The current IPConfig; one stat per call, and the JSON is parsed only after the file changed."""
+    key = _file_key()
+    if _cache['config'] is not None and _cache['key'] == key:
+        return _cache['config']
+
+    with _lock:
+        if _cache['config'] is not None and _cache['key'] == key:
+            return _cache['config']
+        if key is None:
+            data = DEFAULT_CONFIG
+        else:
+            try:
+                data = _read()
+            except Exception as e:
+                print(f"Error loading IP configuration: {e}")
+                # A half-edited file keeps the last good allowlist instead of locking everyone out
+                if _cache['config'] is not None:
+                    _cache['key'] = key
+                    return _cache['config']
+                data = DEFAULT_CONFIG
+        _cache['version'] += 1
+        _cache['config'] = IPConfig(data, _cache['version'])
+        _cache['key'] = key
+        return _cache['config']
+
+
+def update(change):
+    """Apply change(dict) to the file's current contents and save them atomically.
+
+    change edits the dict in place. The read, change and write happen under a
+    lock file, so edits from the admin panel, run.py and manage_ips.py do not
+    overwrite each other. The file is only written when something changed.
+    Returns the new IPConfig.
+    """
+    CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(str(CONFIG_PATH)):
+        try:
+            current = _read()
+        except FileNotFoundError:
+            current = None
+        config = copy.deepcopy(current) if current is not None else copy.deepcopy(DEFAULT_CONFIG)
+        change(config)
+        if config != current:
+            write_atomic(str(CONFIG_PATH), json.dumps(config, indent=4))
+    return get_config()
+
@@ -1,6 +1,9 @@
 # utils/database.py
 import pandas as pd
+from utils.profiler import profile_table_io
+from utils import change_bus
 
+@profile_table_io("load")
 def load_table(table_name):
     """Load a table from a CSV file in the 'Database' folder."""
     try:
@@ -25,10 +28,12 @@ def load_table(table_name):
         print(f"Error loading {table_name}: {e}")
         return pd.DataFrame()
 
+@profile_table_io("save")
 def save_table(table_name, df):
     """Save a DataFrame to a CSV file in the 'Database' folder."""
     try:
         df.to_csv(f"Database/{table_name}.csv", index=False)
+        change_bus.publish(table_name)
         return True
     except Exception as e:
         print(f"Error saving {table_name}: {e}")
@@ -0,0 +1,226 @@
+# utils/export.py
+import os
+import csv
+import time
+import secrets
+import weakref
+import tempfile
+import pandas as pd
+from utils.profiler import span
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+USERS_PATH = "Database/users.csv"
+
+# Rows read from attendance_logs.csv per chunk; bounds memory regardless of date range
+CHUNK_ROWS = 200_000
+
+# Excel's hard limit, header included; larger detail exports continue on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+
+DETAIL_COLUMNS = ['employee_code', 'name', 'designation', 'date', 'in_time', 'out_time', 'working_hours', 'status']
+SUMMARY_STATUSES = ['P', 'LA', 'HD', 'MIS', 'A']
+SUMMARY_COLUMNS = (['employee_code', 'name', 'designation', 'period', 'days_recorded']
+                   + [f"days_{status}" for status in SUMMARY_STATUSES] + ['total_hours', 'average_hours'])
+
+EXPORT_KINDS = ('detail', 'summary')
+
+# Exports generated in the Admin Panel wait here, outside anything the web server serves,
+# until the session that made them hands them to st.download_button
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "hrms_exports")
+
+# Exports left behind by a session that ended without cleanup (e.g. a killed server) are swept after this
+EXPORT_TTL_SECONDS = 3600
+
+# st.download_button copies the file into the session's media store, so larger
+# exports are not offered in the browser; this bounds what one session holds
+DOWNLOAD_MAX_BYTES = 100 * 1024 * 1024
+
+
+def export_formats():
+    """Formats available in this environment."""
+    return ('csv', 'xlsx') if Workbook is not None else ('csv',)
+
+
+def _users_lookup():
+    users_df = pd.read_csv(USERS_PATH, usecols=['employee_code', 'name', 'designation'], dtype=str)
+    users_df['employee_code'] = users_df['employee_code'].str.lower()
+    return users_df.drop_duplicates('employee_code').set_index('employee_code')
+
+
+def iter_attendance_chunks(start_date, end_date, employee_codes=None, chunk_rows=CHUNK_ROWS):
+    """Yield filtered chunks of attendance_logs.csv for [start_date, end_date].
+
+    Values stay as text, so rows are exported exactly as stored. Dates are ISO
+    strings, which compare correctly without parsing.
+    """
+    start, end = str(start_date), str(end_date)
+    codes = {code.lower() for code in employee_codes} if employee_codes else None
+    for chunk in pd.read_csv(ATTENDANCE_PATH, dtype=str, chunksize=chunk_rows):
+        chunk['employee_code'] = chunk['employee_code'].str.lower()
+        mask = (chunk['date'] >= start) & (chunk['date'] <= end)
+        if codes is not None:
+            mask &= chunk['employee_code'].isin(codes)
+        if mask.any():
+            yield chunk[mask]
+
+
+def iter_detail_rows(start_date, end_date, employee_codes=None):
+    """Yield detail frames (one row per punch day) with employee name and designation."""
+    users = _users_lookup()
+    for chunk in iter_attendance_chunks(start_date, end_date, employee_codes):
+        chunk = chunk.join(users, on='employee_code')
+        yield chunk.reindex(columns=DETAIL_COLUMNS)
+
+
+def summary_frame(start_date, end_date, employee_codes=None):
+    """Per-employee, per-month totals, folded chunk by chunk.
+
+    Only the running totals (employees x months) are held in memory.
+    """
+    totals = None
+    for chunk in iter_attendance_chunks(start_date, end_date, employee_codes):
+        part = pd.DataFrame({
+            'employee_code': chunk['employee_code'],
+            'period': chunk['date'].str[:7],
+            'days_recorded': 1,
+            'total_hours': pd.to_numeric(chunk['working_hours'], errors='coerce').fillna(0.0),
+        })
+        for status in SUMMARY_STATUSES:
+            part[f"days_{status}"] = chunk['status'].eq(status).astype(int)
+        part = part.groupby(['employee_code', 'period']).sum()
+        totals = part if totals is None else totals.add(part, fill_value=0)
+
+    if totals is None:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    totals = totals.reset_index().join(_users_lookup(), on='employee_code')
+    totals['average_hours'] = (totals['total_hours'] / totals['days_recorded']).round(2)
+    totals['total_hours'] = totals['total_hours'].round(2)
+    int_columns = ['days_recorded'] + [f"days_{status}" for status in SUMMARY_STATUSES]
+    totals[int_columns] = totals[int_columns].astype(int)
+    return totals.sort_values(['employee_code', 'period'])[SUMMARY_COLUMNS]
+
+
+def _write_csv(frames, columns, path):
+    rows = 0
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerow(columns)
+        for frame in frames:
+            frame.to_csv(f, header=False, index=False)
+            rows += len(frame)
+    return rows
+
+
+def _write_xlsx(frames, columns, path, sheet_title):
+    if Workbook is None:
+        raise RuntimeError("XLSX export requires openpyxl (pip install openpyxl)")
+    # write_only streams rows to disk instead of keeping every cell object alive
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets, rows = None, XLSX_MAX_ROWS, 0, 0
+    for frame in frames:
+        frame = frame.astype(object).where(frame.notna(), None)
+        for values in frame.itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheets += 1
+                sheet = workbook.create_sheet(sheet_title if sheets == 1 else f"{sheet_title} {sheets}")
+                sheet.append(columns)
+                sheet_rows = 1
+            sheet.append(values)
+            sheet_rows += 1
+            rows += 1
+    if sheet is None:
+        workbook.create_sheet(sheet_title).append(columns)
+    workbook.save(path)
+    return rows
+
+
+def export_attendance(path, kind, fmt, start_date, end_date, employee_codes=None):
+    """Write a detail or summary attendance report to path as CSV or XLSX.
+
+    Returns the number of data rows written.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if fmt not in ('csv', 'xlsx'):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    with span("export", f"{kind}.{fmt}") as fields:
+        if kind == 'detail':
+            frames, columns, title = iter_detail_rows(start_date, end_date, employee_codes), DETAIL_COLUMNS, "Attendance"
+        else:
+            frames, columns, title = [summary_frame(start_date, end_date, employee_codes)], SUMMARY_COLUMNS, "Summary"
+
+        if fmt == 'csv':
+            rows = _write_csv(frames, columns, path)
+        else:
+            rows = _write_xlsx(frames, columns, path, title)
+        fields['rows'] = rows
+        fields['bytes'] = os.path.getsize(path)
+    return rows
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _sweep_exports():
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+class ExportFile:
+    """A generated export waiting in EXPORT_DIR to be downloaded.
+
+    The file goes away with discard(), or when the object is garbage collected,
+    which happens when the Streamlit session holding it ends.
+    """
+
+    def __init__(self, path, rows, file_name):
+        self.path = path
+        self.rows = rows
+        self.file_name = file_name
+        self._finalizer = weakref.finalize(self, _remove_quietly, path)
+
+    @property
+    def downloadable(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) <= DOWNLOAD_MAX_BYTES
+
+    @property
+    def mime(self):
+        if self.path.endswith(".xlsx"):
+            return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        return "text/csv"
+
+    def discard(self):
+        self._finalizer()
+
+
+def export_for_download(kind, fmt, start_date, end_date, employee_codes=None, file_name=None):
+    """export_attendance into a new file under EXPORT_DIR; returns an ExportFile."""
+    # Only this user can read the exports; they hold every employee's attendance
+    os.makedirs(EXPORT_DIR, mode=0o700, exist_ok=True)
+    _sweep_exports()
+    path = os.path.join(EXPORT_DIR, f"{secrets.token_hex(16)}.{fmt}")
+    try:
+        rows = export_attendance(path, kind, fmt, start_date, end_date, employee_codes)
+    except Exception:
+        _remove_quietly(path)
+        raise
+    return ExportFile(path, rows, file_name or f"attendance_{kind}.{fmt}")
@@ -0,0 +1,122 @@
+# utils/file_lock.py
+import os
+import time
+import uuid
+import socket
+from contextlib import contextmanager
+
+# A lock whose owner cannot be checked (another host, or an unreadable lock file)
+# is treated as abandoned once it is this old
+STALE_SECONDS = 30
+
+# A lock held by a process that is still running is never broken sooner than this;
+# the limit only guards against a reused PID keeping a dead owner's lock forever
+HELD_MAX_SECONDS = 600
+
+_HOST = socket.gethostname()
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # os.kill terminates processes on Windows, so the owner cannot be probed there
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return None
+    return True
+
+
+def _read_owner(lock_path):
+    try:
+        with open(lock_path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _is_stale(owner, age):
+    """Whether the lock recorded as owner ("host pid token"), age seconds old, is abandoned."""
+    try:
+        host, pid, _ = owner.split(" ", 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        # Still being written by its owner, or left by an older version
+        return age > STALE_SECONDS
+    alive = _pid_alive(pid) if host == _HOST else None
+    if alive is None:
+        return age > STALE_SECONDS
+    return not alive or age > HELD_MAX_SECONDS
+
+
+def _break_if_stale(lock_path):
+    try:
+        age = time.time() - os.path.getmtime(lock_path)
+    except OSError:
+        return
+    owner = _read_owner(lock_path)
+    if not _is_stale(owner, age):
+        return
+    # Move the lock aside atomically, so two waiters cannot both break it
+    # and the second remove the lock the first one has just taken
+    aside = f"{lock_path}.{os.getpid()}.{uuid.uuid4().hex}.stale"
+    try:
+        os.rename(lock_path, aside)
+    except OSError:
+        return
+    if _read_owner(aside) != owner:
+        # Someone else broke the stale lock and took a new one in between; put theirs back
+        try:
+            os.link(aside, lock_path)
+        except OSError:
+            pass
+    try:
+        os.remove(aside)
+    except OSError:
+        pass
+
+
+@contextmanager
+def file_lock(path, timeout=10.0, poll=0.01):
+    """Exclusive lock on path, held as path.lock, across processes and threads.
+
+    The lock file is created with O_CREAT | O_EXCL, so exactly one holder wins
+    on any local filesystem. It records the owner's host, PID and a token: a
+    lock is only broken once its owner has exited, and only the owner's token
+    removes it. Raises TimeoutError if it cannot be taken in time.
+    """
+    lock_path = path + ".lock"
+    token = f"{_HOST} {os.getpid()} {uuid.uuid4().hex}"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            _break_if_stale(lock_path)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_path}")
+            time.sleep(poll)
+    try:
+        os.write(fd, token.encode())
+        os.close(fd)
+        yield
+    finally:
+        # A lock that was broken and retaken belongs to someone else now
+        if _read_owner(lock_path) == token:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+
+def write_atomic(path, text):
+    """Replace path with text so readers see either the old or the new file, never a partial one."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -5,6 +5,7 @@ import hashlib
 import base64
 # from utils.database import get_db_connection
 import pandas as pd
+from utils import change_bus
 
 def hash_password(password):
     return password #hashlib.sha256(password.encode()).hexdigest()
@@ -50,6 +51,7 @@ def save_table(table_name, df):
     # Standardize date and time formats before saving
     df = standardize_date_time(df)
     df.to_csv(f"Database/{table_name}.csv", index=False)
+    change_bus.publish(table_name)
 
 def load_table(table_name):
     """Load a table from a CSV file in the 'Database' folder."""
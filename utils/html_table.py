@@ -0,0 +1,62 @@
+# utils/html_table.py
+import html
+from functools import lru_cache
+from utils.styles import STATUS_STYLES, REQUEST_STATUS_COLORS
+
+# Escapes &, <, > and both quote characters, so values are safe in text and attributes
+escape = html.escape
+
+CALENDAR_CELL_CSS = "white-space: pre-wrap; text-align: left; vertical-align: top; border: 1px solid #e0e0e0; padding: 5px;"
+
+
+@lru_cache(maxsize=1)
+def stylesheet():
+    """One <style> block with every class the rendered tables use, built once."""
+    rules = [
+        ".hrms-table { border-collapse: collapse; }",
+        ".hrms-table th { text-align: center; font-weight: bold; padding: 5px; }",
+        ".hrms-table td { padding: 5px; }",
+        f".hrms-calendar td {{ {CALENDAR_CELL_CSS} }}",
+        ".hrms-date { font-size:1.2em; font-weight:bold; background-color:#f0f0f0; border-radius:50%; width:25px; "
+        "height:25px; display:inline-block; text-align:center; line-height:25px; margin-bottom:5px; }",
+    ]
+    rules += [f".hrms-calendar td.status-{status} {{ {css} }}" for status, css in STATUS_STYLES.items()]
+    rules += [f".req-status-{status} {{ color: {color}; font-weight: bold; }}"
+              for status, color in REQUEST_STATUS_COLORS.items()]
+    rules.append(".req-status-other { color: red; font-weight: bold; }")
+    return "<style>\n" + "\n".join(rules) + "\n</style>"
+
+
+@lru_cache(maxsize=None)
+def status_class(status):
+    """Calendar cell class for an attendance status ('' for unknown or empty statuses)."""
+    return f"status-{status}" if status in STATUS_STYLES else ""
+
+
+@lru_cache(maxsize=None)
+def request_status_badge(status):
+    """Coloured, escaped badge for a regularization request status."""
+    css_class = f"req-status-{status}" if status in REQUEST_STATUS_COLORS else "req-status-other"
+    return f'<span class="{css_class}">{escape(str(status))}</span>'
+
+
+def render_table(headers, rows, cell_classes=None, table_class="hrms-table"):
+    """An HTML table from header labels and rows of cell HTML.
+
+    Cells are inserted as given, so callers must escape() any data in them;
+    headers are escaped here. cell_classes, when given, parallels rows with a
+    class name (or '') per cell.
+    """
+    head = "".join(f"<th>{escape(str(header))}</th>" for header in headers)
+    if cell_classes is None:
+        body = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    else:
+        body = "".join(
+            "<tr>" + "".join(
+                f'<td class="{css}">{cell}</td>' if css else f"<td>{cell}</td>"
+                for cell, css in zip(row, classes)
+            ) + "</tr>"
+            for row, classes in zip(rows, cell_classes)
+        )
+    return (f'{stylesheet()}<table class="{table_class}"><thead><tr>{head}</tr></thead>'
+            f"<tbody>{body}</tbody></table>")
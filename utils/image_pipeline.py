@@ -0,0 +1,162 @@
+# utils/image_pipeline.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.profiler import span
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Thumbnails are optional; originals are served without Pillow
+    Image = None
+
+# Upload folders and the bounding box of their derivatives: twice the width the
+# pages display them at (400px blog images, 200px profile photos), for sharp HiDPI screens
+SOURCE_DIRS = {
+    'blog': "Database/blog_images",
+    'photo': "Database/photos",
+}
+DERIVATIVE_SIZES = {
+    'blog': (800, 800),
+    'photo': (400, 400),
+}
+DERIVATIVE_DIR = "thumbs"
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# One background thread: uploads return at once and thumbnails follow shortly after
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def is_available():
+    return Image is not None
+
+
+def derivative_format():
+    """'webp' when this Pillow build can write it, else 'jpeg'."""
+    return 'webp' if Image is not None and features.check('webp') else 'jpeg'
+
+
+def derivative_path(source_path, kind):
+    """Where a source image's thumbnail of one kind lives: a thumbs/ folder next to it.
+
+    The kind is part of the name because the same stored image can be both a blog image and a photo.
+    """
+    source = Path(source_path)
+    extension = 'webp' if derivative_format() == 'webp' else 'jpg'
+    return source.parent / DERIVATIVE_DIR / f"{source.stem}-{kind}.{extension}"
+
+
+def _is_fresh(source_path, target):
+    try:
+        return os.path.getmtime(target) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def generate(source_path, kind):
+    """Write the thumbnail for one source image; returns its path."""
+    if Image is None:
+        raise RuntimeError("Thumbnails require Pillow (pip install Pillow)")
+    target = derivative_path(source_path, kind)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fmt = derivative_format()
+
+    with span("images", kind) as fields, Image.open(source_path) as image:
+        # Phone photos are often stored sideways with an EXIF rotation flag
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(DERIVATIVE_SIZES[kind])
+        if fmt == 'jpeg' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        if fmt == 'webp':
+            image.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+        else:
+            image.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        os.replace(tmp_path, target)
+        fields['bytes'] = os.path.getsize(target)
+    return target
+
+
+def _generate_in_background(source_path, kind):
+    try:
+        generate(source_path, kind)
+    except Exception as e:
+        print(f"Error creating thumbnail for {source_path}: {e}")
+    finally:
+        with _pending_lock:
+            _pending.discard((str(source_path), kind))
+
+
+def schedule(source_path, kind):
+    """Queue thumbnail generation for a newly saved upload; does nothing without Pillow."""
+    if Image is None:
+        return
+    with _pending_lock:
+        if (str(source_path), kind) in _pending:
+            return
+        _pending.add((str(source_path), kind))
+    _executor.submit(_generate_in_background, source_path, kind)
+
+
+def display_path(source_path, kind):
+    """The file to show for an image: its thumbnail when one is current, else the original.
+
+    A missing or outdated thumbnail is queued, so the next view gets it.
+    """
+    target = derivative_path(source_path, kind)
+    if _is_fresh(source_path, target):
+        return str(target)
+    schedule(source_path, kind)
+    return str(source_path)
+
+
+def remove_derivatives(source_path):
+    """Delete the thumbnails of a source image that is being removed."""
+    source = Path(source_path)
+    for kind in DERIVATIVE_SIZES:
+        for extension in ('webp', 'jpg'):
+            try:
+                (source.parent / DERIVATIVE_DIR / f"{source.stem}-{kind}.{extension}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _upload_folder_sources():
+    for kind, source_dir in SOURCE_DIRS.items():
+        source_dir = Path(source_dir)
+        if not source_dir.is_dir():
+            continue
+        for source in sorted(source_dir.iterdir()):
+            if source.is_file() and source.suffix.lower() in SOURCE_EXTENSIONS:
+                yield source, kind
+
+
+def backfill(extra_sources=(), force=False):
+    """Create missing or outdated thumbnails for every existing upload.
+
+    Covers the upload folders plus extra_sources, (path, kind) pairs such as
+    the blob store's referenced images. Returns counts of generated, skipped
+    (already current) and failed images.
+    """
+    if Image is None:
+        raise RuntimeError("Thumbnails require Pillow (pip install Pillow)")
+    counts = {'generated': 0, 'skipped': 0, 'failed': 0}
+    for source, kind in [*_upload_folder_sources(), *extra_sources]:
+        if not force and _is_fresh(source, derivative_path(source, kind)):
+            counts['skipped'] += 1
+            continue
+        try:
+            generate(source, kind)
+            counts['generated'] += 1
+        except Exception as e:
+            print(f"Error creating thumbnail for {source}: {e}")
+            counts['failed'] += 1
+    return counts
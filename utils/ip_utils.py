@@ -1,10 +1,9 @@
 import socket
 import os
-import json
 import ipaddress
-from pathlib import Path
 import streamlit as st
 import requests
+from utils.config_service import get_config
 
 def is_valid_ip(ip_str):
     """Check if the given string is a valid IP address"""
@@ -75,24 +74,13 @@ def is_app_running_locally():
 
 def get_allowed_ips():
     """Get the list of allowed IP addresses from config file"""
-    config_path = Path(__file__).parent.parent / "config" / "ip_config.json"
-    
-    if not config_path.exists():
-        # Default to localhost if config doesn't exist
-        return ["127.0.0.1"]
-    
-    try:
-        with open(config_path, "r") as f:
-            config = json.load(f)
-            return config.get("allowed_ips", ["127.0.0.1"])
-    except Exception as e:
-        print(f"Error loading IP configuration: {e}")
-        return ["127.0.0.1"]  # Default to localhost if error
+    return list(get_config().allowed_ips)
 
 def ip_in_allowed_list(ip, allowed_ips=None):
     """Check if the given IP is in the list of allowed IPs"""
     if allowed_ips is None:
-        allowed_ips = get_allowed_ips()
+        # The cached snapshot's set, so a check costs a stat of the config file and a set lookup
+        allowed_ips = get_config().allowed_set
     
     # Always allow localhost
     if ip in ["127.0.0.1", "::1", "localhost"]:
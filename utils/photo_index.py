@@ -0,0 +1,82 @@
+# utils/photo_index.py
+import os
+import threading
+import pandas as pd
+from utils.profiler import span, record_cache
+
+USERS_PATH = "Database/users.csv"
+PHOTOS_DIR = "Database/photos"
+
+# When a legacy folder holds more than one photo for a code, the first of these wins
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Lowercased employee code -> (path, version). Built from users.csv's photo column
+# and one scan of the photos folder, and shared by every session in the process
+_cache = {'key': None, 'photos': {}}
+_lock = threading.Lock()
+
+
+def _stat_key(path):
+    # The inode changes with every atomic replace, even when mtime and size do not
+    try:
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _sources_key():
+    # Adding, removing or renaming a file in the folder changes the folder's mtime
+    return (_stat_key(USERS_PATH), _stat_key(PHOTOS_DIR))
+
+
+def _scan_folder():
+    found = {}
+    try:
+        entries = list(os.scandir(PHOTOS_DIR))
+    except FileNotFoundError:
+        return found
+    for entry in entries:
+        stem, extension = os.path.splitext(entry.name)
+        extension = extension.lower()
+        if extension not in PHOTO_EXTENSIONS or not entry.is_file():
+            continue
+        code = stem.lower()
+        current = found.get(code)
+        if current is None or PHOTO_EXTENSIONS.index(extension) < current[0]:
+            found[code] = (PHOTO_EXTENSIONS.index(extension), entry.path, str(entry.stat().st_mtime_ns))
+    return {code: (path, version) for code, (_, path, version) in found.items()}
+
+
+def _refresh():
+    """Rebuild the index if users.csv or the photos folder changed. Caller holds _lock."""
+    key = _sources_key()
+    if key == _cache['key']:
+        record_cache("photo_index", hit=True)
+        return
+    record_cache("photo_index", hit=False)
+    with span("photos", "index") as fields:
+        photos = _scan_folder()
+        try:
+            users_df = pd.read_csv(USERS_PATH, usecols=lambda col: col in ('employee_code', 'photo'), dtype=str)
+        except FileNotFoundError:
+            users_df = pd.DataFrame(columns=['employee_code', 'photo'])
+        if 'photo' in users_df.columns:
+            # Blob paths are content hashes, so the path itself is the version
+            for code, path in users_df[['employee_code', 'photo']].dropna().itertuples(index=False):
+                photos[code.lower()] = (path, os.path.basename(path))
+        fields['photos'] = len(photos)
+    _cache.update(key=key, photos=photos)
+
+
+def lookup(employee_code):
+    """(path, version) of an employee's photo, or None; the code is matched case-insensitively."""
+    with _lock:
+        _refresh()
+        return _cache['photos'].get(str(employee_code).lower())
+
+
+def set_photo(employee_code, path):
+    """Point an employee at a new photo right away, before the index notices the file changes."""
+    with _lock:
+        _cache['photos'][str(employee_code).lower()] = (path, os.path.basename(path))
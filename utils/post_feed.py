@@ -0,0 +1,43 @@
+# utils/post_feed.py
+import os
+from functools import lru_cache
+from utils import image_pipeline
+from utils import post_store
+
+# Posts per feed page
+FEED_PAGE_SIZE = 10
+
+# Image files kept in memory, keyed by path and file version
+IMAGE_CACHE_ENTRIES = 64
+
+
+def post_count(post_type):
+    return post_store.post_count(post_type)
+
+
+def feed_page(post_type, cursor=None, page_size=FEED_PAGE_SIZE):
+    """One page of posts of a type, newest first; returns (posts, next_cursor).
+
+    cursor is the (created_at, id) of the last post already shown, or None for
+    the first page; next_cursor is None on the last page. The cost depends only
+    on page_size, not on how many posts exist.
+    """
+    return post_store.feed_page(post_type, cursor, page_size)
+
+
+@lru_cache(maxsize=IMAGE_CACHE_ENTRIES)
+def _read_image(path, mtime_ns, size):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def post_image(path):
+    """A post's image bytes (its thumbnail once generated), read once per file version; None if there is no image."""
+    if not path or not os.path.exists(path):
+        return None
+    path = image_pipeline.display_path(path, 'blog')
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _read_image(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,340 @@
+# utils/post_store.py
+import os
+import uuid
+import sqlite3
+import time
+import threading
+from datetime import datetime
+import pandas as pd
+from utils.profiler import span, record_cache
+
+POSTS_DB = "Database/posts.db"
+
+# Posts were kept in this CSV before the store existed; it is imported once
+LEGACY_CSV = "Database/blogs.csv"
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+# Everything but the body; bodies live in post_content and are read only for posts being shown
+SUMMARY_COLUMNS = ['id', 'post_type', 'created_at', 'title', 'author', 'author_id', 'designation', 'image_path',
+                   'pinned', 'expires_at', 'archived']
+
+# Most notices shown on the board at once; older active ones are in the full notice feed
+ACTIVE_NOTICE_LIMIT = 10
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS posts ("
+    "id TEXT PRIMARY KEY, post_type TEXT NOT NULL, created_at INTEGER NOT NULL, title TEXT NOT NULL, "
+    "author TEXT, author_id TEXT, designation TEXT, image_path TEXT, "
+    "pinned INTEGER NOT NULL DEFAULT 0, expires_at INTEGER, archived INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS post_content (id TEXT PRIMARY KEY, content TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+# Notice lifecycle columns added after the store was first released
+_ADDED_COLUMNS = {
+    'pinned': "INTEGER NOT NULL DEFAULT 0",
+    'expires_at': "INTEGER",
+    'archived': "INTEGER NOT NULL DEFAULT 0",
+}
+
+_INDEXES = [
+    # Feed pages are range scans of this index, newest first
+    "CREATE INDEX IF NOT EXISTS posts_feed ON posts (post_type, created_at DESC, id DESC)",
+    # Only notices still on the board, pinned ones first
+    "CREATE INDEX IF NOT EXISTS posts_board ON posts (pinned DESC, created_at DESC) "
+    "WHERE post_type = 'Notice' AND archived = 0",
+]
+
+# The notices on the board, kept until the store changes or the soonest of them expires
+_board = {'version': None, 'valid_until': None, 'notices': []}
+_board_lock = threading.Lock()
+
+# One connection per thread and database file; Streamlit serves each session on its own thread
+_local = threading.local()
+
+
+def to_timestamp(date_text):
+    """Seconds since the epoch for a 'YYYY-MM-DD HH:MM' local time; 0 if it cannot be parsed."""
+    try:
+        return int(datetime.strptime(str(date_text), DATE_FORMAT).timestamp())
+    except ValueError:
+        return 0
+
+
+def format_timestamp(created_at):
+    return datetime.fromtimestamp(created_at).strftime(DATE_FORMAT) if created_at else ''
+
+
+def _import_legacy_csv(connection):
+    """Copy blogs.csv into the store the first time the store is opened."""
+    if connection.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+        return
+    imported = 0
+    if os.path.exists(LEGACY_CSV):
+        with span("posts", "import") as fields:
+            df = pd.read_csv(LEGACY_CSV, dtype=str)
+            df = df.astype(object).where(df.notna(), None)
+            rows = df.to_dict('records')
+            connection.executemany(
+                "INSERT OR IGNORE INTO posts (id, post_type, created_at, title, author, author_id, designation, image_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(row['id'], row.get('post_type') or 'Blog', to_timestamp(row.get('date')), row.get('title') or '',
+                  row.get('author'), row.get('author_id'), row.get('designation'), row.get('image_path'))
+                 for row in rows]
+            )
+            connection.executemany("INSERT OR IGNORE INTO post_content (id, content) VALUES (?, ?)",
+                                   [(row['id'], row.get('content') or '') for row in rows])
+            imported = len(rows)
+            fields['posts'] = imported
+    connection.execute("INSERT INTO meta (key, value) VALUES ('imported', ?)", (str(imported),))
+
+
+def _connect():
+    path = os.path.abspath(POSTS_DB)
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path in connections:
+        return connections[path]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Autocommit; writes open their own transactions
+    connection = sqlite3.connect(path, timeout=10, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    # Readers keep reading while a post is being written
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        existing = {row['name'] for row in connection.execute("PRAGMA table_info(posts)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                connection.execute(f"ALTER TABLE posts ADD COLUMN {column} {definition}")
+        for statement in _INDEXES:
+            connection.execute(statement)
+        _import_legacy_csv(connection)
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        connection.close()
+        raise
+    connections[path] = connection
+    return connection
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT that also bumps the store version.
+
+    content=True also bumps the content version, for writes that add or remove
+    posts rather than change how they are shown.
+    """
+
+    def __init__(self, content=False):
+        self.keys = ('version', 'content_version') if content else ('version',)
+
+    def __enter__(self):
+        self.connection = _connect()
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            for key in self.keys:
+                self.connection.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, '1') "
+                    "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                    (key,)
+                )
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
+        return False
+
+
+def _post(row, content=None):
+    post = dict(row)
+    post['date'] = format_timestamp(post['created_at'])
+    if content is not None:
+        post['content'] = content
+    return post
+
+
+def version():
+    """A number that changes with every write, for caches derived from the store."""
+    row = _connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def content_version():
+    """A number that changes only when a post is created or deleted.
+
+    Pinning and archiving leave it alone, so derived data that holds only
+    titles and bodies, such as the search index, stays current through them.
+    """
+    row = _connect().execute("SELECT value FROM meta WHERE key = 'content_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def create_post(title, content, post_type, author='', author_id='', designation='', image_path=None,
+                created_at=None, pinned=False, expires_at=None):
+    """Store a new post; returns it as a dict including its generated id.
+
+    pinned and expires_at (a timestamp after which it leaves the board) apply to notices.
+    """
+    post = {
+        'id': str(uuid.uuid4()),
+        'post_type': post_type,
+        'created_at': int(created_at if created_at is not None else datetime.now().timestamp()),
+        'title': title,
+        'author': author,
+        'author_id': author_id,
+        'designation': designation,
+        'image_path': image_path,
+        'pinned': int(bool(pinned)),
+        'expires_at': int(expires_at) if expires_at is not None else None,
+        'archived': 0,
+    }
+    with span("posts", "create"), _Transaction(content=True) as connection:
+        connection.execute(
+            f"INSERT INTO posts ({', '.join(SUMMARY_COLUMNS)}) VALUES ({', '.join('?' * len(SUMMARY_COLUMNS))})",
+            [post[column] for column in SUMMARY_COLUMNS]
+        )
+        connection.execute("INSERT INTO post_content (id, content) VALUES (?, ?)", (post['id'], content))
+    return _post(post, content)
+
+
+def delete_post(post_id):
+    """Remove a post; returns what was deleted (for its image) or None if it did not exist."""
+    with span("posts", "delete"), _Transaction(content=True) as connection:
+        row = connection.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+        connection.execute("DELETE FROM post_content WHERE id = ?", (post_id,))
+    return _post(row)
+
+
+def set_pinned(post_id, pinned):
+    with _Transaction() as connection:
+        connection.execute("UPDATE posts SET pinned = ? WHERE id = ?", (int(bool(pinned)), post_id))
+
+
+def set_archived(post_id, archived):
+    """Take a notice off the board (or put it back) without deleting it."""
+    with _Transaction() as connection:
+        connection.execute("UPDATE posts SET archived = ? WHERE id = ?", (int(bool(archived)), post_id))
+
+
+def active_notices(now=None):
+    """The notices on the board, pinned first then newest, at most ACTIVE_NOTICE_LIMIT.
+
+    The list is computed once and reused until the store is written to or the
+    soonest expiry among the board's notices passes, so a visit costs the same
+    however many notices have been posted over time.
+    """
+    now = time.time() if now is None else now
+    current_version = version()
+    with _board_lock:
+        valid_until = _board['valid_until']
+        if _board['version'] == current_version and (valid_until is None or now < valid_until):
+            record_cache("notice_board", hit=True)
+            return list(_board['notices'])
+        record_cache("notice_board", hit=False)
+
+        connection = _connect()
+        with span("posts", "notice_board") as fields:
+            rows = connection.execute(
+                "SELECT * FROM posts WHERE post_type = 'Notice' AND archived = 0 "
+                "AND (expires_at IS NULL OR expires_at > ?) "
+                "ORDER BY pinned DESC, created_at DESC LIMIT ?",
+                (int(now), ACTIVE_NOTICE_LIMIT)
+            ).fetchall()
+            ids = [row['id'] for row in rows]
+            contents = dict(connection.execute(
+                f"SELECT id, content FROM post_content WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()) if ids else {}
+            fields['notices'] = len(rows)
+
+        notices = [_post(row, contents.get(row['id'], '')) for row in rows]
+        expiries = [notice['expires_at'] for notice in notices if notice['expires_at'] is not None]
+        _board.update(version=current_version, valid_until=min(expiries) if expiries else None, notices=notices)
+        return list(notices)
+
+
+def get_post(post_id):
+    connection = _connect()
+    row = connection.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+    if row is None:
+        return None
+    content = connection.execute("SELECT content FROM post_content WHERE id = ?", (post_id,)).fetchone()
+    return _post(row, content[0] if content else '')
+
+
+def post_count(post_type):
+    return _connect().execute("SELECT COUNT(*) FROM posts WHERE post_type = ?", (post_type,)).fetchone()[0]
+
+
+def feed_page(post_type, cursor=None, page_size=10):
+    """One page of posts of a type, newest first, with bodies; returns (posts, next_cursor).
+
+    cursor is the (created_at, id) of the last post already shown, or None for
+    the first page; next_cursor is None on the last page. The page is a range
+    scan of the (post_type, created_at DESC) index, and bodies are read for
+    the posts on it only.
+    """
+    connection = _connect()
+    with span("posts", "feed_page") as fields:
+        if cursor:
+            rows = connection.execute(
+                "SELECT * FROM posts WHERE post_type = ? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (post_type, int(cursor[0]), cursor[1], page_size + 1)
+            ).fetchall()
+        else:
+            rows = connection.execute(
+                "SELECT * FROM posts WHERE post_type = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (post_type, page_size + 1)
+            ).fetchall()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        ids = [row['id'] for row in rows]
+        contents = dict(connection.execute(
+            f"SELECT id, content FROM post_content WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall()) if ids else {}
+        fields['posts'] = len(rows)
+
+    posts = [_post(row, contents.get(row['id'], '')) for row in rows]
+    next_cursor = (rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+    return posts, next_cursor
+
+
+def iter_posts(with_content=False):
+    """Every post as a dict, for rebuilding derived data such as the search index."""
+    connection = _connect()
+    if with_content:
+        cursor = connection.execute(
+            "SELECT posts.*, post_content.content FROM posts LEFT JOIN post_content USING (id)"
+        )
+    else:
+        cursor = connection.execute("SELECT * FROM posts")
+    for row in cursor:
+        yield _post(row)
+
+
+def image_paths():
+    """image_path of every post that has one."""
+    return [row[0] for row in _connect().execute("SELECT image_path FROM posts WHERE image_path IS NOT NULL")]
+
+
+def replace_image_paths(mapping):
+    """Point posts at new image locations, {old path: new path}; returns the number of posts changed."""
+    changed = 0
+    with _Transaction() as connection:
+        for old_path, new_path in mapping.items():
+            changed += connection.execute(
+                "UPDATE posts SET image_path = ? WHERE image_path = ?", (new_path, old_path)
+            ).rowcount
+    return changed
@@ -0,0 +1,178 @@
+# utils/profiler.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Opt-in instrumentation: everything below is a cheap no-op unless enabled
+_enabled = os.environ.get("HRMS_PROFILING", "false").lower() == "true"
+
+# Ring buffer of recorded events shared by every session in this process
+_MAX_EVENTS = int(os.environ.get("HRMS_PROFILING_BUFFER", 5000))
+_events = deque(maxlen=_MAX_EVENTS)
+_lock = threading.Lock()
+
+# Streamlit runs every session's script in its own thread, so the rerun
+# currently being executed is tracked per thread
+_local = threading.local()
+_rerun_counter = 0
+
+
+def is_enabled():
+    """Return True if instrumentation is currently active."""
+    return _enabled
+
+
+def set_enabled(flag):
+    """Turn instrumentation on or off for this process."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def begin_rerun(label=""):
+    """Mark the start of a script rerun so events can be grouped per rerun."""
+    global _rerun_counter
+    if not _enabled:
+        return
+    with _lock:
+        _rerun_counter += 1
+        _local.rerun_id = _rerun_counter
+    _local.label = label
+
+
+def _record(kind, name, duration_ms, start=None, **fields):
+    """Append a single event to the ring buffer."""
+    event = {
+        'ts': start if start is not None else time.time(),
+        'rerun': getattr(_local, 'rerun_id', 0),
+        'session': getattr(_local, 'label', ''),
+        'thread': threading.get_ident(),
+        'kind': kind,
+        'name': name,
+        'duration_ms': round(duration_ms, 3),
+    }
+    event.update(fields)
+    with _lock:
+        _events.append(event)
+
+
+@contextmanager
+def span(kind, name, **fields):
+    """Time the enclosed block; callers may add fields to the yielded dict."""
+    if not _enabled:
+        yield fields
+        return
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        fields['error'] = str(e)
+        raise
+    finally:
+        _record(kind, name, (time.perf_counter() - start) * 1000, start_wall, **fields)
+
+
+def profiled(kind, name=None):
+    """Decorator form of span() for functions and methods."""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(kind, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_table_io(action):
+    """Decorator for load_table/save_table that records row and byte counts."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(table_name, *args, **kwargs):
+            if not _enabled:
+                return func(table_name, *args, **kwargs)
+            with span("storage", f"{action}:{table_name}") as fields:
+                result = func(table_name, *args, **kwargs)
+                df = result if action == "load" else (args[0] if args else kwargs.get('df'))
+                fields['rows'] = len(df) if hasattr(df, '__len__') else 0
+                try:
+                    fields['bytes'] = os.path.getsize(f"Database/{table_name}.csv")
+                except OSError:
+                    fields['bytes'] = 0
+            return result
+        return wrapper
+    return decorator
+
+
+def record_cache(name, hit):
+    """Record a cache hit or miss."""
+    if not _enabled:
+        return
+    _record("cache", name, 0.0, hit=bool(hit))
+
+
+def events():
+    """Return a snapshot of the buffered events, oldest first."""
+    with _lock:
+        return list(_events)
+
+
+def clear():
+    """Drop all buffered events."""
+    with _lock:
+        _events.clear()
+
+
+def summary():
+    """Aggregate buffered events per (kind, name)."""
+    groups = {}
+    for event in events():
+        groups.setdefault((event['kind'], event['name']), []).append(event)
+
+    rows = []
+    for (kind, name), group in groups.items():
+        durations = sorted(e['duration_ms'] for e in group)
+        count = len(durations)
+        row = {
+            'kind': kind,
+            'name': name,
+            'count': count,
+            'total_ms': round(sum(durations), 3),
+            'mean_ms': round(sum(durations) / count, 3),
+            'p95_ms': durations[min(count - 1, int(count * 0.95))],
+            'max_ms': durations[-1],
+        }
+        if kind == "storage":
+            row['rows'] = sum(e.get('rows', 0) for e in group)
+            row['bytes'] = sum(e.get('bytes', 0) for e in group)
+        if kind == "cache":
+            hits = sum(1 for e in group if e.get('hit'))
+            row['hit_rate'] = round(hits / count, 3)
+        rows.append(row)
+    return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+
+def export_trace():
+    """Export buffered events as Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+    trace_events = []
+    for event in events():
+        args = {k: v for k, v in event.items()
+                if k not in ('ts', 'thread', 'kind', 'name', 'duration_ms')}
+        trace_events.append({
+            'name': event['name'],
+            'cat': event['kind'],
+            'ph': 'X',
+            'ts': int(event['ts'] * 1_000_000),
+            'dur': int(event['duration_ms'] * 1000),
+            'pid': os.getpid(),
+            'tid': event['thread'],
+            'args': args,
+        })
+    return json.dumps({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, default=str)
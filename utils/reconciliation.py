@@ -0,0 +1,105 @@
+# utils/reconciliation.py
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from utils.shift_policy import get_shift_policy
+from utils.attendance_rules import close_missed_punches
+from utils.file_lock import file_lock
+from utils import attendance_store
+from utils import rollups
+from utils import change_bus
+
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+USERS_PATH = "Database/users.csv"
+ATTENDANCE_COLUMNS = ['employee_code', 'date', 'in_time', 'out_time', 'working_hours', 'status']
+
+
+def _absent_rows(users_df, days, existing_keys):
+    """A rows for every (employee, working day) pair that has no attendance row yet."""
+    codes = users_df['employee_code'].str.lower().to_numpy()
+    joined = pd.to_datetime(users_df['date_of_joining'], errors='coerce').to_numpy()
+
+    # Dense employee x day grid, then drop pre-joining days and days already recorded
+    code_idx = np.repeat(np.arange(len(codes)), len(days))
+    day_values = np.tile(days.to_numpy(), len(codes))
+    after_joining = np.isnat(joined[code_idx]) | (day_values >= joined[code_idx])
+    day_strings = np.tile(days.strftime('%Y-%m-%d').to_numpy(), len(codes))
+
+    grid = pd.MultiIndex.from_arrays([codes[code_idx], day_strings])
+    missing = after_joining & ~grid.isin(existing_keys)
+
+    return pd.DataFrame({
+        'employee_code': codes[code_idx][missing],
+        'date': day_strings[missing],
+        'in_time': None,
+        'out_time': None,
+        'working_hours': None,
+        'status': 'A',
+    }, columns=ATTENDANCE_COLUMNS)
+
+
+def reconcile_attendance(start_date=None, end_date=None, today=None):
+    """Materialize absences and close stale missed punches for a range of past days.
+
+    For every working day in [start_date, end_date] (default: yesterday), each
+    employee who had joined by then and has no attendance row gets an A row, and
+    MIS rows (IN without OUT) get the policy's missed_punch_status. Today and
+    later are never touched, and rerunning over the same range changes nothing.
+    Returns {'absent_rows': n, 'closed_rows': m}.
+    """
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    end = min(pd.Timestamp(end_date or yesterday), pd.Timestamp(yesterday))
+    start = pd.Timestamp(start_date or end)
+    result = {'absent_rows': 0, 'closed_rows': 0}
+    if start > end:
+        return result
+
+    policy = get_shift_policy()
+    days = pd.date_range(start, end, freq='D')
+    days = days[policy.working_days(days)]
+    users_df = pd.read_csv(USERS_PATH, usecols=['employee_code', 'date_of_joining'], dtype=str)
+
+    # Punches keep arriving while this runs (overnight shifts punch OUT after midnight),
+    # so the whole read-modify-write holds the lock they write under
+    with file_lock(ATTENDANCE_PATH):
+        # Read everything as text so rows outside the range are written back unchanged
+        try:
+            attendance_df = pd.read_csv(ATTENDANCE_PATH, dtype=str)
+        except FileNotFoundError:
+            attendance_df = pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+
+        dates = pd.to_datetime(attendance_df['date'], errors='coerce')
+        in_range = ((dates >= start) & (dates <= end)).to_numpy()
+        partition = attendance_df[in_range]
+
+        # Stale IN-without-OUT rows in the partition
+        closed = close_missed_punches(partition['status'], partition['date'], today, policy.missed_punch_status)
+        changed = closed != partition['status'].to_numpy(dtype=object)
+        result['closed_rows'] = int(changed.sum())
+
+        existing_keys = pd.MultiIndex.from_arrays([
+            partition['employee_code'].str.lower().to_numpy(),
+            dates[in_range].dt.strftime('%Y-%m-%d').to_numpy(),
+        ])
+        absent_df = _absent_rows(users_df, days, existing_keys)
+        result['absent_rows'] = len(absent_df)
+
+        closed_before = partition[changed]
+        if result['closed_rows'] or not os.path.exists(ATTENDANCE_PATH):
+            attendance_df.loc[in_range, 'status'] = closed
+            attendance_store.replace_all(pd.concat([attendance_df, absent_df], ignore_index=True))
+        elif result['absent_rows']:
+            # Nothing to rewrite, so just append the new rows in the file's column order
+            attendance_store.append_rows(absent_df.reindex(columns=attendance_df.columns))
+
+        closed_after = closed_before.assign(status=closed[changed])
+        rollups.apply_changes(
+            list(zip(closed_before.to_dict('records'), closed_after.to_dict('records')))
+            + [(None, row) for row in absent_df.to_dict('records')]
+        )
+
+    if result['closed_rows'] or result['absent_rows']:
+        change_bus.publish('attendance_logs')
+    return result
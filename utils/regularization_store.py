@@ -0,0 +1,416 @@
+# utils/regularization_store.py
+import os
+import csv
+import io
+import threading
+from datetime import datetime, time
+import pandas as pd
+from utils.file_lock import file_lock, write_atomic
+from utils import change_bus
+from utils import attendance_store
+from utils.profiler import span
+from utils.export import iter_attendance_chunks
+from utils.shift_policy import get_shift_policy
+
+REQUESTS_PATH = "Database/regularization_requests.csv"
+SEQUENCE_PATH = "Database/regularization_requests.seq"
+
+REQUEST_STATUSES = ['Pending', 'Approved', 'Completed', 'Rejected']
+
+# Rows per page of an employee's request history
+HISTORY_PAGE_SIZE = 20
+
+# Shift length assumed when the rule sets no min_hours_present, to tell whether a shift runs past midnight
+NOMINAL_SHIFT_HOURS = 8
+
+COLUMNS = ['id', 'employee_code', 'date', 'request_type', 'requested_in_time', 'requested_out_time',
+           'reason', 'status', 'request_timestamp', 'conflict']
+TIME_COLUMNS = ['requested_in_time', 'requested_out_time']
+
+# The requested time each request type corrects
+REQUESTED_COLUMN = {'Correct In-Time': 'requested_in_time', 'Correct Out-Time': 'requested_out_time'}
+
+# A new submission matching one of these on (employee_code, date, request_type) is not queued again
+OPEN_STATUSES = ('Pending', 'Approved', 'Completed')
+
+# The table as stored (text values) plus its indexes, shared by every session in this process:
+#   by_id: request id -> row position
+#   by_employee: employee_code -> set of row positions
+#   by_employee_status: (employee_code, status) -> set of row positions
+#   by_status: status -> set of row positions
+#   by_request: (employee_code, date, request_type) -> set of row positions
+_cache = {'key': None, 'df': None, 'file_columns': COLUMNS, 'by_id': {}, 'by_employee': {}, 'by_employee_status': {},
+          'by_status': {}, 'by_request': {}}
+_lock = threading.Lock()
+
+
+def _file_key():
+    # The inode changes with every atomic replace, even when mtime and size do not
+    try:
+        stat = os.stat(REQUESTS_PATH)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _index(df):
+    _cache['df'] = df
+    ids = pd.to_numeric(df['id'], errors='coerce')
+    _cache['by_id'] = {int(request_id): pos for pos, request_id in enumerate(ids) if pd.notna(request_id)}
+    _cache['by_employee'] = {
+        key: set(positions) for key, positions in df.groupby('employee_code', sort=False).indices.items()
+    }
+    _cache['by_employee_status'] = {
+        key: set(positions) for key, positions in df.groupby(['employee_code', 'status'], sort=False).indices.items()
+    }
+    _cache['by_status'] = {key: set(positions) for key, positions in df.groupby('status', sort=False).indices.items()}
+    _cache['by_request'] = {
+        key: set(positions)
+        for key, positions in df.groupby(['employee_code', 'date', 'request_type'], sort=False).indices.items()
+    }
+
+
+def _refresh():
+    """Reload the table and its indexes if the file changed since they were built. Caller holds _lock."""
+    key = _file_key()
+    if key is not None and key == _cache['key']:
+        return
+    with span("regularization", "index") as fields:
+        try:
+            df = pd.read_csv(REQUESTS_PATH, dtype=str)
+        except FileNotFoundError:
+            df = pd.DataFrame(columns=COLUMNS)
+        # Files written before a column was added are rewritten with it on the next write
+        _cache['file_columns'] = list(df.columns)
+        df = df.reindex(columns=COLUMNS)
+        df['employee_code'] = df['employee_code'].str.lower()
+        _index(df.reset_index(drop=True))
+        fields['rows'] = len(df)
+    _cache['key'] = key
+
+
+def _typed(df):
+    """Rows converted the way the pages' load_table converts them."""
+    df = df.copy()
+    df['id'] = pd.to_numeric(df['id'], errors='coerce')
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
+    for col in TIME_COLUMNS:
+        df[col] = pd.to_datetime(df[col], format='%H:%M:%S', errors='coerce').dt.time
+    return df
+
+
+def _rows(positions):
+    return _typed(_cache['df'].iloc[sorted(positions)])
+
+
+def get_request(request_id):
+    """One request as a Series, or None."""
+    with _lock:
+        _refresh()
+        pos = _cache['by_id'].get(int(request_id))
+        return None if pos is None else _rows([pos]).iloc[0]
+
+
+def requests_for_employee(employee_code, status=None):
+    """An employee's requests (optionally only one status), newest date first, pending before others."""
+    code = str(employee_code).lower()
+    with _lock:
+        _refresh()
+        df = _rows(_employee_positions(code, status))
+    return df.sort_values(['date', 'status'], ascending=[False, True])
+
+
+def _employee_positions(code, status=None):
+    """Row positions of one employee's requests, optionally one status only. Caller holds _lock."""
+    if status is None:
+        return _cache['by_employee'].get(code, set())
+    return _cache['by_employee_status'].get((code, status), set())
+
+
+def _parse_cursor(cursor):
+    day, _, request_id = cursor.rpartition('|')
+    return (day, int(request_id))
+
+
+def history_page(employee_code, status=None, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """One page of an employee's requests, newest date first (ties: newest ID first).
+
+    Returns (frame, next_cursor). Pass next_cursor back to get the following
+    page; it is None on the last one. Only this employee's index entries are
+    sorted, and only the page's rows are converted.
+    """
+    code = str(employee_code).lower()
+    with _lock:
+        _refresh()
+        df = _cache['df']
+        positions = list(_employee_positions(code, status))
+        ids = pd.to_numeric(df['id'].values[positions], errors='coerce')
+        days = df['date'].values[positions]
+        keys = sorted(
+            ((day if isinstance(day, str) else '', int(request_id) if pd.notna(request_id) else -1, pos)
+             for day, request_id, pos in zip(days, ids, positions)),
+            reverse=True
+        )
+        if cursor:
+            after = _parse_cursor(cursor)
+            keys = [key for key in keys if key[:2] < after]
+        page = keys[:page_size]
+        frame = _typed(df.iloc[[pos for _, _, pos in page]])
+    next_cursor = f"{page[-1][0]}|{page[-1][1]}" if len(keys) > page_size else None
+    return frame, next_cursor
+
+
+def status_counts(employee_code):
+    """Number of requests per status for one employee, from the index."""
+    code = str(employee_code).lower()
+    with _lock:
+        _refresh()
+        positions = list(_cache['by_employee'].get(code, set()))
+        return pd.Series(_cache['df']['status'].values[positions]).value_counts().to_dict()
+
+
+def pending_requests():
+    """The pending queue, in submission order."""
+    with _lock:
+        _refresh()
+        return _rows(_cache['by_status'].get('Pending', set()))
+
+
+def _next_id():
+    """Advance the persisted sequence. Caller holds the file lock and _lock."""
+    try:
+        with open(SEQUENCE_PATH, "r") as f:
+            last_id = int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        last_id = 0
+    # The table wins if it is ahead, e.g. the first time or after a restore
+    last_id = max(last_id, max(_cache['by_id'], default=0))
+    write_atomic(SEQUENCE_PATH, str(last_id + 1))
+    return last_id + 1
+
+
+def _csv_value(value):
+    if value is None or pd.isna(value):
+        return ''
+    if isinstance(value, time):
+        return value.strftime('%H:%M:%S')
+    return str(value)
+
+
+def _ends_with_newline():
+    with open(REQUESTS_PATH, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _same_time(stored, requested):
+    """Whether a stored HH:MM:SS value equals a requested time (both may be missing)."""
+    return (stored if isinstance(stored, str) else '') == _csv_value(requested)
+
+
+def _attendance_record(employee_code, request_date):
+    """The employee's attendance row for one date as a dict of text values, or None."""
+    try:
+        header, record, _, _ = attendance_store.locate(employee_code, request_date)
+    except FileNotFoundError:
+        return None
+    # The byte search relies on rows starting with "employee_code,date,"
+    if header[:2] != ['employee_code', 'date']:
+        return _attendance_record_scan(employee_code, request_date)
+    return record
+
+
+def _attendance_record_scan(employee_code, request_date):
+    for chunk in iter_attendance_chunks(request_date, request_date, [employee_code]):
+        return chunk.iloc[-1].to_dict()
+    return None
+
+
+def _find_duplicate(code, day, request_type, requested_column, requested):
+    """The submit result for an open request with the same key and requested time, or None. Caller holds _lock."""
+    df = _cache['df']
+    for pos in sorted(_cache['by_request'].get((code, day, request_type), set())):
+        if df.at[pos, 'status'] in OPEN_STATUSES and requested_column \
+                and _same_time(df.at[pos, requested_column], requested):
+            conflict = df.at[pos, 'conflict']
+            return {'outcome': 'duplicate', 'id': int(df.at[pos, 'id']), 'status': df.at[pos, 'status'],
+                    'conflict': conflict if pd.notna(conflict) else None}
+    return None
+
+
+def find_conflict(employee_code, request_date, request_type, requested_in_time, requested_out_time):
+    """Why approving this request would clash with recorded attendance or the shift policy, or None."""
+    policy = get_shift_policy()
+    if not policy.working_days([pd.Timestamp(request_date)])[0]:
+        return "Date is a weekly off or holiday"
+
+    record = _attendance_record(employee_code, request_date)
+    record = record or {}
+    in_time = record.get('in_time') if pd.notna(record.get('in_time')) else None
+    out_time = record.get('out_time') if pd.notna(record.get('out_time')) else None
+
+    # On a shift that runs past midnight, OUT before IN on the clock is the next morning
+    shift_start, _, min_hours, _ = policy.rule_for(employee_code)
+    overnight = shift_start + max(min_hours, NOMINAL_SHIFT_HOURS) * 3600 > 24 * 3600
+
+    if request_type == 'Correct In-Time' and requested_in_time is not None:
+        requested = _csv_value(requested_in_time)
+        if in_time == requested:
+            return f"IN time {in_time} is already recorded"
+        if out_time is not None and (requested == out_time or (requested > out_time and not overnight)):
+            return f"Requested IN time is not before the recorded OUT time {out_time}"
+    elif request_type == 'Correct Out-Time' and requested_out_time is not None:
+        requested = _csv_value(requested_out_time)
+        if out_time == requested:
+            return f"OUT time {out_time} is already recorded"
+        if in_time is None:
+            return "No IN time is recorded for this date"
+        if requested == in_time or (requested < in_time and not overnight):
+            return f"Requested OUT time is not after the recorded IN time {in_time}"
+    return None
+
+
+def submit_request(employee_code, request_date, request_type, requested_in_time, requested_out_time, reason):
+    """Queue a regularization request, merging or rejecting duplicates.
+
+    Requests are matched on (employee_code, date, request_type) through an index:
+    - the same requested time as a Pending, Approved or Completed request is a duplicate and is not queued;
+    - a different time while one is Pending updates that request instead of adding a second;
+    - otherwise a new Pending request is appended under the next sequence ID.
+    Conflicts with recorded attendance are stored on the request for the approver.
+    Returns a dict with 'outcome' ('created', 'merged' or 'duplicate'), 'id', 'status' and 'conflict'.
+    """
+    code = str(employee_code).lower()
+    day = str(request_date)
+    requested_column = REQUESTED_COLUMN.get(request_type)
+    requested = requested_in_time if requested_column == 'requested_in_time' else requested_out_time
+
+    # Most duplicates are caught here from the index alone, before attendance is read
+    with _lock:
+        _refresh()
+        duplicate = _find_duplicate(code, day, request_type, requested_column, requested)
+    if duplicate:
+        return duplicate
+
+    # Read outside the file lock; it only feeds the flag shown to the approver
+    conflict = find_conflict(code, request_date, request_type, requested_in_time, requested_out_time)
+
+    with file_lock(REQUESTS_PATH), _lock:
+        _refresh()
+        # Checked again under the file lock, in case another submitter got in first
+        duplicate = _find_duplicate(code, day, request_type, requested_column, requested)
+        if duplicate:
+            return duplicate
+
+        df = _cache['df']
+        pending = [pos for pos in sorted(_cache['by_request'].get((code, day, request_type), set()))
+                   if df.at[pos, 'status'] == 'Pending']
+        if pending:
+            pos = pending[-1]
+            df.loc[pos, ['requested_in_time', 'requested_out_time', 'reason', 'request_timestamp', 'conflict']] = [
+                _csv_value(requested_in_time) or None, _csv_value(requested_out_time) or None, reason,
+                str(datetime.now()), conflict]
+            _rewrite()
+            return {'outcome': 'merged', 'id': int(df.at[pos, 'id']), 'status': 'Pending', 'conflict': conflict}
+
+        request_id = _next_id()
+        record = {
+            'id': str(request_id),
+            'employee_code': code,
+            'date': day,
+            'request_type': request_type,
+            'requested_in_time': _csv_value(requested_in_time),
+            'requested_out_time': _csv_value(requested_out_time),
+            'reason': reason,
+            'status': 'Pending',
+            'request_timestamp': str(datetime.now()),
+            'conflict': conflict or '',
+        }
+
+        pos = len(df)
+        row = pd.DataFrame([{col: (record[col] or None) for col in COLUMNS}], index=[pos])
+        _cache['df'] = pd.concat([df, row]) if len(df) else row
+        _cache['by_id'][request_id] = pos
+        _cache['by_employee'].setdefault(code, set()).add(pos)
+        _cache['by_employee_status'].setdefault((code, 'Pending'), set()).add(pos)
+        _cache['by_status'].setdefault('Pending', set()).add(pos)
+        _cache['by_request'].setdefault((code, day, request_type), set()).add(pos)
+
+        if _file_key() is None or _cache['file_columns'] != COLUMNS:
+            _rewrite()
+        else:
+            buffer = io.StringIO()
+            if os.path.getsize(REQUESTS_PATH) and not _ends_with_newline():
+                buffer.write("\n")
+            csv.writer(buffer).writerow([record[col] for col in COLUMNS])
+            with open(REQUESTS_PATH, "a", newline="") as f:
+                f.write(buffer.getvalue())
+            _cache['key'] = _file_key()
+            change_bus.publish('regularization_requests')
+    return {'outcome': 'created', 'id': request_id, 'status': 'Pending', 'conflict': conflict}
+
+
+def _rewrite():
+    """Replace the file with the in-memory table. Caller holds both locks."""
+    write_atomic(REQUESTS_PATH, _cache['df'].to_csv(index=False))
+    _cache['file_columns'] = COLUMNS
+    _cache['key'] = _file_key()
+    change_bus.publish('regularization_requests')
+
+
+def _set_status(positions, status):
+    """Move rows to status, keep the indexes in step and rewrite the file. Caller holds both locks."""
+    df = _cache['df']
+    positions = [pos for pos in positions if df.at[pos, 'status'] != status]
+    if not positions:
+        return 0
+
+    for pos in positions:
+        old_status = df.at[pos, 'status']
+        code = df.at[pos, 'employee_code']
+        _cache['by_employee_status'].get((code, old_status), set()).discard(pos)
+        _cache['by_status'].get(old_status, set()).discard(pos)
+        _cache['by_employee_status'].setdefault((code, status), set()).add(pos)
+        _cache['by_status'].setdefault(status, set()).add(pos)
+    df.loc[positions, 'status'] = status
+
+    _rewrite()
+    return len(positions)
+
+
+def update_status(request_ids, status, expected=None, apply=None):
+    """Set status on the given requests; returns the number changed.
+
+    With expected, only requests still in that status are changed, so a
+    request another HR user has just processed is left alone. apply, if
+    given, is called with each of those requests as stored now (a Series)
+    before its status changes, under the store's lock; if it raises, no
+    status is changed. The file is rewritten atomically, and only when
+    something changed.
+    """
+    with file_lock(REQUESTS_PATH), _lock:
+        _refresh()
+        by_id = _cache['by_id']
+        positions = [by_id[int(i)] for i in request_ids if int(i) in by_id]
+        if expected is not None:
+            positions = [pos for pos in positions if _cache['df'].at[pos, 'status'] == expected]
+        if apply is not None:
+            for pos in positions:
+                apply(_rows([pos]).iloc[0])
+        return _set_status(positions, status)
+
+
+def mark_completed(employee_code):
+    """Move an employee's Approved requests to Completed; returns how many moved.
+
+    A lookup in the (employee_code, status) index, so the common case of
+    nothing to do takes no file lock and does no file read or write.
+    """
+    key = (str(employee_code).lower(), 'Approved')
+    with _lock:
+        _refresh()
+        if not _cache['by_employee_status'].get(key):
+            return 0
+    with file_lock(REQUESTS_PATH), _lock:
+        _refresh()
+        return _set_status(list(_cache['by_employee_status'].get(key, set())), 'Completed')
@@ -0,0 +1,81 @@
+# utils/render_cache.py
+import os
+import threading
+from collections import OrderedDict
+from utils.profiler import record_cache
+
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+
+# Total size of cached HTML shared by every session
+MAX_BYTES = int(float(os.environ.get("HRMS_RENDER_CACHE_MB", "64")) * 1024 * 1024)
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+
+def data_version(path=ATTENDANCE_PATH):
+    """Cheap version of a table file: any write changes its mtime or size."""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def calendar_key(owner, year, month):
+    """Cache key for a calendar: employee code (or "all"), YYYY-MM and the attendance data version."""
+    return (str(owner).lower(), f"{year:04d}-{month:02d}", data_version())
+
+
+def get(key):
+    """Cached HTML for key (marking it most recently used), or None."""
+    with _lock:
+        html = _entries.get(key)
+        if html is not None:
+            _entries.move_to_end(key)
+            _stats['hits'] += 1
+        else:
+            _stats['misses'] += 1
+    record_cache("render:calendar", hit=html is not None)
+    return html
+
+
+def put(key, html):
+    """Store HTML under key, replacing older versions of the same view and evicting LRU entries past MAX_BYTES."""
+    size = len(html)
+    if size > MAX_BYTES:
+        return
+    with _lock:
+        # A newer data version makes every other version of this (owner, month) unreachable
+        for stale in [k for k in _entries if k[:2] == key[:2] and k != key]:
+            _stats['bytes'] -= len(_entries.pop(stale))
+        if key in _entries:
+            _stats['bytes'] -= len(_entries.pop(key))
+        _entries[key] = html
+        _stats['bytes'] += size
+        while _stats['bytes'] > MAX_BYTES:
+            _, evicted = _entries.popitem(last=False)
+            _stats['bytes'] -= len(evicted)
+            _stats['evictions'] += 1
+
+
+def get_or_render(key, render):
+    """Cached HTML for key, calling render() to build and store it on a miss."""
+    html = get(key)
+    if html is None:
+        html = render()
+        put(key, html)
+    return html
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats['bytes'] = 0
+
+
+def stats():
+    """Entry count, bytes held and hit/miss/eviction counters."""
+    with _lock:
+        return {'entries': len(_entries), 'max_bytes': MAX_BYTES, **_stats}
@@ -0,0 +1,182 @@
+# utils/report_engine.py
+import os
+import json
+import calendar
+import multiprocessing
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from utils import calendar_view
+from utils.export import iter_attendance_chunks
+from utils.profiler import span
+
+REPORTS_DIR = "Database/reports"
+USERS_PATH = "Database/users.csv"
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+
+REPORT_STATUSES = ['P', 'LA', 'HD', 'MIS', 'A']
+
+# Employees handed to a worker per task; large enough to amortize pickling, small enough for smooth progress
+BATCH_SIZE = 50
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def report_dir(year, month):
+    return os.path.join(REPORTS_DIR, f"{year:04d}-{month:02d}")
+
+
+def _source_key():
+    """Identifies the data a cached report set was built from."""
+    key = {}
+    for path in (ATTENDANCE_PATH, USERS_PATH):
+        try:
+            stat = os.stat(path)
+            key[path] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            key[path] = None
+    return key
+
+
+def _employee_report(employee, records, year, month, out_dir):
+    """Build and write one employee's monthly report; returns its summary row."""
+    counts = records['status'].value_counts()
+    hours = pd.to_numeric(records['working_hours'], errors='coerce')
+    summary = {
+        'employee_code': employee['employee_code'],
+        'name': employee['name'],
+        'designation': employee['designation'],
+        'days_recorded': int(len(records)),
+        **{f"days_{status}": int(counts.get(status, 0)) for status in REPORT_STATUSES},
+        'late_count': int(counts.get('LA', 0)),
+        'total_hours': round(float(hours.sum()), 2),
+        'average_hours': round(float(hours.mean()), 2) if hours.notna().any() else 0.0,
+    }
+    report = {
+        **summary,
+        'period': f"{year:04d}-{month:02d}",
+        'calendar_html': calendar_view.calendar_html(records, month, year),
+    }
+    with open(os.path.join(out_dir, f"{employee['employee_code']}.json"), "w") as f:
+        json.dump(report, f)
+    return summary
+
+
+def _build_batch(batch, year, month, out_dir):
+    """Worker entry point: reports for a batch of (employee, records) pairs."""
+    return [_employee_report(employee, records, year, month, out_dir) for employee, records in batch]
+
+
+def _month_partition(year, month):
+    """One month of attendance rows, typed the way the calendar builder expects."""
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    chunks = list(iter_attendance_chunks(first_day, last_day))
+    if not chunks:
+        return pd.DataFrame(columns=['employee_code', 'date', 'in_time', 'out_time', 'working_hours', 'status'])
+    df = pd.concat(chunks, ignore_index=True)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
+    for col in ('in_time', 'out_time'):
+        df[col] = pd.to_datetime(df[col], format='%H:%M:%S', errors='coerce').dt.time
+    df['working_hours'] = pd.to_numeric(df['working_hours'], errors='coerce')
+    return df
+
+
+def load_index(year, month):
+    """The cached report index for a month, or None if it was never generated."""
+    path = os.path.join(report_dir(year, month), "index.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading report index {path}: {e}")
+        return None
+
+
+def load_report(year, month, employee_code):
+    """One employee's cached report, or None."""
+    path = os.path.join(report_dir(year, month), f"{employee_code.lower()}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def is_fresh(index):
+    """Whether a cached index was built from the current attendance and users files."""
+    return index is not None and index.get('source') == _source_key()
+
+
+def generate_monthly_reports(year, month, workers=None, force=False, progress=None):
+    """Build every employee's report for a month across a process pool.
+
+    Each employee's month (summary counts, late count, hours, calendar HTML) is
+    written to Database/reports/YYYY-MM/<code>.json, and an index.json holds the
+    summary rows. A fresh cached set is returned as is unless force is set.
+    progress(done, total) is called from this process as batches complete.
+    Returns the index dict.
+    """
+    index = load_index(year, month)
+    if not force and is_fresh(index):
+        return index
+
+    workers = max(1, workers or default_workers())
+    source = _source_key()
+    out_dir = report_dir(year, month)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with span("reports", f"{year:04d}-{month:02d}", workers=workers) as fields:
+        users_df = pd.read_csv(USERS_PATH, usecols=['employee_code', 'name', 'designation'], dtype=str)
+        users_df['employee_code'] = users_df['employee_code'].str.lower()
+        users_df = users_df.drop_duplicates('employee_code')
+
+        month_df = _month_partition(year, month)
+        by_employee = dict(tuple(month_df.groupby('employee_code'))) if not month_df.empty else {}
+        empty = month_df.iloc[0:0]
+
+        # Every employee gets a report, including those with no rows this month
+        tasks = [
+            ({'employee_code': row.employee_code, 'name': row.name, 'designation': row.designation},
+             by_employee.get(row.employee_code, empty))
+            for row in users_df.fillna('').itertuples(index=False)
+        ]
+        batches = [tasks[i:i + BATCH_SIZE] for i in range(0, len(tasks), BATCH_SIZE)]
+
+        summaries, done = [], 0
+        if progress:
+            progress(0, len(tasks))
+        if workers == 1:
+            for batch in batches:
+                summaries.extend(_build_batch(batch, year, month, out_dir))
+                done += len(batch)
+                if progress:
+                    progress(done, len(tasks))
+        else:
+            # fork would copy the whole Streamlit server into every worker
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {pool.submit(_build_batch, batch, year, month, out_dir): len(batch) for batch in batches}
+                for future in as_completed(futures):
+                    summaries.extend(future.result())
+                    done += futures[future]
+                    if progress:
+                        progress(done, len(tasks))
+        fields['employees'] = len(tasks)
+
+    index = {
+        'period': f"{year:04d}-{month:02d}",
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'workers': workers,
+        'source': source,
+        'employees': sorted(summaries, key=lambda s: s['employee_code']),
+    }
+    # Write the index last and atomically, so readers never see a half-built set as complete
+    tmp_path = os.path.join(out_dir, "index.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(out_dir, "index.json"))
+    return index
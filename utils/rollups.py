@@ -0,0 +1,279 @@
+# utils/rollups.py
+import os
+import json
+import threading
+import pandas as pd
+from utils.profiler import span
+from utils.file_lock import file_lock
+
+ROLLUP_PATH = "Database/attendance_rollups.json"
+ATTENDANCE_PATH = "Database/attendance_logs.csv"
+USERS_PATH = "Database/users.csv"
+
+# Bump when the stored layout changes; an older file is rebuilt from attendance_logs
+ROLLUP_VERSION = 2
+
+STATUSES = ['P', 'LA', 'HD', 'MIS', 'A']
+
+# Counters kept per day and per employee, stored as lists in this order to keep the file compact.
+# An employee's 'mis' counts missed punches (IN without OUT) whatever status they were closed with
+_DAY_FIELDS = ['rows', 'headcount', 'hours_sum', 'hours_count'] + STATUSES
+_EMPLOYEE_FIELDS = ['days', 'in', 'late', 'mis', 'hours_sum', 'hours_count']
+_D = {field: i for i, field in enumerate(_DAY_FIELDS)}
+_E = {field: i for i, field in enumerate(_EMPLOYEE_FIELDS)}
+
+_lock = threading.Lock()
+_store_cache = {'key': None, 'store': None}
+_users_cache = {'key': None, 'users': None}
+
+
+def _row_values(row):
+    """(employee_code, date string, has_in, has_out, status, hours or None) from a record dict or Series."""
+    code = str(row['employee_code']).lower()
+    day = str(row['date'])[:10]
+    has_in = bool(pd.notna(row.get('in_time')))
+    has_out = bool(pd.notna(row.get('out_time')))
+    status = row.get('status') if pd.notna(row.get('status')) else 'A'
+    hours = pd.to_numeric(row.get('working_hours'), errors='coerce')
+    return code, day, has_in, has_out, status, (None if pd.isna(hours) else float(hours))
+
+
+def _apply(store, row, sign):
+    """Add (sign=1) or remove (sign=-1) one attendance row's contribution."""
+    code, day, has_in, has_out, status, hours = _row_values(row)
+
+    daily = store['daily'].setdefault(day, [0] * len(_DAY_FIELDS))
+    daily[_D['rows']] += sign
+    daily[_D['headcount']] += sign * has_in
+    if status in STATUSES:
+        daily[_D[status]] += sign
+
+    employee = store['employees'].setdefault(code, [0] * len(_EMPLOYEE_FIELDS))
+    employee[_E['days']] += sign
+    employee[_E['in']] += sign * has_in
+    employee[_E['late']] += sign * (status == 'LA')
+    employee[_E['mis']] += sign * (has_in and not has_out)
+
+    if hours is not None:
+        daily[_D['hours_sum']] = round(daily[_D['hours_sum']] + sign * hours, 2)
+        daily[_D['hours_count']] += sign
+        employee[_E['hours_sum']] = round(employee[_E['hours_sum']] + sign * hours, 2)
+        employee[_E['hours_count']] += sign
+
+    if daily[_D['rows']] == 0:
+        del store['daily'][day]
+    if employee[_E['days']] == 0:
+        del store['employees'][code]
+
+
+def _file_key():
+    # The inode changes with every replace, even when mtime and size do not
+    try:
+        stat = os.stat(ROLLUP_PATH)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _write(store):
+    tmp_path = f"{ROLLUP_PATH}.{os.getpid()}.tmp"
+    # json.dumps uses the C encoder; json.dump to a file does not
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps(store, separators=(',', ':')))
+    os.replace(tmp_path, ROLLUP_PATH)
+    _store_cache['key'] = _file_key()
+    _store_cache['store'] = store
+
+
+def load_store():
+    """The rollup store, rebuilt from attendance_logs.csv when missing or outdated."""
+    return _load_store()[0]
+
+
+def _read_store(key):
+    """The stored rollups if the file holds the current version, else None. Caller holds _lock."""
+    if key is None:
+        return None
+    try:
+        with open(ROLLUP_PATH, "r") as f:
+            store = json.load(f)
+    except Exception as e:
+        print(f"Error loading attendance rollups: {e}")
+        return None
+    if store.get('version') != ROLLUP_VERSION:
+        return None
+    _store_cache['key'] = key
+    _store_cache['store'] = store
+    return store
+
+
+def _load_store(locked=False):
+    """(store, rebuilt); rebuilt is True when the store was just recomputed from attendance_logs.csv.
+
+    locked says the caller already holds the attendance and rollup file locks.
+    Otherwise they are taken only if the store has to be rebuilt.
+    """
+    key = _file_key()
+    if key is not None and _store_cache['key'] == key:
+        return _store_cache['store'], False
+
+    with _lock:
+        store = _read_store(key)
+    if store is not None:
+        return store, False
+    if not locked:
+        # Another process may have rebuilt it while these were being waited for
+        with file_lock(ATTENDANCE_PATH), file_lock(ROLLUP_PATH):
+            return _load_store(locked=True)
+    with _lock:
+        return _rebuild_locked(), True
+
+
+def apply_changes(changes):
+    """Fold (old_row, new_row) pairs into the store; either side may be None for inserts/deletes.
+
+    Call with the attendance file lock held, right after writing the rows, so
+    that a rebuild (which reads the CSV under that lock) either sees the rows
+    and is followed by no delta, or misses them and is followed by this one.
+    """
+    changes = [(old, new) for old, new in changes if old is not None or new is not None]
+    if not changes:
+        return
+    # The store is derived data, so a failure here must not fail the punch that triggered it
+    try:
+        # Other app processes update the same file; the file lock keeps their changes from being lost
+        with file_lock(ROLLUP_PATH):
+            store, rebuilt = _load_store(locked=True)
+            # Callers write attendance_logs.csv first, so a fresh rebuild already counts these rows
+            if rebuilt:
+                return
+            with _lock, span("rollups", "apply", rows=len(changes)):
+                for old, new in changes:
+                    if old is not None:
+                        _apply(store, old, -1)
+                    if new is not None:
+                        _apply(store, new, 1)
+                _write(store)
+    except Exception as e:
+        print(f"Error updating attendance rollups (run `python run.py --rebuild-rollups`): {e}")
+
+
+def apply_change(old_row, new_row):
+    """apply_changes for a single row."""
+    apply_changes([(old_row, new_row)])
+
+
+def _rebuild_locked():
+    with span("rollups", "rebuild") as fields:
+        try:
+            df = pd.read_csv(ATTENDANCE_PATH,
+                             usecols=['employee_code', 'date', 'in_time', 'out_time', 'working_hours', 'status'],
+                             dtype={'employee_code': str, 'date': str, 'in_time': str, 'out_time': str, 'status': str})
+        except FileNotFoundError:
+            df = pd.DataFrame(columns=['employee_code', 'date', 'in_time', 'out_time', 'working_hours', 'status'])
+        fields['rows'] = len(df)
+
+        df['employee_code'] = df['employee_code'].str.lower()
+        df['date'] = df['date'].str[:10]
+        df['status'] = df['status'].fillna('A')
+        hours = pd.to_numeric(df['working_hours'], errors='coerce')
+        frame = pd.DataFrame({
+            'employee_code': df['employee_code'],
+            'date': df['date'],
+            'rows': 1,
+            'headcount': df['in_time'].notna().astype(int),
+            'hours_sum': hours.fillna(0.0),
+            'hours_count': hours.notna().astype(int),
+            **{status: df['status'].eq(status).astype(int) for status in STATUSES},
+            'missed': (df['in_time'].notna() & df['out_time'].isna()).astype(int),
+        })
+
+        daily = frame.groupby('date')[_DAY_FIELDS].sum()
+        daily['hours_sum'] = daily['hours_sum'].round(2)
+
+        employees = frame.rename(columns={'rows': 'days', 'headcount': 'in', 'LA': 'late', 'missed': 'mis'})
+        employees = employees.groupby('employee_code')[_EMPLOYEE_FIELDS].sum()
+        employees['hours_sum'] = employees['hours_sum'].round(2)
+
+        store = {
+            'version': ROLLUP_VERSION,
+            'daily': dict(zip(daily.index, daily.astype(object).values.tolist())),
+            'employees': dict(zip(employees.index, employees.astype(object).values.tolist())),
+        }
+        _write(store)
+    return store
+
+
+def rebuild():
+    """Recompute the whole store with one scan of attendance_logs.csv.
+
+    The scan runs under the attendance file lock, so no punch lands between
+    the read and the write of the store.
+    """
+    with file_lock(ATTENDANCE_PATH), file_lock(ROLLUP_PATH), _lock:
+        return _rebuild_locked()
+
+
+def _users_lookup():
+    """name/designation by lowercase employee code, reread only when users.csv changes."""
+    try:
+        stat = os.stat(USERS_PATH)
+        key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return pd.DataFrame(columns=['name', 'designation'])
+    if _users_cache['key'] != key:
+        users = pd.read_csv(USERS_PATH, usecols=['employee_code', 'name', 'designation'], dtype=str)
+        users['employee_code'] = users['employee_code'].str.lower()
+        _users_cache['users'] = users.drop_duplicates('employee_code').set_index('employee_code')
+        _users_cache['key'] = key
+    return _users_cache['users']
+
+
+def dashboard(start_date=None, end_date=None, top_n=10):
+    """Frames for the HR analytics tab, computed from the rollup store only.
+
+    Returns a dict with 'daily' (per-day headcount, statuses, average hours within
+    the optional date range), 'designations' (late rate and average hours per
+    designation), 'mis_offenders' (top employees by missed punches, including those the
+    nightly reconciliation closed as absent) and 'totals'.
+    """
+    store = load_store()
+    with span("rollups", "dashboard"):
+        # Snapshot under the lock; punches mutate the cached store in place
+        with _lock:
+            daily = pd.DataFrame(list(store['daily'].values()), index=list(store['daily']), columns=_DAY_FIELDS)
+            employees = pd.DataFrame(list(store['employees'].values()), index=list(store['employees']),
+                                     columns=_EMPLOYEE_FIELDS)
+        daily.index = pd.to_datetime(daily.index, errors='coerce')
+        daily = daily.sort_index()
+        if start_date is not None:
+            daily = daily[daily.index >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            daily = daily[daily.index <= pd.Timestamp(end_date)]
+        daily['average_hours'] = (daily['hours_sum'] / daily['hours_count'].where(daily['hours_count'] > 0)).round(2)
+
+        users = _users_lookup()
+        employees = employees.join(users, how='left')
+        employees['designation'] = employees['designation'].fillna('UNKNOWN').str.upper()
+
+        designations = employees.groupby('designation')[['in', 'late', 'hours_sum', 'hours_count']].sum()
+        designations['late_rate'] = (designations['late'] / designations['in'].where(designations['in'] > 0)).round(3)
+        designations['average_hours'] = (
+            designations['hours_sum'] / designations['hours_count'].where(designations['hours_count'] > 0)).round(2)
+
+        offenders = employees[employees['mis'] > 0].nlargest(top_n, 'mis')
+        offenders = offenders.reset_index(names='employee_code')[['employee_code', 'name', 'designation', 'mis']]
+
+        hours_count = employees['hours_count'].sum()
+        totals = {
+            'days': int(daily['rows'].sum()),
+            'average_hours': round(float(employees['hours_sum'].sum() / hours_count), 2) if hours_count else 0.0,
+            'late_rate': round(float(employees['late'].sum() / employees['in'].sum()), 3) if employees['in'].sum() else 0.0,
+        }
+
+    return {
+        'daily': daily,
+        'designations': designations[['late_rate', 'average_hours', 'in', 'late']],
+        'mis_offenders': offenders,
+        'totals': totals,
+    }
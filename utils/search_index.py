@@ -0,0 +1,135 @@
+# utils/search_index.py
+import os
+import re
+import sqlite3
+from contextlib import closing
+from utils.html_table import escape
+from utils.profiler import span
+from utils import post_store
+
+INDEX_PATH = "Database/search.db"
+
+# Matches in the title count for more than matches in the body
+TITLE_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+SNIPPET_TOKENS = 24
+
+# Control characters around matched terms in snippets, swapped for <mark> after escaping
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = [
+    # prefix='2 3' keeps extra index entries so short prefix queries stay fast
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts USING fts5("
+    "post_id UNINDEXED, post_type UNINDEXED, date UNINDEXED, title, content, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+def _connect():
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    connection = sqlite3.connect(INDEX_PATH, timeout=10)
+    for statement in _SCHEMA:
+        connection.execute(statement)
+    return connection
+
+
+def _source_key():
+    # Pins and archiving do not change what is indexed, so they must not force a rebuild
+    return str(post_store.content_version())
+
+
+def _set_source_key(connection):
+    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (_source_key(),))
+
+
+def _row(post):
+    return (str(post['id']), post.get('post_type') or '', post.get('date') or '',
+            post.get('title') or '', post.get('content') or '')
+
+
+def rebuild():
+    """Index every post in the post store from scratch; returns the number indexed."""
+    posts = list(post_store.iter_posts(with_content=True))
+
+    with span("search", "rebuild") as fields, closing(_connect()) as connection, connection:
+        connection.execute("DELETE FROM posts")
+        connection.executemany("INSERT INTO posts (post_id, post_type, date, title, content) VALUES (?, ?, ?, ?, ?)",
+                               [_row(post) for post in posts])
+        _set_source_key(connection)
+        fields['posts'] = len(posts)
+    return len(posts)
+
+
+def _ensure_current(connection):
+    """Rebuild if the post store changed without add_post/remove_post being told."""
+    stored = connection.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    if stored is None or stored[0] != _source_key():
+        connection.close()
+        rebuild()
+        return _connect()
+    return connection
+
+
+def add_post(post):
+    """Index one new post; call after it has been stored."""
+    try:
+        with closing(_connect()) as connection, connection:
+            connection.execute("DELETE FROM posts WHERE post_id = ?", (str(post['id']),))
+            connection.execute("INSERT INTO posts (post_id, post_type, date, title, content) VALUES (?, ?, ?, ?, ?)",
+                               _row(post))
+            _set_source_key(connection)
+    except Exception as e:
+        # Search is derived data; the next search rebuilds it from the post store
+        print(f"Error updating search index: {e}")
+
+
+def remove_post(post_id):
+    """Drop one post from the index; call after it has been deleted from the store."""
+    try:
+        with closing(_connect()) as connection, connection:
+            connection.execute("DELETE FROM posts WHERE post_id = ?", (str(post_id),))
+            _set_source_key(connection)
+    except Exception as e:
+        print(f"Error updating search index: {e}")
+
+
+def to_match_query(text):
+    """An FTS5 query where every word must match, each as a prefix ('rep' finds 'report')."""
+    terms = _TERM.findall(text.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def search(text, post_type=None, limit=20):
+    """Best-ranked posts matching text, as dicts of id, post_type, date, title and an HTML snippet.
+
+    Ranking is BM25 with title matches weighted above content matches. The
+    snippet is escaped, with the matched terms wrapped in <mark>.
+    """
+    query = to_match_query(text)
+    if not query:
+        return []
+    sql = ("SELECT post_id, post_type, date, title, "
+           f"snippet(posts, 4, '{_MARK_START}', '{_MARK_END}', ' … ', {SNIPPET_TOKENS}) "
+           "FROM posts WHERE posts MATCH ? " + ("AND post_type = ? " if post_type else "") +
+           f"ORDER BY bm25(posts, 0, 0, 0, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) LIMIT ?")
+    params = (query, post_type, limit) if post_type else (query, limit)
+
+    with span("search", "query") as fields:
+        connection = _ensure_current(_connect())
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+        fields['results'] = len(rows)
+    return [
+        {'id': post_id, 'post_type': kind, 'date': date, 'title': title, 'snippet': _highlight(snippet)}
+        for post_id, kind, date, title, snippet in rows
+    ]
@@ -0,0 +1,175 @@
+# utils/shift_policy.py
+import os
+import json
+import calendar
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+POLICY_PATH = Path(__file__).parent.parent / "config" / "shift_policy.json"
+USERS_PATH = "Database/users.csv"
+
+# Rule fields in the order they are compiled into ShiftPolicy arrays
+RULE_FIELDS = ('start', 'grace_minutes', 'min_hours_present', 'half_day_hours')
+
+DEFAULT_RULE = {
+    'start': '09:00',
+    'grace_minutes': 15,
+    'min_hours_present': 0,
+    'half_day_hours': 0,
+}
+
+DEFAULT_POLICY = {
+    'default': DEFAULT_RULE,
+    'designations': {
+        'TRAINER': {'grace_minutes': 20},
+        'HR': {'grace_minutes': 20},
+    },
+    'employees': {},
+    'reconciliation': {
+        'weekly_off': ['Sunday'],
+        'holidays': [],
+        'missed_punch_status': 'A',
+    },
+}
+
+# Statuses the nightly job may assign to an IN punch that never got an OUT
+MISSED_PUNCH_STATUSES = ('MIS', 'A', 'HD')
+
+
+def _parse_start(value):
+    """'HH:MM' or 'HH:MM:SS' to seconds since midnight."""
+    parts = [int(p) for p in str(value).split(':')]
+    parts += [0] * (3 - len(parts))
+    return float(parts[0] * 3600 + parts[1] * 60 + parts[2])
+
+
+def _compile_rule(*rules):
+    """Merge rules left to right and return them as a row of floats in RULE_FIELDS order."""
+    merged = {}
+    for rule in rules:
+        if rule:
+            merged.update({k: v for k, v in rule.items() if k in RULE_FIELDS})
+    return [
+        _parse_start(merged['start']),
+        float(merged['grace_minutes']),
+        float(merged['min_hours_present']),
+        float(merged['half_day_hours']),
+    ]
+
+
+class ShiftPolicy:
+    """Shift rules compiled into arrays indexed by employee.
+
+    Row i of each array is the effective rule for the i-th employee in users.csv
+    (employee override > designation rule > default). The extra last row holds
+    the default rule for codes that are not in users.csv. A single punch costs a
+    dict lookup plus array indexing; whole frames map codes to rows once.
+    """
+
+    def __init__(self, config, users_df):
+        default = {**DEFAULT_RULE, **config.get('default', {})}
+        designation_rules = {k.upper(): v for k, v in config.get('designations', {}).items()}
+        employee_rules = {k.lower(): v for k, v in config.get('employees', {}).items()}
+
+        codes = users_df['employee_code'].astype(str).str.lower().tolist()
+        designations = users_df['designation'].fillna('').astype(str).str.upper().tolist()
+
+        self.index = {code: i for i, code in enumerate(codes)}
+        self.default_index = len(codes)
+        self.designation_rules = {
+            designation: _compile_rule(default, rule) for designation, rule in designation_rules.items()
+        }
+        self.default_rule = _compile_rule(default)
+
+        rows = [
+            _compile_rule(default, designation_rules.get(designation), employee_rules.get(code))
+            for code, designation in zip(codes, designations)
+        ]
+        rows.append(self.default_rule)
+        compiled = np.array(rows, dtype=float).reshape(-1, len(RULE_FIELDS))
+
+        self.shift_start = compiled[:, 0]
+        self.grace_minutes = compiled[:, 1]
+        self.min_hours_present = compiled[:, 2]
+        self.half_day_hours = compiled[:, 3]
+
+        reconciliation = {**DEFAULT_POLICY['reconciliation'], **config.get('reconciliation', {})}
+        day_numbers = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+        self.weekly_off = sorted(day_numbers[day.lower()] for day in reconciliation['weekly_off'])
+        self.holidays = sorted(pd.to_datetime(reconciliation['holidays']).date)
+        self.missed_punch_status = str(reconciliation['missed_punch_status']).upper()
+        if self.missed_punch_status not in MISSED_PUNCH_STATUSES:
+            print(f"Unknown missed_punch_status {self.missed_punch_status!r}; leaving missed punches as MIS")
+            self.missed_punch_status = 'MIS'
+
+    def lookup(self, employee_code):
+        """Row index for an employee code (the default row when unknown)."""
+        return self.index.get(str(employee_code).lower(), self.default_index)
+
+    def indices(self, employee_codes):
+        """Vectorized lookup() for a sequence of employee codes."""
+        codes = pd.Series(employee_codes, dtype=object).astype(str).str.lower()
+        return codes.map(self.index).fillna(self.default_index).to_numpy(dtype=np.int64)
+
+    def rule_for(self, employee_code):
+        """(shift_start, grace_minutes, min_hours_present, half_day_hours) for one employee."""
+        i = self.lookup(employee_code)
+        return self.shift_start[i], self.grace_minutes[i], self.min_hours_present[i], self.half_day_hours[i]
+
+    def rule_for_designation(self, designation):
+        """The same tuple for a designation, ignoring employee overrides."""
+        return tuple(self.designation_rules.get(str(designation or '').upper(), self.default_rule))
+
+    def working_days(self, days):
+        """Boolean mask over a DatetimeIndex: True for days that are neither weekly off nor holidays."""
+        days = pd.DatetimeIndex(days)
+        return ~days.dayofweek.isin(self.weekly_off) & ~days.normalize().isin(pd.to_datetime(self.holidays))
+
+
+def load_policy_config():
+    """Read config/shift_policy.json, falling back to the built-in defaults."""
+    if not POLICY_PATH.exists():
+        return DEFAULT_POLICY
+    try:
+        with open(POLICY_PATH, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading shift policy: {e}")
+        return DEFAULT_POLICY
+
+
+# Compiled policy shared by every session, rebuilt when the policy file or users.csv changes
+_policy_cache = {'key': None, 'policy': None}
+_policy_lock = threading.Lock()
+
+
+def _source_key():
+    key = []
+    for path in (POLICY_PATH, USERS_PATH):
+        try:
+            stat = os.stat(path)
+            key.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
+
+def get_shift_policy():
+    """Return the compiled ShiftPolicy, recompiling only when its sources changed."""
+    key = _source_key()
+    if _policy_cache['policy'] is not None and _policy_cache['key'] == key:
+        return _policy_cache['policy']
+
+    with _policy_lock:
+        if _policy_cache['policy'] is not None and _policy_cache['key'] == key:
+            return _policy_cache['policy']
+        try:
+            users_df = pd.read_csv(USERS_PATH, usecols=['employee_code', 'designation'])
+        except (FileNotFoundError, ValueError):
+            users_df = pd.DataFrame(columns=['employee_code', 'designation'])
+        policy = ShiftPolicy(load_policy_config(), users_df)
+        _policy_cache['key'] = key
+        _policy_cache['policy'] = policy
+        return policy
@@ -1,9 +1,19 @@
 # utils/styles.py
+# Calendar cell style per attendance status
+STATUS_STYLES = {
+    "P": "background-color: #8AE29C; color: black;",
+    "A": "background-color: #FF9B9B; color: black;",
+    "MIS": "background-color: #FFEB99; color: black;",
+    "LA": "background-color: #FFAA66; color: black;",
+    "HD": "background-color: #B5D8FF; color: black;"
+}
+
+# Text colour per regularization request status; anything else is shown in red
+REQUEST_STATUS_COLORS = {
+    "Completed": "green",
+    "Approved": "blue",
+    "Pending": "orange",
+}
+
 def style_calendar(status):
-    color_map = {
-        "P": "background-color: #8AE29C; color: black;",
-        "A": "background-color: #FF9B9B; color: black;",
-        "MIS": "background-color: #FFEB99; color: black;",
-        "LA": "background-color: #FFAA66; color: black;"
-    }
-    return color_map.get(status, "")
\ No newline at end of file
+    return STATUS_STYLES.get(status, "")